@@ -0,0 +1,123 @@
+"""
+Regression test: BIFROST fiber responses are cached, unitary and applied to the photons.
+
+  - Two topology builds with a `bifrost` link call the fiber model once; a
+    fresh adapter on the same cache directory loads the stored .npz instead
+    of calling it again.
+  - The Jones matrices of a drifting fiber are unitary in every time slice.
+  - With Bob's link rotated by a fixed fiber response, the coincidence
+    fractions of the event path and of the vectorized path both follow the
+    Born rule for the rotated Bell state.
+
+Run:
+  python examples/test_bifrost_adapter.py
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+
+import numpy as np
+
+from qpat.capabilities.factory import CapabilityFactory
+from qpat.experiment.parser import load_topology_yaml
+from qpat.simulation.adapters.bifrost_adapter import BifrostAdapter, local_fiber_response
+from qpat.simulation.adapters.sequence_adapter import SequenceTopologyBuilder
+from qpat.simulation.analytic import AnalyticPolarizationModel, projection_probabilities
+
+TOPOLOGY = os.path.join(os.path.dirname(__file__), "topology.yaml")
+FIBER_PARAMS = {"seed": 5}
+DRIFT_PARAMS = {"segment_length": 1, "drift_rate": 0.1, "duration": 60, "slice_duration": 0.1, "seed": 2}
+PSI_PLUS = np.array([0, 1, 1, 0]) / np.sqrt(2)
+
+model_calls = []
+
+
+def counted_fiber_response(distance, attenuation, params):
+    """`local_fiber_response`, counting its calls."""
+    model_calls.append((distance, attenuation))
+    return local_fiber_response(distance, attenuation, params)
+
+
+def make_topology():
+    topology = load_topology_yaml(TOPOLOGY)
+    topology.nodes["Source"].params["mean_photon_num"] = 0.01
+    topology.nodes["Bob"].params.update(hwp_angle=10, qwp_angle=30)
+    topology.links[1].model = "bifrost"
+    topology.links[1].model_params = dict(FIBER_PARAMS)
+    return topology
+
+
+def coincidence_fractions(adapter, topology, vectorized, duration):
+    topology = topology.clone()
+    topology.nodes["Source"].params["vectorized"] = vectorized
+    factory = CapabilityFactory()
+    factory.builder = SequenceTopologyBuilder(bifrost=adapter)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = factory.create("polarization_analysis", topology, seed=3).run(0, 0, duration, 1e7)
+    counts = result.metadata["coincidences"]
+    total = sum(counts.values())
+    return np.array([[counts["HH"], counts["HV"]], [counts["VH"], counts["VV"]]]) / total, total
+
+
+def check_cache(directory, topology):
+    adapter = BifrostAdapter(cache_dir=directory, model=counted_fiber_response)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(2):
+            SequenceTopologyBuilder(reuse=False, bifrost=adapter).build(topology.clone())
+    assert len(model_calls) == 1, f"fiber model called {len(model_calls)} times for two builds"
+    stored = [name for name in os.listdir(directory) if name.endswith(".npz")]
+    assert len(stored) == 1, f"expected one cached response, found {stored}"
+
+    link = topology.links[1]
+    fresh = BifrostAdapter(cache_dir=directory, model=counted_fiber_response)
+    loaded = fresh.response(link.distance, link.attenuation, link.model_params)
+    assert len(model_calls) == 1, "fresh adapter called the model instead of loading the cache"
+    computed = adapter.response(link.distance, link.attenuation, link.model_params)
+    assert np.array_equal(loaded.jones, computed.jones), "cached Jones matrices differ"
+
+
+def check_unitary(directory):
+    response = BifrostAdapter(cache_dir=directory).response(50_000, 2e-4, DRIFT_PARAMS)
+    assert len(response.jones) > 1, "drifting fiber has a single time slice"
+    product = response.jones @ np.conj(np.swapaxes(response.jones, 1, 2))
+    assert np.allclose(product, np.eye(2)), "Jones matrices are not unitary"
+    return len(response.jones)
+
+
+def main():
+    topology = make_topology()
+
+    with tempfile.TemporaryDirectory() as directory:
+        check_cache(directory, topology)
+        print("[OK] fiber model called once; a fresh adapter loads the cached .npz")
+
+        slices = check_unitary(directory)
+        print(f"[OK] {slices} Jones matrices of a drifting fiber are unitary")
+
+        adapter = BifrostAdapter(cache_dir=directory)
+        link = topology.links[1]
+        jones = adapter.response(link.distance, link.attenuation, link.model_params).jones
+        assert len(jones) == 1, "fiber without drift should have one time slice"
+        analytic = AnalyticPolarizationModel(topology, "Source", "Alice", "Bob")
+        state = np.kron(np.eye(2), jones[0]) @ PSI_PLUS
+        expected = projection_probabilities(state, analytic._operator("Alice"), analytic._operator("Bob"))
+        ideal = projection_probabilities(PSI_PLUS, analytic._operator("Alice"), analytic._operator("Bob"))
+        assert np.abs(expected - ideal).max() > 0.02, "fiber rotation too small to be tested"
+        print(f"Born rule: {np.round(expected.ravel(), 3)} (unrotated {np.round(ideal.ravel(), 3)})")
+
+        for name, vectorized, duration in (("event", False, 0.1), ("vectorized", True, 0.5)):
+            fractions, total = coincidence_fractions(adapter, topology, vectorized, duration)
+            # binomial standard error of each fraction
+            sigma = np.sqrt(expected * (1 - expected) / total)
+            z = np.abs(fractions - expected) / sigma
+            print(f"[{name}] {total} coincidences: {np.round(fractions.ravel(), 3)}, max |z| {z.max():.2f}")
+            assert z.max() < 5, f"{name} path does not follow the Born rule"
+            print(f"[OK] {name} path matches the Born rule")
+
+    print("\n BIFROST fiber responses are cached and applied consistently.")
+
+
+if __name__ == "__main__":
+    main()
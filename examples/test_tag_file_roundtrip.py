@@ -0,0 +1,140 @@
+"""
+Regression test: a binary time-tag file reads back exactly what was written.
+
+Tags with duplicate timestamps and an empty channel are written
+  - in one call (write_tag_file),
+  - in uneven pieces (TimeTagFileWriter.write),
+  - through a TimeTagStream fed per channel, out of step (also with tags
+    arriving after their time was reported complete, within the margin),
+and read back with TimeTagFile: columns, labels, find, range, channel_times,
+channel_counts, block_edges and blocks are checked against numpy on the
+in-memory arrays.
+
+Run:
+  python examples/test_tag_file_roundtrip.py
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from qpat.simulation.timetags import TimeTagFile, TimeTagFileWriter, TimeTagStream, write_tag_file
+
+LABELS = ("H", "V", "unused")
+CHUNK_TAGS = 100
+
+
+def make_tags(rng, num=5_000):
+    """Time-sorted timestamps (ps), many of them repeated, and channel ids (channel 2 never used)."""
+    timestamps = np.sort(rng.integers(0, 2_000_000, num)).astype(np.int64)
+    timestamps[100:150] = timestamps[100]  # a run of equal timestamps across a chunk edge
+    timestamps = np.sort(timestamps)
+    channels = rng.integers(0, 2, num).astype(np.uint8)
+    return timestamps, channels
+
+
+def write_in_pieces(path, timestamps, channels, rng):
+    cuts = np.sort(rng.choice(np.arange(1, len(timestamps)), size=20, replace=False))
+    with TimeTagFileWriter(path, LABELS, chunk_tags=CHUNK_TAGS) as writer:
+        for t, c in zip(np.split(timestamps, cuts), np.split(channels, cuts)):
+            writer.write(t, c)
+        writer.write(np.empty(0, dtype=np.int64), 0)
+
+
+def write_streamed(path, timestamps, channels, late=0):
+    """
+    Push each channel's tags in its own slices, with the channels out of step.
+
+    With `late` > 0 every slice claims to be complete `late` ps beyond its
+    last possible tag (as with timing jitter), which the stream's margin covers.
+    """
+    with TimeTagFileWriter(path, LABELS, chunk_tags=CHUNK_TAGS) as writer:
+        stream = TimeTagStream(writer, len(LABELS), margin=late)
+        for lo in range(0, 2_000_000, 50_000):
+            for channel, lag in ((0, 0), (1, 25_000), (2, 0)):
+                start, stop = max(lo - lag, 0), lo + 50_000 - lag
+                times = timestamps[(channels == channel) & (timestamps >= start) & (timestamps < stop)]
+                stream.push(channel, times, stop + late)
+        # the rest of the lagging channel
+        stream.push(1, timestamps[(channels == 1) & (timestamps >= 2_000_000 - 25_000)], 2_000_000)
+        stream.flush()
+
+
+def check(path, timestamps, channels):
+    with TimeTagFile(path) as f:
+        assert f.labels == LABELS, "labels differ"
+        assert len(f) == len(timestamps), "tag count differs"
+        assert np.array_equal(f.timestamps, timestamps), "timestamps differ"
+        assert f.start_time == timestamps[0] and f.end_time == timestamps[-1]
+
+        # channel order among equal timestamps may differ: compare per channel
+        for c in range(len(LABELS)):
+            assert np.array_equal(f.timestamps[f.channels == c], timestamps[channels == c]), \
+                f"timestamps of channel {c} differ"
+        assert np.array_equal(f.channel_counts(), np.bincount(channels, minlength=len(LABELS)))
+
+        probes = np.concatenate([[-1, 0, timestamps[100], timestamps[-1], timestamps[-1] + 1], timestamps[::97] + 1])
+        for time in probes:
+            assert f.find(int(time)) == np.searchsorted(timestamps, time, side="left"), f"find({time}) differs"
+
+        for start, stop in ((None, None), (timestamps[100], timestamps[100] + 1), (500_000, 1_500_000), (5, 5)):
+            t, c = f.range(start, stop)
+            mask = np.ones(len(timestamps), dtype=bool)
+            if start is not None:
+                mask &= timestamps >= start
+            if stop is not None:
+                mask &= timestamps < stop
+            assert np.array_equal(t, timestamps[mask]), f"range({start}, {stop}) differs"
+            assert np.array_equal(np.sort(c), np.sort(channels[mask]))
+            for label, times in zip(("H", "V"), f.channel_times(["H", "V"], start, stop)):
+                assert np.array_equal(times, timestamps[mask & (channels == LABELS.index(label))])
+
+        for min_tags in (1, 250, 10 ** 6):
+            edges = f.block_edges(min_tags)
+            assert edges[0] <= timestamps[0] and edges[-1] > timestamps[-1], "blocks do not cover the file"
+            assert np.all(np.diff(edges) > 0), "block edges not increasing"
+            pieces = list(f.blocks(min_tags))
+            assert np.array_equal(np.concatenate([t for _, _, t, _ in pieces]), timestamps), \
+                f"blocks of {min_tags} tags do not add up to the file"
+            for start, stop, t, _ in pieces:
+                assert np.all((t >= start) & (t < stop)), "tag outside its block"
+
+
+def main():
+    rng = np.random.default_rng(3)
+    timestamps, channels = make_tags(rng)
+
+    with tempfile.TemporaryDirectory() as directory:
+        whole = os.path.join(directory, "whole.tags")
+        write_tag_file(whole, timestamps, channels, LABELS, chunk_tags=CHUNK_TAGS)
+        check(whole, timestamps, channels)
+        print("[OK] write_tag_file round trip")
+
+        pieces = os.path.join(directory, "pieces.tags")
+        write_in_pieces(pieces, timestamps, channels, rng)
+        check(pieces, timestamps, channels)
+        print("[OK] TimeTagFileWriter round trip (uneven pieces)")
+
+        streamed = os.path.join(directory, "streamed.tags")
+        write_streamed(streamed, timestamps, channels)
+        check(streamed, timestamps, channels)
+        print("[OK] TimeTagStream round trip (channels out of step)")
+
+        late = os.path.join(directory, "late.tags")
+        write_streamed(late, timestamps, channels, late=20_000)
+        check(late, timestamps, channels)
+        print("[OK] TimeTagStream round trip (late tags within the margin)")
+
+        empty = os.path.join(directory, "empty.tags")
+        write_tag_file(empty, np.empty(0, dtype=np.int64), 0, LABELS)
+        with TimeTagFile(empty) as f:
+            assert len(f) == 0 and f.start_time is None and len(f.block_edges()) == 0
+            assert list(f.blocks()) == []
+        print("[OK] empty file")
+
+    print("\n Time-tag files read back what was written.")
+
+
+if __name__ == "__main__":
+    main()
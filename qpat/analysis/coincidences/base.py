@@ -1,5 +1,48 @@
 from abc import ABC, abstractmethod
-from typing import Any, List
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+
+ACCIDENTAL_METHODS = ("offset", "singles")
+
+
+@dataclass
+class CoincidenceCounts:
+    """
+    Coincidence counts per channel pair.
+
+    Keys are the concatenated channel labels of the two sides,
+    e.g. "HV" for Alice channel H and Bob channel V.
+
+    Attributes:
+        counts: raw coincidences in the window.
+        accidentals_singles: accidentals estimated from singles, N_A * N_B * window / duration.
+        accidentals_offset: coincidences counted in a window shifted by a fixed offset.
+        accidental_method: estimate subtracted in `corrected` ("offset" or "singles").
+    """
+    counts: Dict[str, int] = field(default_factory=dict)
+    accidentals_singles: Dict[str, float] = field(default_factory=dict)
+    accidentals_offset: Dict[str, int] = field(default_factory=dict)
+    accidental_method: str = "offset"
+
+    @property
+    def total(self) -> int:
+        return int(sum(self.counts.values()))
+
+    @property
+    def accidentals(self) -> Dict[str, float]:
+        """Accidental estimate selected by `accidental_method`."""
+        if self.accidental_method == "offset":
+            return dict(self.accidentals_offset)
+        return dict(self.accidentals_singles)
+
+    @property
+    def corrected(self) -> Dict[str, float]:
+        """Raw counts minus the selected accidental estimate."""
+        acc = self.accidentals
+        return {k: v - acc.get(k, 0) for k, v in self.counts.items()}
 
 
 class CoincidenceModel(ABC):
@@ -8,9 +51,17 @@ class CoincidenceModel(ABC):
     """
 
     @abstractmethod
-    def compute(self, detection_events: List[dict]) -> Any:
+    def compute(
+        self,
+        alice_tags: Sequence[np.ndarray],
+        bob_tags: Sequence[np.ndarray],
+        duration: Optional[float] = None,
+    ) -> Any:
         """
-        Compute coincidences from detection events.
+        Compute coincidences from per-channel detection timestamps (ps).
+
+        `duration` (s) is the acquisition time, used for singles-based
+        accidental estimates.
         """
         pass
 
@@ -0,0 +1,233 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+from qpat.analysis.coincidences.window_method import WindowCoincidenceModel, as_sorted_tags
+
+
+# Maximum number of tag differences materialized at once
+_PAIR_BLOCK = 1 << 22
+# Approximate number of start tags read per block from binary tag files
+_FILE_BLOCK_TAGS = 1 << 16
+
+
+@dataclass
+class DelayHistogram:
+    """
+    Start-stop histogram of tag differences (stop - start), in ps.
+
+    Attributes:
+        bin_edges: bin edges (ps), length len(counts) + 1.
+        counts: number of tag pairs per bin.
+        peak_delay: delay (ps) of the correlation peak.
+        accidental_floor: mean counts per bin far from the peak.
+    """
+    bin_edges: np.ndarray
+    counts: np.ndarray
+    peak_delay: float
+    accidental_floor: float
+
+    @property
+    def bin_centers(self) -> np.ndarray:
+        return 0.5 * (self.bin_edges[:-1] + self.bin_edges[1:])
+
+    @property
+    def bin_width(self) -> float:
+        return float(self.bin_edges[1] - self.bin_edges[0])
+
+    @property
+    def peak_counts(self) -> float:
+        """Height of the peak above the accidental floor."""
+        return float(self.counts.max() - self.accidental_floor)
+
+    @property
+    def fwhm(self) -> float:
+        """Full width (ps) of the peak at half its height above the floor."""
+        excess = self.counts - self.accidental_floor
+        peak = int(np.argmax(excess))
+        half = excess[peak] / 2
+        if half <= 0:
+            return self.bin_width
+
+        below = np.flatnonzero(excess[:peak] < half)
+        above = np.flatnonzero(excess[peak:] < half)
+        left = below[-1] + 1 if len(below) else 0
+        right = peak + above[0] - 1 if len(above) else len(excess) - 1
+        return (right - left + 1) * self.bin_width
+
+
+def histogram_delays(
+    start: np.ndarray,
+    stop: np.ndarray,
+    max_delay: int,
+    bin_width: int,
+) -> np.ndarray:
+    """
+    Bin every difference `stop - start` in [-max_delay, max_delay).
+
+    Both arrays must be sorted. The partner range of each start tag is found by
+    binary search and the differences are generated and binned block-wise with
+    NumPy, so the cost is linear in the number of pairs inside the range.
+
+    Returns:
+        np.ndarray: int64 counts, one per bin of width `bin_width` (ps).
+    """
+    num_bins = int(np.ceil(2 * max_delay / bin_width))
+    counts = np.zeros(num_bins, dtype=np.int64)
+    if len(start) == 0 or len(stop) == 0:
+        return counts
+
+    lo = np.searchsorted(stop, start - max_delay, side="left")
+    hi = np.searchsorted(stop, start + max_delay, side="left")
+    n_pairs = hi - lo
+    cum = np.cumsum(n_pairs)
+
+    first = 0
+    while first < len(start):
+        # Take as many start tags as fit in one block of pairs (at least one)
+        offset = cum[first - 1] if first else 0
+        last = max(first + 1, int(np.searchsorted(cum, offset + _PAIR_BLOCK, side="right")))
+
+        n = n_pairs[first:last]
+        total = int(n.sum())
+        if total:
+            starts = np.repeat(np.arange(first, last), n)
+            # index of each pair's stop tag: lo[start] + rank within its range
+            rank = np.arange(total) - np.repeat(np.cumsum(n) - n, n)
+            diffs = stop[lo[starts] + rank] - start[starts]
+            bins = (diffs + max_delay) // bin_width
+            counts += np.bincount(bins, minlength=num_bins)[:num_bins]
+        first = last
+
+    return counts
+
+
+class CrossCorrelationHistogram:
+    """
+    Cross-correlation (g2 / delay scan) engine for two time-tag streams.
+
+    Builds the histogram of Bob - Alice tag differences within +/- `max_delay`,
+    locates the correlation peak and estimates the accidental floor from the
+    outer `side_fraction` of bins on each side.
+    """
+
+    def __init__(self, max_delay: float, bin_width: float, side_fraction: float = 0.25):
+        """
+        Args:
+            max_delay: half range of the histogram (s).
+            bin_width: bin width (s).
+            side_fraction: fraction of bins on each side used for the floor estimate.
+        """
+        self.max_delay = max_delay
+        self.bin_width = bin_width
+        self.side_fraction = side_fraction
+
+    def compute(self, alice_tags, bob_tags) -> DelayHistogram:
+        """
+        Histogram Bob - Alice differences.
+
+        Args:
+            alice_tags: timestamp array (ps), or a list of per-channel arrays (merged).
+            bob_tags: timestamp array (ps), or a list of per-channel arrays (merged).
+        """
+        max_delay, bin_width = self._bins()
+        return self._histogram(histogram_delays(_merge(alice_tags), _merge(bob_tags), max_delay, bin_width))
+
+    def compute_files(
+        self,
+        alice_file,
+        bob_file,
+        alice_channels: Optional[Sequence] = None,
+        bob_channels: Optional[Sequence] = None,
+        block_tags: int = _FILE_BLOCK_TAGS,
+    ) -> DelayHistogram:
+        """
+        Histogram Bob - Alice differences of two binary time-tag files (`TimeTagFile`).
+
+        Alice's file is read in time blocks, each with the Bob tags within
+        +/- `max_delay` of it, so memory is bounded by the block size and the
+        histogram equals that of `compute` on the full tag arrays.
+
+        Args:
+            alice_file: Alice's tag file.
+            bob_file: Bob's tag file.
+            alice_channels: Alice's channels (labels or ids) to merge (default: all).
+            bob_channels: Bob's channels to merge (default: all).
+            block_tags: approximate number of Alice tags per block.
+        """
+        max_delay, bin_width = self._bins()
+        counts = np.zeros(int(np.ceil(2 * max_delay / bin_width)), dtype=np.int64)
+        edges = alice_file.block_edges(block_tags).tolist()
+        for start, stop in zip(edges[:-1], edges[1:]):
+            alice = _merge(alice_file.channel_times(alice_channels, start, stop))
+            bob = _merge(bob_file.channel_times(bob_channels, start - max_delay, stop + max_delay))
+            counts += histogram_delays(alice, bob, max_delay, bin_width)
+        return self._histogram(counts)
+
+    def _bins(self):
+        """(max_delay, bin_width) in ps."""
+        return int(round(self.max_delay * 1e12)), max(1, int(round(self.bin_width * 1e12)))
+
+    def _histogram(self, counts: np.ndarray) -> DelayHistogram:
+        max_delay, bin_width = self._bins()
+        edges = -max_delay + bin_width * np.arange(len(counts) + 1, dtype=np.int64)
+
+        floor = self._floor(counts)
+        return DelayHistogram(
+            bin_edges=edges,
+            counts=counts,
+            peak_delay=self._peak(counts, edges, floor),
+            accidental_floor=floor,
+        )
+
+    def _floor(self, counts: np.ndarray) -> float:
+        side = max(1, int(len(counts) * self.side_fraction))
+        return float(np.concatenate([counts[:side], counts[-side:]]).mean())
+
+    @staticmethod
+    def _peak(counts: np.ndarray, edges: np.ndarray, floor: float) -> float:
+        """Centroid of the peak bin and its neighbours, above the floor."""
+        centers = 0.5 * (edges[:-1] + edges[1:])
+        peak = int(np.argmax(counts))
+        sl = slice(max(0, peak - 2), peak + 3)
+        weights = np.clip(counts[sl] - floor, 0, None)
+        if weights.sum() <= 0:
+            return float(centers[peak])
+        return float(np.average(centers[sl], weights=weights))
+
+    def calibrate(
+        self,
+        model: WindowCoincidenceModel,
+        alice_tags: Sequence[np.ndarray],
+        bob_tags: Sequence[np.ndarray],
+        window_factor: Optional[float] = None,
+    ) -> DelayHistogram:
+        """
+        Align a window model on the measured correlation peak.
+
+        The histogram is taken on the model's delay-corrected tags, and the
+        residual peak delay is removed from Bob's channel delays. If
+        `window_factor` is given, the window is also set to that many peak FWHMs.
+
+        Returns:
+            DelayHistogram: the histogram used for calibration.
+        """
+        alice = model.prepare_tags(alice_tags, model.alice_delays)
+        bob = model.prepare_tags(bob_tags, model.bob_delays)
+        hist = self.compute(alice, bob)
+
+        shift = hist.peak_delay * 1e-12
+        model.bob_delays = [d - shift for d in model.bob_delays]
+        if window_factor is not None:
+            model.window = window_factor * hist.fwhm * 1e-12
+
+        return hist
+
+
+def _merge(tags) -> np.ndarray:
+    """Merge per-channel timestamp arrays into one sorted array."""
+    if isinstance(tags, np.ndarray) and tags.ndim == 1:
+        return as_sorted_tags(tags)
+    tags = [np.asarray(t, dtype=np.int64) for t in tags]
+    return as_sorted_tags(np.concatenate(tags) if tags else np.empty(0, dtype=np.int64))
@@ -0,0 +1,296 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from qpat.analysis.coincidences.base import CoincidenceModel, CoincidenceCounts
+from qpat.analysis.coincidences.window_method import (
+    WindowCoincidenceModel,
+    as_sorted_tags,
+    count_window_pairs_with_offset,
+    singles_accidentals,
+)
+
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+# Approximate number of tags read per block from binary tag files
+_FILE_BLOCK_TAGS = 1 << 16
+
+
+class StreamingCoincidenceCounter(CoincidenceModel):
+    """
+    Incremental coincidence counting for long acquisitions.
+
+    Tags are fed as consecutive time slices with `update`. Each pair is
+    counted once, when the Alice tag can no longer gain partners (i.e. Bob's
+    stream has advanced beyond it by more than the window). Only the tags that
+    may still pair with future data are kept between chunks, so memory is
+    bounded by the chunk size plus a window-sized tail, and the final totals are
+    exactly those of the batch `WindowCoincidenceModel`, accidentals included.
+    """
+
+    def __init__(self, model: WindowCoincidenceModel, start_time: int = 0):
+        """
+        Args:
+            model: window model providing window, delays and channel labels.
+            start_time: acquisition start (ps), used for running rates.
+        """
+        self.model = model
+        self.start_time = start_time
+        self.reset()
+
+    def reset(self):
+        """Forget all tags and counts."""
+        n = len(self.model.channel_labels)
+        self._alice: List[np.ndarray] = [_EMPTY] * n
+        self._bob: List[np.ndarray] = [_EMPTY] * n
+        self._last_alice = None
+        self._last_bob = None
+        self.end_time = self.start_time
+        self.singles = {"alice": [0] * n, "bob": [0] * n}
+        labels = [a + b for a in self.model.channel_labels for b in self.model.channel_labels]
+        self.counts = CoincidenceCounts(
+            counts={k: 0 for k in labels},
+            accidentals_singles={k: 0.0 for k in labels},
+            accidentals_offset={k: 0 for k in labels},
+            accidental_method=self.model.accidental_method,
+        )
+
+    # --------------------------------------------------
+
+    def update(self, alice_chunk, bob_chunk, end_time: Optional[int] = None) -> CoincidenceCounts:
+        """
+        Add the next time slice of tags and count every pair that is complete.
+
+        Args:
+            alice_chunk: per-channel timestamp arrays (ps) of Alice's next slice.
+            bob_chunk: per-channel timestamp arrays (ps) of Bob's next slice.
+            end_time: time (ps) up to which both streams are complete, i.e. all
+                later tags have timestamp >= end_time. Defaults to the earliest
+                of the latest tags seen on each side.
+
+        Returns:
+            CoincidenceCounts: running totals.
+        """
+        self._alice, self._last_alice = self._append(
+            self._alice, alice_chunk, self.model.alice_delays, self._last_alice, "alice"
+        )
+        self._bob, self._last_bob = self._append(
+            self._bob, bob_chunk, self.model.bob_delays, self._last_bob, "bob"
+        )
+
+        if end_time is None:
+            if self._last_alice is None or self._last_bob is None:
+                return self.counts
+            end_time = min(self._last_alice, self._last_bob)
+        self.end_time = max(self.end_time, int(end_time))
+
+        self._advance(
+            alice_horizon=self.end_time + self._min_delay(self.model.alice_delays),
+            bob_horizon=self.end_time + self._min_delay(self.model.bob_delays),
+        )
+        self._update_singles_accidentals()
+        return self.counts
+
+    def finalize(self, end_time: Optional[int] = None) -> CoincidenceCounts:
+        """
+        Count all remaining carried-over tags (end of acquisition).
+
+        Args:
+            end_time: acquisition end (ps), used for running rates.
+        """
+        if end_time is not None:
+            self.end_time = max(self.end_time, int(end_time))
+        self._advance(alice_horizon=np.inf, bob_horizon=np.inf)
+        self._update_singles_accidentals()
+        return self.counts
+
+    # --------------------------------------------------
+
+    def _append(self, carry, chunk, delays, last, side):
+        merged = []
+        for i, tags in enumerate(chunk):
+            raw = np.asarray(tags, dtype=np.int64)
+            if len(raw):
+                self.singles[side][i] += len(raw)
+                last = int(raw.max()) if last is None else max(last, int(raw.max()))
+            delay = int(round(delays[i] * 1e12)) if i < len(delays) else 0
+            new = as_sorted_tags(raw, delay)
+            if len(carry[i]) and len(new) and new[0] < carry[i][-1]:
+                merged.append(np.sort(np.concatenate([carry[i], new])))
+            else:
+                merged.append(np.concatenate([carry[i], new]))
+        return merged, last
+
+    @staticmethod
+    def _min_delay(delays) -> int:
+        return int(round(min(delays, default=0.0) * 1e12))
+
+    def _advance(self, alice_horizon, bob_horizon):
+        """
+        Count pairs for Alice tags whose partners are all known, then drop
+        tags that cannot pair with anything still to come.
+
+        Future Alice tags are >= alice_horizon and future Bob tags are
+        >= bob_horizon (delay-corrected).
+        """
+        labels = self.model.channel_labels
+        w = self.model.half_window
+        offset = self.model.offset
+        reach = w + max(offset, 0)
+
+        remaining_alice = []
+        for i, a in enumerate(self._alice):
+            # Alice tags with a + reach < bob_horizon have seen all their partners
+            ready = len(a) if bob_horizon == np.inf else np.searchsorted(a, bob_horizon - reach, side="left")
+            done = a[:ready]
+            for j, b in enumerate(self._bob):
+                label = labels[i] + labels[j]
+                pairs, shifted = count_window_pairs_with_offset(done, b, w, offset)
+                self.counts.counts[label] += pairs
+                self.counts.accidentals_offset[label] += shifted
+            remaining_alice.append(a[ready:])
+
+        self._alice = remaining_alice
+
+        # Bob tags below (earliest pending or future Alice tag) - w can no longer pair
+        earliest = min([a[0] for a in self._alice if len(a)] + [alice_horizon])
+        if earliest == np.inf:
+            self._bob = [_EMPTY] * len(self._bob)
+        else:
+            low = earliest - w + min(offset, 0)
+            self._bob = [b[np.searchsorted(b, low, side="left"):] for b in self._bob]
+
+    def _update_singles_accidentals(self):
+        labels = self.model.channel_labels
+        duration = self.end_time - self.start_time
+        for i, n_a in enumerate(self.singles["alice"]):
+            for j, n_b in enumerate(self.singles["bob"]):
+                self.counts.accidentals_singles[labels[i] + labels[j]] = singles_accidentals(
+                    n_a, n_b, 2 * self.model.half_window, duration
+                )
+
+    # --------------------------------------------------
+
+    @property
+    def elapsed(self) -> float:
+        """Acquisition time covered so far (s)."""
+        return (self.end_time - self.start_time) * 1e-12
+
+    @property
+    def rates(self) -> dict:
+        """Running coincidence rate (Hz) per channel pair."""
+        if self.elapsed <= 0:
+            return {k: 0.0 for k in self.counts.counts}
+        return {k: v / self.elapsed for k, v in self.counts.counts.items()}
+
+    @property
+    def carry_size(self) -> int:
+        """Number of tags currently held between chunks."""
+        return sum(len(t) for t in self._alice) + sum(len(t) for t in self._bob)
+
+    # --------------------------------------------------
+
+    def compute(self, alice_tags, bob_tags, duration: Optional[float] = None) -> CoincidenceCounts:
+        """Count a complete acquisition in one pass (same result as the window model)."""
+        self.reset()
+        self.update(alice_tags, bob_tags)
+        end_time = None if duration is None else self.start_time + int(round(duration * 1e12))
+        return self.finalize(end_time)
+
+    def rate(self, coincidences: CoincidenceCounts, duration: float) -> float:
+        return self.model.rate(coincidences, duration)
+
+
+def count_file_coincidences(
+    model,
+    alice_file,
+    bob_file,
+    alice_channels: Optional[Sequence] = None,
+    bob_channels: Optional[Sequence] = None,
+    duration: Optional[float] = None,
+    block_tags: int = _FILE_BLOCK_TAGS,
+) -> Tuple[CoincidenceCounts, List[int], List[int]]:
+    """
+    Count coincidences between two binary time-tag files without loading them.
+
+    Both files (`TimeTagFile`) are read in consecutive time blocks, cut at
+    the entries of their time indexes, and fed to a
+    `StreamingCoincidenceCounter`; memory is bounded by the block size and
+    the counts equal those of `model.compute` on the full tag arrays.
+
+    Args:
+        model: `WindowCoincidenceModel` (or a streaming counter wrapping one).
+        alice_file: Alice's tag file.
+        bob_file: Bob's tag file.
+        alice_channels: Alice's channels (labels or ids) in model channel order
+            (default: all channels of the file).
+        bob_channels: Bob's channels, likewise.
+        duration: acquisition time (s); defaults to the end of the last tag.
+        block_tags: approximate number of tags per block and file.
+
+    Returns:
+        (CoincidenceCounts, Alice singles per channel, Bob singles per channel)
+    """
+    return count_file_coincidence_sets(
+        model, alice_file, bob_file, [(alice_channels, bob_channels)], duration, block_tags
+    )[0]
+
+
+def count_file_coincidence_sets(
+    model,
+    alice_file,
+    bob_file,
+    selections: Sequence[Tuple[Optional[Sequence], Optional[Sequence]]],
+    duration: Optional[float] = None,
+    block_tags: int = _FILE_BLOCK_TAGS,
+) -> List[Tuple[CoincidenceCounts, List[int], List[int]]]:
+    """
+    `count_file_coincidences` for several channel selections in one pass over the files.
+
+    Args:
+        selections: (Alice channels, Bob channels) of every count, e.g. one
+            per pair of analyzer bases.
+
+    Returns:
+        list: (CoincidenceCounts, Alice singles, Bob singles) per selection.
+    """
+    if isinstance(model, StreamingCoincidenceCounter):
+        model = model.model
+    counters = [StreamingCoincidenceCounter(model) for _ in selections]
+    alice_ids = [_channel_ids(alice_file, channels, model.channel_labels) for channels, _ in selections]
+    bob_ids = [_channel_ids(bob_file, channels, model.channel_labels) for _, channels in selections]
+
+    edges = np.union1d(alice_file.block_edges(block_tags), bob_file.block_edges(block_tags)).tolist()
+    for start, stop in zip(edges[:-1], edges[1:]):
+        alice = alice_file.channel_times(None, start, stop)
+        bob = bob_file.channel_times(None, start, stop)
+        for counter, a, b in zip(counters, alice_ids, bob_ids):
+            counter.update([alice[i] for i in a], [bob[i] for i in b], end_time=stop)
+
+    end_time = None if duration is None else int(round(duration * 1e12))
+    return [
+        (counter.finalize(end_time), list(counter.singles["alice"]), list(counter.singles["bob"]))
+        for counter in counters
+    ]
+
+
+def _channel_ids(tag_file, channels: Optional[Sequence], model_labels: Sequence[str]) -> List[int]:
+    """
+    Channel ids of `channels` in `tag_file`, one per model channel.
+
+    Raises ValueError when the file does not hold the requested channels
+    (e.g. a recording of another analyzer).
+    """
+    if channels is None:
+        channels = list(range(len(tag_file.labels)))
+        expected = f"{len(model_labels)} channels {tuple(model_labels)}"
+    else:
+        expected = f"channels {tuple(channels)}"
+    missing = [c for c in channels if (c not in tag_file.labels if isinstance(c, str) else not 0 <= int(c) < len(tag_file.labels))]
+    if missing or len(channels) != len(model_labels):
+        raise ValueError(
+            f"Tag file '{tag_file.path}' has channels {tag_file.labels}; expected {expected} "
+            f"for the coincidence model's {tuple(model_labels)}"
+        )
+    return [tag_file.channel_id(channel) for channel in channels]
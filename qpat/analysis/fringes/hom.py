@@ -0,0 +1,288 @@
+"""Hong-Ou-Mandel (HOM) interference.
+
+Two photons meeting on a 50:50 beam splitter with relative delay tau leave
+in different ports (a coincidence) with probability
+
+    P_c(tau) = (1 - s |<phi_1|phi_2(tau)>|^2) / 2
+
+where phi_j are the photons' spectral amplitudes and s = <psi|SWAP|psi> is
+the exchange symmetry of their polarization state (+1 for phi+, phi- and
+psi+, giving a dip; -1 for psi-, giving a peak). For Gaussian spectra,
+centered at angular frequencies w_j with rms intensity widths sigma_j, the
+overlap has the closed form
+
+    |<phi_1|phi_2(tau)>|^2 = 2 s1 s2 / (s1^2 + s2^2)
+                             * exp(-(w1 - w2)^2 / (2 (s1^2 + s2^2)))
+                             * exp(-2 s1^2 s2^2 tau^2 / (s1^2 + s2^2))
+
+which is evaluated on a whole delay grid at once.
+
+Dips (or peaks) C(tau) = C0 (1 - V exp(-(tau - tau0)^2 / (2 width^2))) are
+fitted for many scans per call by maximizing the Poisson likelihood:
+batched Levenberg-Marquardt (damped Fisher scoring) steps with weights
+1 / C(tau), accepted when they lower the Poisson deviance.
+"""
+
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+
+SPEED_OF_LIGHT = 299_792_458.0  # m/s
+
+# Fraction of the scan points at each end used to estimate the baseline
+_EDGE_FRACTION = 0.1
+# Smallest Levenberg-Marquardt diagonal relative to the largest one
+_DIAGONAL_FLOOR = 1e-12
+# Largest starting visibility of a dip
+_MAX_START_VISIBILITY = 0.99
+
+
+def angular_frequency(wavelength_nm, bandwidth_nm=0.0):
+    """
+    Angular frequency (rad/s) and rms angular bandwidth (rad/s) of a photon.
+
+    Args:
+        wavelength_nm: central wavelength (nm).
+        bandwidth_nm: rms spread of the wavelength (nm).
+    """
+    wavelength = np.asarray(wavelength_nm, dtype=float) * 1e-9
+    omega = 2 * np.pi * SPEED_OF_LIGHT / wavelength
+    sigma = omega * np.asarray(bandwidth_nm, dtype=float) * 1e-9 / wavelength
+    return omega, sigma
+
+
+def exchange_symmetry(state) -> float:
+    """<psi|SWAP|psi> of a two-photon polarization state (4-vector)."""
+    state = np.asarray(state, dtype=complex)
+    swapped = state.reshape(2, 2).T.reshape(4)
+    return float(np.real(np.vdot(state, swapped)) / np.real(np.vdot(state, state)))
+
+
+def spectral_overlap(delays, wavelengths, bandwidths) -> np.ndarray:
+    """
+    |<phi_1|phi_2(tau)>|^2 of two Gaussian spectra for every delay.
+
+    Args:
+        delays: relative delays tau (s), any shape.
+        wavelengths: central wavelengths (nm) of the two photons.
+        bandwidths: rms wavelength spreads (nm) of the two photons. Zero
+            bandwidth is monochromatic (overlap independent of the delay).
+
+    Returns:
+        np.ndarray: overlap in [0, 1] with the shape of `delays`.
+    """
+    delays = np.asarray(delays, dtype=float)
+    (w1, w2), (s1, s2) = angular_frequency(wavelengths, bandwidths)
+    total = s1 ** 2 + s2 ** 2
+    if total == 0:
+        return np.full(delays.shape, 1.0 if w1 == w2 else 0.0)
+    if s1 == 0 or s2 == 0:
+        # one monochromatic photon has no overlap with a finite-band one
+        return np.zeros(delays.shape)
+    return (
+        2 * s1 * s2 / total
+        * np.exp(-((w1 - w2) ** 2) / (2 * total))
+        * np.exp(-2 * s1 ** 2 * s2 ** 2 * delays ** 2 / total)
+    )
+
+
+def coincidence_probability(delays, wavelengths, bandwidths, symmetry: float = 1.0) -> np.ndarray:
+    """Beam-splitter coincidence probability (1 - symmetry * overlap) / 2 for every delay."""
+    return 0.5 * (1 - symmetry * spectral_overlap(delays, wavelengths, bandwidths))
+
+
+def dip_width(wavelengths, bandwidths) -> float:
+    """rms width (s) of the HOM dip of two Gaussian spectra."""
+    _, (s1, s2) = angular_frequency(wavelengths, bandwidths)
+    if s1 == 0 or s2 == 0:
+        return float("inf")
+    return float(np.sqrt((s1 ** 2 + s2 ** 2) / (4 * s1 ** 2 * s2 ** 2)))
+
+
+@dataclass
+class HOMFit:
+    """
+    Dip fit results, one entry per scan (arrays with the leading shape of the counts).
+
+    Attributes:
+        baseline: coincidences C0 far from the dip.
+        visibility: dip depth V relative to the baseline (negative for a peak).
+        center: delay tau0 of the dip (s).
+        width: rms width of the dip (s).
+        visibility_err, center_err, width_err: 1-sigma uncertainties.
+        chi2: weighted sum of squared residuals.
+        dof: degrees of freedom.
+    """
+    baseline: np.ndarray
+    visibility: np.ndarray
+    center: np.ndarray
+    width: np.ndarray
+    visibility_err: np.ndarray
+    center_err: np.ndarray
+    width_err: np.ndarray
+    chi2: np.ndarray
+    dof: np.ndarray
+
+    @property
+    def fwhm(self) -> np.ndarray:
+        """Full width at half maximum (s) of the dip."""
+        return 2 * np.sqrt(2 * np.log(2)) * self.width
+
+    def model(self, delays) -> np.ndarray:
+        """Fitted coincidences at `delays` (broadcast against the scans' leading shape)."""
+        delays = np.asarray(delays, dtype=float)
+        params = np.stack([self.baseline, self.visibility, self.center, self.width], axis=-1)
+        return _dip(delays, params.reshape(-1, 4)).reshape(self.baseline.shape + delays.shape[-1:])
+
+
+def fit_hom_dips(delays, counts, max_iter: int = 100, tol: float = 1e-10) -> HOMFit:
+    """
+    Fit Gaussian HOM dips (or peaks) to coincidence-vs-delay scans.
+
+    Args:
+        delays: scan delays (s), shape (N,) or broadcastable to `counts`.
+        counts: coincidences, shape (..., N); NaN marks missing points. Scans
+            without any coincidence have no dip to fit: their results are NaN
+            (with a RuntimeWarning).
+        max_iter: maximum Levenberg-Marquardt iterations.
+        tol: a scan is done once a step changes its Poisson deviance by less than
+            `tol` (relative).
+
+    Returns:
+        HOMFit
+    """
+    counts = np.asarray(counts, dtype=float)
+    shape = counts.shape[:-1]
+    y = counts.reshape(-1, counts.shape[-1])
+    t = np.broadcast_to(np.asarray(delays, dtype=float), counts.shape).reshape(y.shape)
+    valid = np.isfinite(y)
+    y = np.where(valid, y, 0.0)
+
+    fitted = np.any(valid & (y > 0), axis=1)
+    if not fitted.all():
+        warnings.warn(
+            f"{int((~fitted).sum())} HOM scan(s) without coincidences; their fit results are NaN",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+
+    # work in units of the scan span so the parameters are of order one
+    scale = np.maximum(np.ptp(t, axis=1), 1e-300)[:, None]
+    t = t / scale
+
+    active = np.flatnonzero(fitted)
+    params = np.full((len(y), 4), np.nan)
+    params[active] = _initial(t[active], y[active], valid[active])
+    deviance = np.full(len(y), np.nan)
+    deviance[active] = _deviance(t[active], y[active], valid[active], params[active])
+    damping = np.full(len(y), 1e-3)
+    for _ in range(max_iter):
+        if len(active) == 0:
+            break
+        ta, ya, va, pa = t[active], y[active], valid[active], params[active]
+        normal, rhs = _normal_equations(ta, ya, va, pa)
+        diagonal = np.einsum("fii->fi", normal)
+        # the floor keeps the step defined when the dip vanishes (V or width -> 0)
+        diagonal = np.maximum(diagonal, _DIAGONAL_FLOOR * diagonal.max(axis=1, keepdims=True) + 1e-300)
+        trial = pa + np.linalg.solve(
+            normal + damping[active, None, None] * diagonal[:, :, None] * np.eye(4), rhs[..., None]
+        )[..., 0]
+        trial[:, 3] = np.abs(trial[:, 3])
+        trial_deviance = _deviance(ta, ya, va, trial)
+        better = trial_deviance <= deviance[active]
+        with np.errstate(invalid="ignore"):
+            change = np.abs(deviance[active] - trial_deviance) / np.maximum(deviance[active], 1e-300)
+        params[active] = np.where(better[:, None], trial, pa)
+        deviance[active] = np.where(better, trial_deviance, deviance[active])
+        damping[active] = np.where(better, damping[active] / 3, damping[active] * 3)
+        # scans whose step no longer changes the deviance are done
+        active = active[~(change < tol)]
+
+    rows = np.flatnonzero(fitted)
+    normal, _ = _normal_equations(t[rows], y[rows], valid[rows], params[rows])
+    try:
+        cov = np.linalg.inv(normal)
+    except np.linalg.LinAlgError:
+        cov = np.linalg.pinv(normal)
+    err = np.full((len(y), 4), np.nan)
+    err[rows] = np.sqrt(np.abs(np.einsum("fii->fi", cov)))
+
+    def out(values, unit=1.0):
+        return np.asarray(values * unit, dtype=float).reshape(shape)
+
+    span = scale[:, 0]
+    return HOMFit(
+        baseline=out(params[:, 0]),
+        visibility=out(params[:, 1]),
+        center=out(params[:, 2], span),
+        width=out(params[:, 3], span),
+        visibility_err=out(err[:, 1]),
+        center_err=out(err[:, 2], span),
+        width_err=out(err[:, 3], span),
+        chi2=out(_chi2(t, y, valid, params)),
+        dof=out(valid.sum(axis=1) - 4),
+    )
+
+
+def _dip(t: np.ndarray, params: np.ndarray) -> np.ndarray:
+    c0, v, t0, w = (params[:, i, None] for i in range(4))
+    return c0 * (1 - v * np.exp(-((t - t0) ** 2) / (2 * w ** 2)))
+
+
+def _weights(t, valid, params) -> np.ndarray:
+    return np.where(valid, 1.0 / np.maximum(_dip(t, params), 1.0), 0.0)
+
+
+def _deviance(t, y, valid, params) -> np.ndarray:
+    """Poisson deviance 2 sum(y log(y / mu) - (y - mu)), infinite for non-positive mu."""
+    mu = _dip(t, params)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(y > 0, y * np.log(y / mu), 0.0) - (y - mu)
+    terms = np.where(mu > 0, terms, np.inf)
+    return 2 * np.where(valid, terms, 0.0).sum(axis=1)
+
+
+def _chi2(t, y, valid, params) -> np.ndarray:
+    return (_weights(t, valid, params) * (y - _dip(t, params)) ** 2).sum(axis=1)
+
+
+def _normal_equations(t, y, valid, params):
+    """J'WJ and J'W(y - model) of the dip model, Poisson weights from the model."""
+    c0, v, t0, w = (params[:, i, None] for i in range(4))
+    x = t - t0
+    g = np.exp(-(x ** 2) / (2 * w ** 2))
+    jac = np.stack([
+        1 - v * g,
+        -c0 * g,
+        -c0 * v * g * x / w ** 2,
+        -c0 * v * g * x ** 2 / w ** 3,
+    ], axis=1)
+    weighted = jac * _weights(t, valid, params)[:, None, :]
+    residual = y - _dip(t, params)
+    return weighted @ jac.transpose(0, 2, 1), (weighted @ residual[..., None])[..., 0]
+
+
+def _initial(t, y, valid) -> np.ndarray:
+    """Start values: baseline from the scan edges, dip at the largest deviation, width from its area."""
+    num = len(y)
+    order = np.argsort(t, axis=1)
+    ts = np.take_along_axis(t, order, axis=1)
+    ys = np.take_along_axis(np.where(valid, y, np.nan), order, axis=1)
+    edge = max(1, int(_EDGE_FRACTION * t.shape[1]))
+    baseline = np.nanmean(np.concatenate([ys[:, :edge], ys[:, -edge:]], axis=1), axis=1)
+    baseline = np.where(np.isfinite(baseline) & (baseline > 0), baseline, np.nanmax(ys, axis=1))
+
+    deviation = np.where(np.isfinite(ys), baseline[:, None] - ys, 0.0)
+    peak = np.argmax(np.abs(deviation), axis=1)
+    rows = np.arange(num)
+    depth = deviation[rows, peak]
+    center = ts[rows, peak]
+
+    area = (0.5 * (deviation[:, 1:] + deviation[:, :-1]) * np.diff(ts, axis=1)).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # below 1 so that the start model is positive (finite deviance)
+        visibility = np.minimum(depth / baseline, _MAX_START_VISIBILITY)
+        width = np.abs(area / (depth * np.sqrt(2 * np.pi)))
+    width = np.where(np.isfinite(width) & (width > 0), width, 0.1)
+    return np.stack([baseline, visibility, center, width], axis=1)
@@ -0,0 +1,298 @@
+"""Fringe-visibility fitting.
+
+A fringe is a set of coincidence counts y_i measured at analyzer angles t_i,
+modeled as
+
+    y(t) = A + B cos(k t) + C sin(k t) = A (1 + V cos(k t - phi)),   k = 2 pi / period
+
+with visibility V = sqrt(B^2 + C^2) / A and phase phi = atan2(C, B) (the
+fringe maximum is at t = phi / k). At a known period the model is linear in
+(A, B, C), so many fringes are fitted at once by solving batched 3x3 normal
+equations, with Poisson weights 1 / y_i. The optional refinement maximizes
+the Poisson likelihood instead (weights from the model, iterated) and can
+free the period, by batched Gauss-Newton steps.
+
+Counts have shape (..., N): one fringe per leading index, NaN for missing
+points. Angles have shape (N,) or broadcast to the counts; the period is in
+the same unit (90 for HWP angles in degrees, since a HWP rotates the
+polarization by twice its angle).
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+DEFAULT_PERIOD = 90.0
+
+
+@dataclass
+class FringeFit:
+    """
+    Fit results, one entry per fringe (arrays with the leading shape of the counts).
+
+    Attributes:
+        offset: mean count A.
+        amplitude: fringe amplitude sqrt(B^2 + C^2).
+        phase: fringe phase phi (rad).
+        period: fringe period (angle unit of the data).
+        visibility: amplitude / offset.
+        visibility_err: 1-sigma uncertainty of the visibility.
+        phase_err: 1-sigma uncertainty of the phase (rad).
+        chi2: weighted sum of squared residuals.
+        dof: degrees of freedom (points minus fitted parameters).
+    """
+    offset: np.ndarray
+    amplitude: np.ndarray
+    phase: np.ndarray
+    period: np.ndarray
+    visibility: np.ndarray
+    visibility_err: np.ndarray
+    phase_err: np.ndarray
+    chi2: np.ndarray
+    dof: np.ndarray
+
+    def model(self, angles) -> np.ndarray:
+        """Fitted counts at `angles` (broadcast against the fringes' leading shape)."""
+        angles = np.asarray(angles, dtype=float)
+        k = (2 * np.pi / self.period)[..., None]
+        return self.offset[..., None] * (
+            1 + self.visibility[..., None] * np.cos(k * angles - self.phase[..., None])
+        )
+
+
+def fit_fringes(
+    angles,
+    counts,
+    period: float = DEFAULT_PERIOD,
+    refine: bool = False,
+    fit_period: bool = False,
+    max_iter: int = 50,
+    tol: float = 1e-10,
+) -> FringeFit:
+    """
+    Fit sinusoidal fringes.
+
+    Args:
+        angles: analyzer angles, shape (N,) or broadcastable to `counts`.
+        counts: coincidence counts, shape (..., N); NaN marks missing points.
+        period: fringe period (start value when `fit_period`).
+        refine: maximize the Poisson likelihood after the linear fit.
+        fit_period: also fit the period (implies `refine`).
+        max_iter: maximum refinement iterations.
+        tol: refinement stops when no parameter changes by more than `tol`
+            relative to the offset.
+
+    Returns:
+        FringeFit
+    """
+    counts = np.asarray(counts, dtype=float)
+    shape = counts.shape[:-1]
+    y = counts.reshape(-1, counts.shape[-1])
+    t = _angles(angles, counts.shape, y.shape)
+    valid = np.isfinite(y)
+    y = np.where(valid, y, 0.0)
+
+    k = np.full(len(y), 2 * np.pi / float(period))
+    weights = np.where(valid, 1.0 / np.maximum(y, 1.0), 0.0)
+    design = _design(t, k)
+    params = _solve(design, weights, y)
+
+    if refine or fit_period:
+        params, k, weights = _refine(t, y, valid, params, k, fit_period, max_iter, tol)
+
+    normal, _ = _normal_equations(_design(t, k, params if fit_period else None), weights, y)
+    num_params = 4 if fit_period else 3
+    return _result(params, k, _covariance(normal), weights, t, y, valid, num_params, shape)
+
+
+class StreamingFringeFit:
+    """
+    Incremental linear fringe fit for scans whose points arrive one by one.
+
+    Only the weighted normal equations are accumulated, so each `update` costs
+    O(new points) and the current fit is available at any time, e.g. to stop
+    a scan once the visibility error bar of every fringe is small enough:
+
+        fit = StreamingFringeFit(period=90)
+        for angle in scan:
+            fit.update(angle, measure(angle))
+            if fit.converged(1e-3):
+                break
+    """
+
+    def __init__(self, period: float = DEFAULT_PERIOD, shape: tuple = ()):
+        """
+        Args:
+            period: fringe period (angle unit of the data).
+            shape: leading shape of the fringes fitted together (() for one fringe).
+        """
+        self.period = float(period)
+        self.shape = tuple(shape)
+        self.reset()
+
+    def reset(self):
+        """Forget all points."""
+        size = int(np.prod(self.shape, dtype=int))
+        self._normal = np.zeros((size, 3, 3))
+        self._rhs = np.zeros((size, 3))
+        self._sum_wyy = np.zeros(size)
+        self._num_points = np.zeros(size, dtype=np.int64)
+
+    def update(self, angles, counts) -> FringeFit:
+        """
+        Add scan points.
+
+        Args:
+            angles: angle(s) of the new points, shape (M,) or scalar.
+            counts: counts of the new points, shape shape + (M,) (or shape for one point).
+
+        Returns:
+            FringeFit: fit of all points so far.
+        """
+        counts = np.asarray(counts, dtype=float)
+        if counts.shape == self.shape:
+            counts = counts[..., None]
+        y = counts.reshape(-1, counts.shape[-1])
+        t = _angles(angles, counts.shape, y.shape)
+        valid = np.isfinite(y)
+        y = np.where(valid, y, 0.0)
+        weights = np.where(valid, 1.0 / np.maximum(y, 1.0), 0.0)
+
+        normal, rhs = _normal_equations(_design(t, np.full(len(y), 2 * np.pi / self.period)), weights, y)
+        self._normal += normal
+        self._rhs += rhs
+        self._sum_wyy += (weights * y * y).sum(axis=1)
+        self._num_points += valid.sum(axis=1)
+        return self.result()
+
+    def result(self) -> FringeFit:
+        """Fit of all points so far (NaN for fringes with fewer than 3 points)."""
+        enough = self._num_points >= 3
+        normal = np.where(enough[:, None, None], self._normal, np.eye(3))
+        params = np.linalg.solve(normal, self._rhs[..., None])[..., 0]
+        # chi2 = y'Wy - 2 p'X'Wy + p'X'WXp = y'Wy - p'X'Wy at the solution
+        chi2 = self._sum_wyy - np.einsum("fi,fi->f", params, self._rhs)
+        k = np.full(len(params), 2 * np.pi / self.period)
+        fit = _fit(params, k, _covariance(normal), chi2, self._num_points - 3, self.shape)
+        for name in ("offset", "amplitude", "phase", "visibility", "visibility_err", "phase_err", "chi2"):
+            getattr(fit, name)[...] = np.where(enough.reshape(self.shape), getattr(fit, name), np.nan)
+        return fit
+
+    def converged(self, max_visibility_err: float) -> bool:
+        """True once every fringe's visibility uncertainty is at most `max_visibility_err`."""
+        err = self.result().visibility_err
+        return bool(np.all(np.isfinite(err) & (err <= max_visibility_err)))
+
+
+def _angles(angles, counts_shape: tuple, flat_shape: tuple) -> np.ndarray:
+    """Angles shared by all fringes as (N,), otherwise one row per fringe (F, N)."""
+    angles = np.asarray(angles, dtype=float)
+    if angles.ndim == 1 and angles.shape == counts_shape[-1:]:
+        return angles
+    return np.broadcast_to(angles, counts_shape).reshape(flat_shape)
+
+
+def _design(t: np.ndarray, k: np.ndarray, params: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Jacobian of the model w.r.t. (A, B, C), plus k when `params` is given.
+
+    Shared angles and period give one (N, P) matrix for all fringes,
+    otherwise the result is (F, N, P).
+    """
+    if params is None and t.ndim == 1 and np.all(k == k[0]):
+        phase = k[0] * t
+    else:
+        phase = k[:, None] * t
+    cos, sin = np.cos(phase), np.sin(phase)
+    columns = [np.ones_like(phase), cos, sin]
+    if params is not None:
+        columns.append(t * (params[:, 2, None] * cos - params[:, 1, None] * sin))
+    return np.stack(columns, axis=-1)
+
+
+def _normal_equations(design: np.ndarray, weights: np.ndarray, y: np.ndarray):
+    """Batched X'WX and X'Wy."""
+    if design.ndim == 2:
+        num = design.shape[1]
+        outer = (design[:, :, None] * design[:, None, :]).reshape(len(design), num * num)
+        return (weights @ outer).reshape(-1, num, num), (weights * y) @ design
+    weighted = design.transpose(0, 2, 1) * weights[:, None, :]
+    return weighted @ design, (weighted @ y[..., None])[..., 0]
+
+
+def _solve(design: np.ndarray, weights: np.ndarray, y: np.ndarray) -> np.ndarray:
+    normal, rhs = _normal_equations(design, weights, y)
+    return np.linalg.solve(normal, rhs[..., None])[..., 0]
+
+
+def _refine(t, y, valid, params, k, fit_period, max_iter, tol):
+    """Poisson maximum likelihood by Gauss-Newton steps with model weights (IRLS)."""
+    params = params.copy()
+    k = k.copy()
+    active = np.arange(len(y))
+    for _ in range(max_iter):
+        ta = t if t.ndim == 1 else t[active]
+        ya, pa, ka = y[active], params[active], k[active]
+        model = _model(ta, pa, ka)
+        weights = np.where(valid[active], 1.0 / np.maximum(model, 1e-3), 0.0)
+        design = _design(ta, ka, pa if fit_period else None)
+        step = _solve(design, weights, ya - model)
+        params[active] += step[:, :3]
+        if fit_period:
+            k[active] += step[:, 3]
+        change = np.abs(step).max(axis=1) / np.maximum(np.abs(pa[:, 0]), 1e-300)
+        active = active[change > tol]
+        if len(active) == 0:
+            break
+
+    model = _model(t, params, k)
+    weights = np.where(valid, 1.0 / np.maximum(model, 1e-3), 0.0)
+    return params, k, weights
+
+
+def _model(t, params, k):
+    phase = k[:, None] * t
+    return params[:, 0, None] + params[:, 1, None] * np.cos(phase) + params[:, 2, None] * np.sin(phase)
+
+
+def _covariance(normal: np.ndarray) -> np.ndarray:
+    try:
+        return np.linalg.inv(normal)
+    except np.linalg.LinAlgError:
+        return np.linalg.pinv(normal)
+
+
+def _result(params, k, cov, weights, t, y, valid, num_params, shape) -> FringeFit:
+    residual = y - _model(t, params, k)
+    chi2 = (weights * residual ** 2).sum(axis=1)
+    return _fit(params, k, cov, chi2, valid.sum(axis=1) - num_params, shape)
+
+
+def _fit(params, k, cov, chi2, dof, shape) -> FringeFit:
+    a, b, c = params[:, 0], params[:, 1], params[:, 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amplitude = np.hypot(b, c)
+        visibility = amplitude / a
+        # gradients of V and phi w.r.t. (A, B, C); the period does not enter them
+        zeros = np.zeros_like(a)
+        grad_v = np.stack([-visibility / a, b / (a * amplitude), c / (a * amplitude)], axis=1)
+        grad_phi = np.stack([zeros, -c / amplitude ** 2, b / amplitude ** 2], axis=1)
+    cov = cov[:, :3, :3]
+    visibility_err = np.sqrt(np.einsum("fi,fij,fj->f", grad_v, cov, grad_v))
+    phase_err = np.sqrt(np.einsum("fi,fij,fj->f", grad_phi, cov, grad_phi))
+
+    def out(values):
+        return np.asarray(values, dtype=float).reshape(shape)
+
+    return FringeFit(
+        offset=out(a),
+        amplitude=out(amplitude),
+        phase=out(np.arctan2(c, b)),
+        period=out(2 * np.pi / k),
+        visibility=out(visibility),
+        visibility_err=out(visibility_err),
+        phase_err=out(phase_err),
+        chi2=out(chi2),
+        dof=out(dof),
+    )
@@ -0,0 +1,17 @@
+from typing import Tuple
+
+import numpy as np
+
+
+def as_stack(rho) -> Tuple[np.ndarray, tuple]:
+    """Density matrices of shape (..., 4, 4) as a (K, 4, 4) complex stack, plus the leading shape."""
+    rho = np.asarray(rho)
+    if rho.shape[-2:] != (4, 4):
+        raise ValueError(f"Expected two-qubit density matrices of shape (..., 4, 4), got {rho.shape}")
+    return rho.reshape(-1, 4, 4).astype(complex, copy=False), rho.shape[:-2]
+
+
+def unstack(values: np.ndarray, shape: tuple):
+    """Per-matrix values back in the leading shape (a float for a single matrix)."""
+    values = values.reshape(shape)
+    return float(values) if shape == () else values
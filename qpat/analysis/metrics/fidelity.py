@@ -0,0 +1,60 @@
+"""Fidelity of two-qubit density matrices.
+
+All functions take a single (4, 4) matrix or a stack of shape (..., 4, 4) and
+return one value per matrix.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+from qpat.analysis.metrics._stacks import as_stack, unstack
+from qpat.simulation.adapters.components.light_source import SPDCBellSource
+
+
+def state_fidelity(rho, psi):
+    """Fidelity <psi|rho|psi> with the pure state `psi` (4-vector)."""
+    stack, shape = as_stack(rho)
+    psi = np.asarray(psi, dtype=complex)
+    values = np.einsum("i,kij,j->k", psi.conj(), stack, psi).real
+    return unstack(values, shape)
+
+
+def bell_fidelity(rho, bell_state: str = "psi+"):
+    """
+    Fidelity with a Bell state of `SPDCBellSource.bell_state_map` ("phi+", "phi-", "psi+", "psi-").
+
+    A Bell state has two amplitudes +-1/sqrt(2) at indices (i, j), so
+    F = (rho_ii + rho_jj) / 2 + sign * Re(rho_ij).
+    """
+    try:
+        psi = np.asarray(SPDCBellSource.bell_state_map[bell_state], dtype=float)
+    except KeyError:
+        raise ValueError(f"Unknown Bell state '{bell_state}'")
+    stack, shape = as_stack(rho)
+    i, j = np.flatnonzero(psi)
+    sign = np.sign(psi[i] * psi[j])
+    values = 0.5 * (stack[:, i, i].real + stack[:, j, j].real) + sign * stack[:, i, j].real
+    return unstack(values, shape)
+
+
+def bell_fidelities(rho) -> Dict[str, np.ndarray]:
+    """Fidelity with each Bell state of `SPDCBellSource.bell_state_map`."""
+    return {label: bell_fidelity(rho, label) for label in SPDCBellSource.bell_state_map}
+
+
+def fidelity(rho, sigma):
+    """
+    Uhlmann fidelity (Tr sqrt(sqrt(rho) sigma sqrt(rho)))^2 of two stacks (broadcast).
+
+    sqrt(rho) comes from one batched eigendecomposition and the trace norm
+    from the eigenvalues of the Hermitian product.
+    """
+    rho, sigma = np.broadcast_arrays(np.asarray(rho), np.asarray(sigma))
+    stack, shape = as_stack(rho)
+    other, _ = as_stack(sigma)
+    values, vectors = np.linalg.eigh(stack)
+    root = (vectors * np.sqrt(np.clip(values, 0, None))[:, None, :]) @ vectors.conj().transpose(0, 2, 1)
+    product = np.linalg.eigvalsh(root @ other @ root)
+    result = np.sqrt(np.clip(product, 0, None)).sum(axis=1) ** 2
+    return unstack(result, shape)
@@ -0,0 +1,44 @@
+"""Negativity of two-qubit density matrices.
+
+The negativity is the magnitude of the negative eigenvalues of the partial
+transpose, N = (||rho^T_B||_1 - 1) / 2, and the logarithmic negativity
+E_N = log2 ||rho^T_B||_1. Takes a single (4, 4) matrix or a stack of shape
+(..., 4, 4); the partial transposes of the whole stack are diagonalized by
+one batched `numpy.linalg.eigvalsh` call.
+"""
+
+import numpy as np
+
+from qpat.analysis.metrics._stacks import as_stack, unstack
+
+
+def partial_transpose(rho, qubit: int = 1) -> np.ndarray:
+    """Partial transpose over `qubit` (0 = Alice, 1 = Bob)."""
+    stack, shape = as_stack(rho)
+    # indices [k, a, b, a', b']
+    blocks = stack.reshape(-1, 2, 2, 2, 2)
+    if qubit == 0:
+        blocks = blocks.transpose(0, 3, 2, 1, 4)
+    elif qubit == 1:
+        blocks = blocks.transpose(0, 1, 4, 3, 2)
+    else:
+        raise ValueError("qubit must be 0 or 1")
+    return blocks.reshape(shape + (4, 4))
+
+
+def negativity(rho):
+    """Negativity in [0, 1/2] of each density matrix."""
+    stack, shape = as_stack(rho)
+    values = _trace_norm_pt(stack)
+    return unstack((values - 1) / 2, shape)
+
+
+def log_negativity(rho):
+    """Logarithmic negativity log2 ||rho^T_B||_1 of each density matrix."""
+    stack, shape = as_stack(rho)
+    return unstack(np.log2(_trace_norm_pt(stack)), shape)
+
+
+def _trace_norm_pt(stack: np.ndarray) -> np.ndarray:
+    eigenvalues = np.linalg.eigvalsh(partial_transpose(stack))
+    return np.abs(eigenvalues).sum(axis=1)
@@ -0,0 +1,211 @@
+"""Maximum-likelihood two-qubit state tomography.
+
+The density matrix is reconstructed from the coincidence counts n_j of the
+projectors P_j of Pauli settings (see `pauli_projections`) by maximizing the
+log-likelihood
+
+    L(rho) = sum_j n_j log p_j(rho),    p_j(rho) = Tr(P_j rho)
+
+over rho = A A^dagger / Tr(A A^dagger), with A an unconstrained complex 4x4
+matrix (a full-rank generalization of the Cholesky factor), so every A gives a
+valid density matrix. The gradient is analytic:
+
+    dL/dA* = (R - N) A / Tr(A A^dagger),    R = sum_j n_j / p_j P_j,  N = sum_j n_j
+
+and L-BFGS starts from the linear-inversion estimate made positive definite.
+
+All functions take counts with any leading batch shape, (..., S, 4) or
+(..., 4 * S) for S settings. Count sets of a batch (bootstrap resamples, time
+slices, ...) are solved in chunks: the log-likelihoods of a chunk are summed
+into one separable objective, so a single optimizer run reconstructs them all.
+Count sets without any count carry no information and are estimated as the
+maximally mixed state I/4 (they are left out of the optimizer).
+"""
+
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.optimize import minimize
+
+from qpat.analysis.tomography.pauli_projections import measurement_matrix
+
+# Convergence threshold on the gradient of the (count-normalized) log-likelihood
+DEFAULT_TOL = 1e-6
+DEFAULT_MAX_ITER = 10000
+# Count sets reconstructed by one optimizer run
+DEFAULT_CHUNK_SIZE = 64
+
+# Weight of the maximally mixed state in the starting point (keeps it full rank)
+_START_MIXING = 1e-3
+
+_MAXIMALLY_MIXED = np.eye(4) / 4
+
+
+def linear_inversion(counts, settings: Optional[Sequence[str]] = None) -> np.ndarray:
+    """
+    Least-squares (linear inversion) estimate of rho from the outcome frequencies.
+
+    The result is Hermitian with unit trace but not necessarily positive.
+
+    Returns:
+        np.ndarray: (..., 4, 4) complex density matrices.
+    """
+    counts, batch_shape, num_settings = _as_counts(counts, settings)
+    freqs = _frequencies(counts, num_settings)
+    rho = (freqs @ _inverse_matrix(settings).T).reshape(-1, 4, 4)
+    rho = 0.5 * (rho + rho.conj().transpose(0, 2, 1))
+    rho[_empty(counts)] = _MAXIMALLY_MIXED
+    rho /= np.trace(rho, axis1=1, axis2=2).real[:, None, None]
+    return rho.reshape(batch_shape + (4, 4))
+
+
+def reconstruct(
+    counts,
+    settings: Optional[Sequence[str]] = None,
+    tol: float = DEFAULT_TOL,
+    max_iter: int = DEFAULT_MAX_ITER,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> np.ndarray:
+    """
+    Maximum-likelihood density matrices from coincidence counts.
+
+    Args:
+        counts: (..., S, 4) or (..., 4 * S) counts, outcomes HH, HV, VH, VV per setting.
+        settings: the S settings, e.g. ["ZZ", "ZX", ...] (default: the 9 Pauli settings).
+        tol: gradient tolerance of the log-likelihood divided by the total count.
+        max_iter: maximum number of optimizer iterations per chunk.
+        chunk_size: number of count sets optimized together.
+
+    Returns:
+        np.ndarray: (..., 4, 4) complex density matrices.
+    """
+    counts, batch_shape, _ = _as_counts(counts, settings)
+    start = _positive(linear_inversion(counts, settings).reshape(-1, 4, 4))
+
+    rho = start.copy()
+    rows = np.flatnonzero(~_empty(counts))
+    for lo in range(0, len(rows), max(1, int(chunk_size))):
+        chunk = rows[lo:lo + max(1, int(chunk_size))]
+        rho[chunk] = _maximize(counts[chunk], start[chunk], measurement_matrix(settings), tol, max_iter)
+    return rho.reshape(batch_shape + (4, 4))
+
+
+def log_likelihood(rho, counts, settings: Optional[Sequence[str]] = None) -> np.ndarray:
+    """Log-likelihood sum_j n_j log Tr(P_j rho) of `counts` for density matrices `rho`."""
+    counts, batch_shape, _ = _as_counts(counts, settings)
+    rho = np.broadcast_to(rho, batch_shape + (4, 4)).reshape(-1, 16)
+    p = (rho @ measurement_matrix(settings).T).real
+    terms = np.where(counts > 0, counts * np.log(np.maximum(p, 1e-300)), 0.0)
+    return terms.sum(axis=1).reshape(batch_shape)
+
+
+def bootstrap(
+    counts,
+    num_samples: int,
+    rng: Optional[np.random.Generator] = None,
+    settings: Optional[Sequence[str]] = None,
+    **kwargs,
+) -> np.ndarray:
+    """
+    Reconstructions of multinomial resamples of one count set (for error bars).
+
+    Each setting is resampled with its own total count.
+
+    Returns:
+        np.ndarray: (num_samples, 4, 4) density matrices.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    counts, batch_shape, num_settings = _as_counts(counts, settings)
+    if batch_shape != ():
+        raise ValueError("bootstrap expects a single count set")
+    per_setting = counts.reshape(num_settings, 4)
+    totals = per_setting.sum(axis=1).astype(np.int64)
+    probs = per_setting / np.maximum(totals, 1)[:, None]
+    samples = rng.multinomial(totals, probs, size=(num_samples, num_settings))
+    return reconstruct(samples, settings, **kwargs)
+
+
+def _as_counts(counts, settings) -> Tuple[np.ndarray, tuple, int]:
+    """Counts as a (batch, 4 * S) float array, plus the batch shape and S."""
+    num_settings = len(measurement_matrix(settings)) // 4
+    counts = np.asarray(counts, dtype=float)
+    if counts.shape[-2:] == (num_settings, 4):
+        batch_shape = counts.shape[:-2]
+    elif counts.shape[-1:] == (4 * num_settings,):
+        batch_shape = counts.shape[:-1]
+    else:
+        raise ValueError(
+            f"Counts of shape {counts.shape} do not match {num_settings} settings x 4 outcomes"
+        )
+    if np.any(counts < 0):
+        raise ValueError("Counts must be non-negative")
+    return counts.reshape(-1, 4 * num_settings), batch_shape, num_settings
+
+
+def _empty(counts: np.ndarray) -> np.ndarray:
+    """Count sets (rows) without any count."""
+    return ~np.any(counts > 0, axis=1)
+
+
+def _frequencies(counts: np.ndarray, num_settings: int) -> np.ndarray:
+    per_setting = counts.reshape(len(counts), num_settings, 4)
+    totals = per_setting.sum(axis=2, keepdims=True)
+    freqs = np.divide(per_setting, totals, out=np.zeros_like(per_setting), where=totals > 0)
+    return freqs.reshape(len(counts), -1)
+
+
+def _inverse_matrix(settings) -> np.ndarray:
+    return _pinv(None if settings is None else tuple(settings))
+
+
+@lru_cache(maxsize=None)
+def _pinv(settings) -> np.ndarray:
+    inverse = np.linalg.pinv(measurement_matrix(settings))
+    inverse.setflags(write=False)
+    return inverse
+
+
+def _maximize(counts: np.ndarray, start: np.ndarray, matrix: np.ndarray, tol: float, max_iter: int) -> np.ndarray:
+    """Maximize the summed log-likelihoods of a chunk of count sets with L-BFGS."""
+    num = len(counts)
+    weights = counts / np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    ops = matrix.reshape(-1, 4, 4).transpose(0, 2, 1).reshape(len(matrix), 16)
+
+    def factors(x):
+        return (x[: 16 * num] + 1j * x[16 * num:]).reshape(num, 4, 4)
+
+    def objective(x):
+        a = factors(x)
+        rho = a @ a.conj().transpose(0, 2, 1)
+        trace = np.trace(rho, axis1=1, axis2=2).real
+        p = (rho.reshape(num, 16) @ matrix.T).real / trace[:, None]
+        p = np.where(weights > 0, np.maximum(p, 1e-300), 1.0)
+        value = -(weights * np.log(p)).sum()
+        r = ((weights / p) @ ops).reshape(num, 4, 4)
+        # gradient w.r.t. (Re A, Im A) is 2 dL/dA*
+        grad = (2 * (a - r @ a) / trace[:, None, None]).reshape(-1)
+        return value, np.concatenate([grad.real, grad.imag])
+
+    # A = V sqrt(D) for rho = V D V^dagger
+    values, vectors = np.linalg.eigh(start)
+    a0 = (vectors * np.sqrt(values)[:, None, :]).reshape(-1)
+    result = minimize(
+        objective,
+        np.concatenate([a0.real, a0.imag]),
+        jac=True,
+        method="L-BFGS-B",
+        options={"maxiter": max_iter, "gtol": tol, "ftol": 0.0, "maxcor": 10},
+    )
+    a = factors(result.x)
+    rho = a @ a.conj().transpose(0, 2, 1)
+    return rho / np.trace(rho, axis1=1, axis2=2).real[:, None, None]
+
+
+def _positive(rho: np.ndarray) -> np.ndarray:
+    """Closest full-rank density matrices: negative eigenvalues clipped, then mixed with I/4."""
+    values, vectors = np.linalg.eigh(rho)
+    values = np.clip(values, 0.0, None)
+    values /= np.maximum(values.sum(axis=1, keepdims=True), 1e-300)
+    values = (1 - _START_MIXING) * values + _START_MIXING / 4
+    return np.einsum("nij,nj,nkj->nik", vectors, values, vectors.conj())
@@ -0,0 +1,105 @@
+"""Projectors of two-qubit Pauli-basis tomography.
+
+Each analyzer measures its photon in the Z (H/V), X (D/A) or Y (R/L) basis by
+rotating that basis onto the H/V ports of its PBS
+(`PolarizationAnalyzer.set_basis`). Outcome 0 is the H detector and outcome 1
+the V detector, so per basis the projected single-photon states are:
+
+    Z:  H = (1, 0)              V = (0, 1)
+    X:  D = (1, 1) / sqrt(2)    A = (1, -1) / sqrt(2)
+    Y:  R = (1, -i) / sqrt(2)   L = (1, i) / sqrt(2)
+
+A two-qubit setting is a pair of bases (Alice, Bob), e.g. "ZX". Settings are
+ordered Alice-major over BASES (ZZ, ZX, ZY, XZ, ...) and the four outcomes of a
+setting as HH, HV, VH, VV (Alice first), like the coincidence labels, so the
+9 settings give a (9, 4) array of 36 counts.
+"""
+
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+BASES = ("Z", "X", "Y")
+
+_S = 1 / np.sqrt(2)
+BASIS_STATES = {
+    "Z": np.array([[1, 0], [0, 1]], dtype=complex),
+    "X": np.array([[_S, _S], [_S, -_S]], dtype=complex),
+    "Y": np.array([[_S, -1j * _S], [_S, 1j * _S]], dtype=complex),
+}
+"""Rows are the states projected by outcome 0 (H detector) and outcome 1 (V detector)."""
+
+
+def basis_settings(bases: Iterable[str] = BASES) -> Tuple[str, ...]:
+    """All Alice x Bob settings over `bases`, Alice-major (9 for the three Pauli bases)."""
+    bases = tuple(bases)
+    return tuple(a + b for a in bases for b in bases)
+
+
+def single_qubit_projectors(basis: str) -> np.ndarray:
+    """(2, 2, 2) projectors of the two outcomes of `basis`."""
+    states = BASIS_STATES[_check_basis(basis)]
+    return np.einsum("oi,oj->oij", states, states.conj())
+
+
+def projectors(settings: Optional[Sequence[str]] = None) -> np.ndarray:
+    """
+    Two-qubit projectors of the given settings.
+
+    Args:
+        settings: two-letter settings such as "ZX" (default: all 9 Pauli settings).
+
+    Returns:
+        np.ndarray: read-only (len(settings), 4, 4, 4) array; [s, o] is the
+        projector of outcome o (HH, HV, VH, VV) of setting s.
+    """
+    return _projectors(_settings_key(settings))
+
+
+def measurement_matrix(settings: Optional[Sequence[str]] = None) -> np.ndarray:
+    """
+    (4 * len(settings), 16) matrix A with A @ rho.ravel() = outcome probabilities.
+
+    Rows follow the flattened (setting, outcome) order of `projectors`. Read-only.
+    """
+    return _measurement_matrix(_settings_key(settings))
+
+
+@lru_cache(maxsize=None)
+def _projectors(settings: Tuple[str, ...]) -> np.ndarray:
+    ops = np.empty((len(settings), 4, 4, 4), dtype=complex)
+    for s, (a, b) in enumerate(settings):
+        pa = single_qubit_projectors(a)
+        pb = single_qubit_projectors(b)
+        for o in range(4):
+            ops[s, o] = np.kron(pa[o // 2], pb[o % 2])
+    ops.setflags(write=False)
+    return ops
+
+
+@lru_cache(maxsize=None)
+def _measurement_matrix(settings: Tuple[str, ...]) -> np.ndarray:
+    ops = _projectors(settings).reshape(-1, 4, 4)
+    # Tr(P rho) = sum_ij P[j, i] rho[i, j]
+    matrix = np.ascontiguousarray(ops.transpose(0, 2, 1).reshape(len(ops), 16))
+    matrix.setflags(write=False)
+    return matrix
+
+
+def _settings_key(settings: Optional[Sequence[str]]) -> Tuple[str, ...]:
+    if settings is None:
+        return basis_settings()
+    key = tuple(str(s).upper() for s in settings)
+    for s in key:
+        if len(s) != 2:
+            raise ValueError(f"Setting '{s}' must name one basis per qubit, e.g. 'ZX'")
+        _check_basis(s[0])
+        _check_basis(s[1])
+    return key
+
+
+def _check_basis(basis: str) -> str:
+    if basis not in BASIS_STATES:
+        raise ValueError("Unknown basis. Use 'Z', 'X', or 'Y'.")
+    return basis
@@ -1,6 +1,8 @@
+import copy
 from abc import ABC, abstractmethod
 from qpat.simulation.engine import SimulationEngine
 from qpat.simulation.tasks import SimulationTask
+from qpat.simulation.view import SimulationView
 
 
 
@@ -13,22 +15,75 @@ class CapabilityResult:
 class Capability(ABC):
     """
     One independent experiment.
+
+    Event runs go through a `SimulationEngine` by default; setting `engine`
+    (e.g. to a `ReplayEngine` serving recorded tag files) runs the same
+    analysis on its results instead.
     """
 
-    def __init__(self, topology, builder):
+    def __init__(self, topology, builder, seed=None):
         self.topology = topology
         self.builder = builder
+        self.seed = seed  # int or numpy SeedSequence; None for fresh entropy
+        self.engine = None  # replaces the simulation engine when set
 
     @abstractmethod
     def run(self, **params) -> CapabilityResult:
         pass
 
-    def _run_engine(self, duration: float, tasks: list[SimulationTask]):
-        engine = SimulationEngine(
+    def _run_engine(self, duration: float, tasks: list[SimulationTask]) -> SimulationView:
+        engine = self.engine or SimulationEngine(
             topology=self.topology,
             topology_builder=self.builder,
+            seed=self.seed,
         )
 
-        sim = engine.run(duration, tasks=tasks)
+        return engine.run(duration, tasks=tasks)
+
+    @staticmethod
+    def _tag_files(view: SimulationView, nodes) -> dict:
+        """
+        Tag files of `nodes` (node -> path) when their detections are on disk.
+
+        Returns an empty dict when no node's detections are on disk; raises
+        ValueError when only some of them are, as they could not be analyzed
+        together.
+        """
+        tag_files = {node: view.tag_file(node) for node in nodes if view.tag_file(node) is not None}
+        if tag_files and len(tag_files) < len(nodes):
+            in_memory = [node for node in nodes if node not in tag_files]
+            raise ValueError(
+                f"Detections of {list(tag_files)} are in tag files but those of {in_memory} are not; "
+                f"set `tag_file` on every analyzer (or record every node)"
+            )
+        return tag_files
+
+    @staticmethod
+    def _run_coincidence_model(model, frequency: float):
+        """
+        Coincidence model of one run of a pulsed source.
+
+        Accidentals are counted one pulse period away by default: a model
+        without an `accidental_offset` is copied with the offset set to
+        1 / `frequency`, leaving the configured model unchanged for later runs.
+        """
+        if getattr(model, "accidental_offset", 0) is not None:
+            return model
+        if frequency is None:
+            raise ValueError("Set the coincidence model's accidental_offset or pass the source frequency")
+        model = copy.copy(model)
+        model.accidental_offset = 1 / frequency
+        return model
+
+    def _require(self, mode: str, **params) -> None:
+        """
+        Raise ValueError for missing (None) run parameters.
 
-        return sim
+        A replay (`engine` set) in "event" mode analyzes the recordings as
+        they are and needs none of them.
+        """
+        if self.engine is not None and mode == "event":
+            return
+        missing = [name for name, value in params.items() if value is None]
+        if missing:
+            raise ValueError(f"Missing run parameters {missing} for a '{mode}' run")
@@ -1,6 +1,9 @@
 from qpat.capabilities.polarization_analysis import PolarizationAnalysisCapability
+from qpat.capabilities.tomography import TomographyCapability
+from qpat.capabilities.hom import HOMCapability
 from qpat.analysis.coincidences.window_method import WindowCoincidenceModel
 from qpat.simulation.adapters.sequence_adapter import SequenceTopologyBuilder
+from qpat.simulation.replay import ReplayEngine
 
 
 class CapabilityFactory:
@@ -11,10 +14,26 @@ class CapabilityFactory:
     def __init__(self):
         self.builder = SequenceTopologyBuilder()
 
-    def create(self, capability_name: str, topology):
+    def create(self, capability_name: str, topology, seed=None, recordings=None):
         """
         Create and configure a capability instance.
+
+        Args:
+            capability_name: registered capability name.
+            topology: topology the capability runs on.
+            seed: seed (int or numpy SeedSequence) for the simulation RNGs.
+            recordings: node name -> recorded tag file; when given, the
+                capability analyzes these recordings instead of simulating
+                (see `ReplayEngine`).
         """
+        capability = self._create(capability_name, topology, seed)
+        if recordings:
+            if capability_name == "hom":
+                raise ValueError("The 'hom' capability does not support recordings")
+            capability.engine = ReplayEngine(topology, recordings, seed)
+        return capability
+
+    def _create(self, capability_name: str, topology, seed):
         if capability_name == "polarization_analysis":
             return PolarizationAnalysisCapability(
                 topology=topology,
@@ -23,6 +42,28 @@ class CapabilityFactory:
                 alice_name="Alice",
                 bob_name="Bob",
                 coincidence_model=WindowCoincidenceModel(window=1e-9),
+                seed=seed,
+            )
+
+        if capability_name == "tomography":
+            return TomographyCapability(
+                topology=topology,
+                builder=self.builder,
+                source_name="Source",
+                alice_name="Alice",
+                bob_name="Bob",
+                coincidence_model=WindowCoincidenceModel(window=1e-9),
+                seed=seed,
+            )
+
+        if capability_name == "hom":
+            return HOMCapability(
+                topology=topology,
+                builder=self.builder,
+                source_name="Source",
+                alice_name="Alice",
+                bob_name="Bob",
+                seed=seed,
             )
 
         raise ValueError(f"Unknown capability '{capability_name}'")
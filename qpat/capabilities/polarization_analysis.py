@@ -1,6 +1,11 @@
+import numpy as np
+
 from qpat.capabilities.base import Capability, CapabilityResult
-from qpat.analysis.coincidences.base import CoincidenceModel
+from qpat.analysis.coincidences.base import CoincidenceModel, CoincidenceCounts
+from qpat.analysis.coincidences.streaming import count_file_coincidences
+from qpat.simulation.analytic import AnalyticPolarizationModel
 from qpat.simulation.tasks import SimulationTask
+from qpat.simulation.timetags import TimeTagFile
 
 
 
@@ -19,62 +24,160 @@ class PolarizationAnalysisCapability(Capability):
         alice_name: str,
         bob_name: str,
         coincidence_model: CoincidenceModel,
+        seed=None,
     ):
-        super().__init__(topology, builder)
+        super().__init__(topology, builder, seed)
 
         self.source_name = source_name
         self.alice_name = alice_name
         self.bob_name = bob_name
         self.coincidence_model = coincidence_model
 
+    # Execution modes:
+    #   "event":      full event-by-event SeQUeNCe simulation
+    #   "analytic":   expected counts from the closed-form model (no photon events)
+    #   "sampled":    counts drawn from the closed-form model's probabilities
+    #   "crosscheck": event simulation, compared against the closed-form expectation
+    modes = ("event", "analytic", "sampled", "crosscheck")
+
     def run(
         self,
-        alice_angle: float,
-        bob_angle: float,
-        emission_time: float,
-        frequency: float,
+        alice_angle: float = None,
+        bob_angle: float = None,
+        emission_time: float = None,
+        frequency: float = None,
+        mode: str = "event",
     ) -> CapabilityResult:
         """
         Run polarization coincidence measurement.
 
+        All parameters are required, except when replaying recordings in
+        "event" mode: the recordings fix the analyzer angles, `emission_time`
+        defaults to their length and `frequency` is only needed for the
+        default accidentals offset.
+
         Args:
             alice_angle: analyzer angle at Alice
             bob_angle: analyzer angle at Bob
             emission_time: seconds
             frequency: source emission frequency (Hz)
+            mode: execution mode (see `modes`)
         """
+        if mode not in self.modes:
+            raise ValueError(f"Unknown mode '{mode}'")
+        self._require(mode, alice_angle=alice_angle, bob_angle=bob_angle,
+                      emission_time=emission_time, frequency=frequency)
 
         # ---- 1. Configure analyzers ----
-        self.topology.nodes[self.alice_name].params["hwp_angle"] = alice_angle
-        self.topology.nodes[self.bob_name].params["hwp_angle"] = bob_angle
+        if alice_angle is not None:
+            self.topology.nodes[self.alice_name].params["hwp_angle"] = alice_angle
+        if bob_angle is not None:
+            self.topology.nodes[self.bob_name].params["hwp_angle"] = bob_angle
 
         # ---- 2. Configure source ----
-        self.topology.nodes[self.source_name].params["frequency"] = frequency
-
-        num_pulses = int(emission_time) * int(frequency)
-
-        tasks = [
+        if frequency is not None:
+            self.topology.nodes[self.source_name].params["frequency"] = frequency
+
+        coincidence_model = self._run_coincidence_model(self.coincidence_model, frequency)
+
+        if mode in ("analytic", "sampled"):
+            model = self._analytic_model()
+            if mode == "analytic":
+                counts = model.expected(emission_time, coincidence_model)
+            else:
+                counts = model.sample(emission_time, coincidence_model, np.random.default_rng(self.seed))
+            return self._result(coincidence_model, counts.coincidences, counts.singles_alice, counts.singles_bob,
+                                emission_time)
+
+        result = self._run_events(coincidence_model, emission_time, frequency)
+        if mode == "crosscheck":
+            expected = self._analytic_model().expected(emission_time, coincidence_model)
+            result.metadata["crosscheck"] = crosscheck(result.metadata, self._metadata(
+                expected.coincidences, expected.singles_alice, expected.singles_bob))
+        return result
+
+    def _run_events(self, coincidence_model: CoincidenceModel, emission_time: float,
+                    frequency: float) -> CapabilityResult:
+        # a replay without emission parameters ignores the tasks anyway
+        tasks = [] if emission_time is None or frequency is None else [
             SimulationTask(
                 target=self.source_name,
                 method="emit",
-                args=(num_pulses,),
+                args=(int(round(emission_time * frequency)),),
                 time=0.0,
             ),
         ]
 
         # ---- 3. Run simulation ----
-        sim_topology = self._run_engine(duration=emission_time*1e12, tasks=tasks,)
-        # ---- 4. Extract detection events from detectors ----
-        alice_times = sim_topology.nodes[self.alice_name].get_detection_counts()
-        bob_times   = sim_topology.nodes[self.bob_name].get_detection_counts()
-
-        counts_A = alice_times
-        counts_B = bob_times
-        print(f"Counts A: {len(counts_A[0]+counts_A[1])}")
-        print(f"Counts B: {len(counts_B[0])}")
-
-        # 4. Offline coincidence analysis
-        coincidences = self.coincidence_model.compute(alice_times, bob_times)
-        rate = self.coincidence_model.rate(coincidences, emission_time)
+        view = self._run_engine(duration=None if emission_time is None else emission_time*1e12, tasks=tasks,)
+        if emission_time is None:
+            emission_time = view.metadata["replay_end"] * 1e-12
+        tag_files = self._tag_files(view, [self.alice_name, self.bob_name])
+        if tag_files:
+            # ---- 4/5. Detections streamed to tag files: count them from disk ----
+            with TimeTagFile(tag_files[self.alice_name]) as alice, TimeTagFile(tag_files[self.bob_name]) as bob:
+                coincidences, singles_A, singles_B = count_file_coincidences(
+                    coincidence_model, alice, bob, duration=emission_time
+                )
+        else:
+            # ---- 4. Extract detection events from the results view ----
+            alice_times = view.detection_times(self.alice_name)
+            bob_times   = view.detection_times(self.bob_name)
+
+            singles_A = [len(t) for t in alice_times]
+            singles_B = [len(t) for t in bob_times]
+
+            # ---- 5. Offline coincidence analysis ----
+            coincidences = coincidence_model.compute(alice_times, bob_times, duration=emission_time)
+        print(f"Counts A: {sum(singles_A)}")
+        print(f"Counts B: {sum(singles_B)}")
+        result = self._result(coincidence_model, coincidences, singles_A, singles_B, emission_time)
+        if "drift" in view.metadata:
+            result.metadata["drift"] = view.metadata["drift"]
+        return result
+
+    def _analytic_model(self) -> AnalyticPolarizationModel:
+        return AnalyticPolarizationModel(self.topology, self.source_name, self.alice_name, self.bob_name)
+
+    def _result(self, coincidence_model: CoincidenceModel, coincidences: CoincidenceCounts,
+                singles_A, singles_B, emission_time: float) -> CapabilityResult:
+        rate = coincidence_model.rate(coincidences, emission_time)
+        return CapabilityResult(rate, metadata=self._metadata(coincidences, singles_A, singles_B))
+
+    def _metadata(self, coincidences: CoincidenceCounts, singles_A, singles_B) -> dict:
+        return {
+            "coincidences": coincidences.counts,
+            "accidentals": coincidences.accidentals,
+            "accidentals_singles": coincidences.accidentals_singles,
+            "accidentals_offset": coincidences.accidentals_offset,
+            "corrected": coincidences.corrected,
+            "singles": {self.alice_name: list(singles_A), self.bob_name: list(singles_B)},
+        }
+
+
+def crosscheck(observed: dict, expected: dict) -> dict:
+    """
+    Compare observed counts with their expectation.
 
-        return CapabilityResult(rate)
+    For every coincidence label and singles channel the Poisson z-score
+    (observed - expected) / sqrt(expected) is reported; |z| of a few units is
+    consistent with statistical fluctuations.
+    """
+    z = {}
+    for label, mean in expected["coincidences"].items():
+        z[label] = _z_score(observed["coincidences"][label], mean)
+    for node, means in expected["singles"].items():
+        for i, mean in enumerate(means):
+            z[f"{node}[{i}]"] = _z_score(observed["singles"][node][i], mean)
+
+    return {
+        "expected": {"coincidences": expected["coincidences"], "singles": expected["singles"]},
+        "z": z,
+        "max_abs_z": max(abs(v) for v in z.values()),
+    }
+
+
+def _z_score(observed: float, expected: float) -> float:
+    if expected <= 0:
+        return 0.0 if observed == 0 else float("inf")
+    return (observed - expected) / np.sqrt(expected)
@@ -0,0 +1,150 @@
+import numpy as np
+
+from qpat.capabilities.base import Capability, CapabilityResult
+from qpat.analysis.coincidences.base import CoincidenceModel
+from qpat.analysis.coincidences.streaming import count_file_coincidence_sets
+from qpat.analysis.tomography import mle
+from qpat.analysis.tomography.pauli_projections import BASES, basis_settings
+from qpat.simulation.tasks import SimulationTask
+from qpat.simulation.timetags import TimeTagFile
+
+
+class TomographyCapability(Capability):
+    """
+    Two-qubit polarization state tomography from a single emission.
+
+    Alice's and Bob's analyzers are switched to a passive basis choice over
+    the Pauli bases (see `PolarizationAnalyzer`): every photon is analyzed in
+    a randomly chosen basis, so one emission fills all 9 Alice x Bob settings
+    (each with about 1/9 of the pairs), as in a passive-basis-choice setup.
+
+    The result value is the (9, 4) coincidence counts tensor, settings
+    ordered as `pauli_projections.basis_settings()` and outcomes as
+    HH, HV, VH, VV, ready for `mle.reconstruct`.
+    """
+
+    name = "tomography"
+
+    def __init__(
+        self,
+        topology,
+        builder,
+        source_name: str,
+        alice_name: str,
+        bob_name: str,
+        coincidence_model: CoincidenceModel,
+        seed=None,
+    ):
+        super().__init__(topology, builder, seed)
+
+        self.source_name = source_name
+        self.alice_name = alice_name
+        self.bob_name = bob_name
+        self.coincidence_model = coincidence_model
+
+    def run(self, emission_time: float = None, frequency: float = None, reconstruct: bool = False) -> CapabilityResult:
+        """
+        Run tomography coincidence measurement.
+
+        Both `emission_time` and `frequency` are required, except when
+        replaying recordings: `emission_time` then defaults to their length
+        and `frequency` is only needed for the default accidentals offset.
+
+        Args:
+            emission_time: seconds
+            frequency: source emission frequency (Hz)
+            reconstruct: also add the maximum-likelihood density matrix to the metadata
+        """
+        self._require("event", emission_time=emission_time, frequency=frequency)
+
+        # ---- 1. Configure analyzers and source ----
+        self.topology.nodes[self.alice_name].params["bases"] = list(BASES)
+        self.topology.nodes[self.bob_name].params["bases"] = list(BASES)
+        if frequency is not None:
+            self.topology.nodes[self.source_name].params["frequency"] = frequency
+
+        coincidence_model = self._run_coincidence_model(self.coincidence_model, frequency)
+
+        # ---- 2. One emission for all settings ----
+        # a replay without emission parameters ignores the tasks anyway
+        tasks = [] if emission_time is None or frequency is None else [
+            SimulationTask(
+                target=self.source_name,
+                method="emit",
+                args=(int(round(emission_time * frequency)),),
+                time=0.0,
+            ),
+        ]
+        view = self._run_engine(duration=None if emission_time is None else emission_time*1e12, tasks=tasks)
+        if emission_time is None:
+            emission_time = view.metadata["replay_end"] * 1e-12
+        tag_files = self._tag_files(view, [self.alice_name, self.bob_name])
+        from_files = bool(tag_files)
+        if from_files:
+            # detections streamed to tag files: analyze them from disk
+            alice_file = TimeTagFile(tag_files[self.alice_name])
+            bob_file = TimeTagFile(tag_files[self.bob_name])
+            _check_labels(alice_file)
+            _check_labels(bob_file)
+            singles = {self.alice_name: _file_singles(alice_file), self.bob_name: _file_singles(bob_file)}
+        else:
+            alice_times = {b: view.detection_times(self.alice_name, _channels(b)) for b in BASES}
+            bob_times = {b: view.detection_times(self.bob_name, _channels(b)) for b in BASES}
+            singles = {
+                self.alice_name: {b: [len(t) for t in times] for b, times in alice_times.items()},
+                self.bob_name: {b: [len(t) for t in times] for b, times in bob_times.items()},
+            }
+
+        # ---- 3. Coincidences of every Alice x Bob basis pair ----
+        settings = basis_settings()
+        if from_files:
+            # one pass over both files for all settings
+            results = [result for result, _, _ in count_file_coincidence_sets(
+                coincidence_model, alice_file, bob_file,
+                [(_channels(a), _channels(b)) for a, b in settings], duration=emission_time,
+            )]
+            alice_file.close()
+            bob_file.close()
+        else:
+            results = [
+                coincidence_model.compute(alice_times[a], bob_times[b], duration=emission_time)
+                for a, b in settings
+            ]
+
+        counts = np.zeros((len(settings), 4), dtype=np.int64)
+        accidentals = np.zeros((len(settings), 4))
+        coincidences = {}
+        for s, (setting, result) in enumerate(zip(settings, results)):
+            coincidences[setting] = result.counts
+            counts[s] = list(result.counts.values())
+            accidentals[s] = list(result.accidentals.values())
+
+        metadata = {
+            "settings": list(settings),
+            "coincidences": coincidences,
+            "accidentals": accidentals,
+            "singles": singles,
+        }
+        if "drift" in view.metadata:
+            metadata["drift"] = view.metadata["drift"]
+        if reconstruct:
+            metadata["density_matrix"] = mle.reconstruct(counts)
+        return CapabilityResult(counts, metadata=metadata)
+
+
+def _channels(basis: str) -> list:
+    """Analyzer channel labels of the two detectors of a passive-choice basis."""
+    return [f"{basis}.H", f"{basis}.V"]
+
+
+def _check_labels(tag_file: TimeTagFile) -> None:
+    """Raise ValueError unless the tag file holds the channels of a passive-choice analyzer."""
+    expected = tuple(c for b in BASES for c in _channels(b))
+    if not set(expected) <= set(tag_file.labels):
+        raise ValueError(f"Tag file '{tag_file.path}' has channels {tag_file.labels}; expected {expected}")
+
+
+def _file_singles(tag_file: TimeTagFile) -> dict:
+    """Singles per basis and detector of an analyzer's tag file."""
+    counts = tag_file.channel_counts()
+    return {b: [int(counts[tag_file.channel_id(c)]) for c in _channels(b)] for b in BASES}
@@ -1,5 +1,12 @@
-from typing import List
-from qpat.experiment.workflow import Workflow
+import itertools
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from qpat.experiment.workflow import Workflow, Step
 from qpat.capabilities.factory import CapabilityFactory
 
 def _coerce_params(self, params: dict) -> dict:
@@ -16,39 +23,130 @@ def _coerce_params(self, params: dict) -> dict:
     return clean
 
 
+# Per-process factory used by pool workers (created once per worker)
+_worker_factory: Optional[CapabilityFactory] = None
+
+
+def _init_worker():
+    global _worker_factory
+    _worker_factory = CapabilityFactory()
+
+
+def _step_topology(topology, index: int):
+    """Clone of `topology` for step `index`, whose tag files get the step index so steps never share one."""
+    topology = topology.clone()  # important: isolation
+    for node in topology.nodes.values():
+        path = node.params.get("tag_file")
+        if path:
+            root, ext = os.path.splitext(path)
+            node.params["tag_file"] = f"{root}.step{index}{ext}"
+    return topology
+
+
+def _execute_step(factory: CapabilityFactory, topology, step: Step, seed, index: int):
+    # Recorded tag files (node -> path) replace the simulation
+    params = dict(step.params)
+    recordings = params.pop("recordings", None)
+
+    # Create capability on demand
+    topology = _step_topology(topology, index)
+    capability = factory.create(
+        step.capability,
+        topology=topology,
+        seed=seed,
+        recordings=recordings,
+    )
+
+    # Execute experiment
+    clean_params = _coerce_params(None, params)
+    result = capability.run(**clean_params)
+
+    # Record the sweep point the step came from
+    if step.coords:
+        result.metadata["sweep"] = dict(step.coords)
+    tag_files = {name: node.params["tag_file"] for name, node in topology.nodes.items() if node.params.get("tag_file")}
+    if tag_files:
+        result.metadata["tag_files"] = tag_files
+    return result
+
+
+def _execute_step_in_worker(topology, step: Step, seed, index: int):
+    return _execute_step(_worker_factory, topology, step, seed, index)
+
+
 class ExperimentOrchestrator:
     """
     Orchestrates experiments from topology + workflow.
+
+    Steps of a phase are independent (each gets its own topology clone and
+    capability), so with `workers > 1` they run concurrently in a process pool.
+    Every step receives its own child of the root `seed`, in workflow order,
+    so results are reproducible and identical for any number of workers.
+
+    Sweep steps are expanded lazily: concrete steps are generated as they
+    are scheduled, with at most `2 * workers` of them in flight.
+
+    Analyzer `tag_file` paths are made unique per step: step i (counted over
+    all phases, in workflow order) writes "<root>.step<i><ext>", listed in
+    its result's metadata["tag_files"].
     """
 
-    def __init__(self, topology, workflow: Workflow):
+    def __init__(self, topology, workflow: Workflow, workers: int = 1, seed: Optional[int] = None):
+        """
+        Args:
+            topology: experiment topology.
+            workflow: phases and steps to run.
+            workers: number of worker processes (1 runs steps sequentially in-process).
+            seed: root seed of the per-step RNG seeds (None for fresh entropy).
+        """
         self.topology = topology
         self.workflow = workflow
+        self.workers = max(1, int(workers))
+        self.seed = seed
         self.cap_factory = CapabilityFactory()
 
     def run(self):
         results = []
+        seeds = np.random.SeedSequence(self.seed)
+        indices = itertools.count()
 
         for phase in self.workflow.phases:
             print(f"[Experiment] Phase '{phase.name}' started")
 
-            for step in phase.steps:
-                print(
-                    f"[Experiment] Step: capability={step.capability}, "
-                    f"params={step.params}"
-                )
-
-                # Create capability on demand
-                capability = self.cap_factory.create(
-                    step.capability,
-                    topology=self.topology.clone(),  # important: isolation
-                )
-
-                # Execute experiment
-                clean_params = _coerce_params(self, step.params)
-                result = capability.run(**clean_params)
-                results.append(result)
+            steps = phase.iter_steps()
+            if self.workers > 1:
+                results.extend(self._run_parallel(steps, seeds, indices, len(phase)))
+            else:
+                for step in steps:
+                    print(
+                        f"[Experiment] Step: capability={step.capability}, "
+                        f"params={step.params}"
+                    )
+                    seed = seeds.spawn(1)[0]
+                    results.append(_execute_step(self.cap_factory, self.topology, step, seed, next(indices)))
 
             print(f"[Experiment] Phase '{phase.name}' completed")
 
         return results
+
+    def _run_parallel(self, steps: Iterable[Step], seeds, indices: Iterator[int], num_steps: int) -> Iterator:
+        """
+        Run the steps of one phase in a process pool, yielding results in step order.
+
+        Steps are pulled from `steps` only when a slot frees up, so a large
+        sweep is never materialized at once.
+        """
+        print(f"[Experiment] Running {num_steps} steps on {self.workers} workers")
+        max_pending = 2 * self.workers
+        steps = iter(steps)
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+            pending = deque()
+            for step in steps:
+                seed = seeds.spawn(1)[0]
+                pending.append(pool.submit(_execute_step_in_worker, self.topology, step, seed, next(indices)))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
@@ -34,6 +34,8 @@ def load_topology_yaml(path: str) -> Topology:
             dst=l["dst"],
             distance=float(l.get("distance", 0.0)),
             attenuation=float(l.get("attenuation", 0.0)),
+            dispersion=float(l.get("dispersion", 0.0)),
+            drift=l.get("drift", {}) or {},
             model=l.get("model", "ideal"),
             model_params=l.get("model_params", {}) or {},
         )
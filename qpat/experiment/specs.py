@@ -50,6 +50,8 @@ class QuantumLinkSpec(Spec):
 
     distance: float = 0.0          # meters
     attenuation: float = 0.0       # dB/m
+    dispersion: float = 0.0        # ps/(nm km)
+    drift: Dict[str, Any] = field(default_factory=dict)   # polarization drift: rate, slice_duration, seed
 
     model: Literal["ideal", "bifrost"] = "ideal"
     model_params: Dict[str, Any] = field(default_factory=dict)
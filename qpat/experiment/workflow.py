@@ -1,17 +1,94 @@
-from dataclasses import dataclass
-from typing import Any, Dict, List
+from dataclasses import dataclass, field
+import itertools
+from typing import Any, Dict, Iterator, List, Literal
+
+
+@dataclass
+class Sweep:
+    """
+    One block of swept step parameters.
+
+    In "product" mode every combination of the axis values is produced;
+    in "zip" mode the axes advance together (all must have the same length).
+    """
+    axes: Dict[str, List[Any]]
+    mode: Literal["product", "zip"] = "product"
+
+    def __post_init__(self):
+        if self.mode not in ("product", "zip"):
+            raise ValueError(f"Unknown sweep mode '{self.mode}'")
+        if self.mode == "zip" and len({len(v) for v in self.axes.values()}) > 1:
+            raise ValueError("Zipped sweep axes must have the same length")
+
+    def __len__(self) -> int:
+        sizes = [len(v) for v in self.axes.values()]
+        if not sizes:
+            return 1
+        if self.mode == "zip":
+            return sizes[0]
+        n = 1
+        for size in sizes:
+            n *= size
+        return n
+
+    def points(self) -> Iterator[Dict[str, Any]]:
+        """Lazily yield the parameter values of each sweep point."""
+        names = list(self.axes)
+        combine = zip if self.mode == "zip" else itertools.product
+        for values in combine(*(self.axes[n] for n in names)):
+            yield dict(zip(names, values))
 
 
 @dataclass
 class Step:
     capability: str
     params: Dict[str, Any]
+    sweep: List[Sweep] = field(default_factory=list)
+    coords: Dict[str, Any] = field(default_factory=dict)  # sweep point this step came from
+
+    def __len__(self) -> int:
+        n = 1
+        for block in self.sweep:
+            n *= len(block)
+        return n
+
+    def expand(self) -> Iterator["Step"]:
+        """
+        Lazily yield one concrete step per sweep point.
+
+        Sweep blocks are combined as a cartesian product. Swept values
+        override `params`, and are recorded in the produced step's `coords`.
+        A step without sweep yields itself.
+        """
+        if not self.sweep:
+            yield self
+            return
+
+        for points in itertools.product(*(block.points() for block in self.sweep)):
+            coords = {}
+            for point in points:
+                coords.update(point)
+            yield Step(
+                capability=self.capability,
+                params={**self.params, **coords},
+                coords=coords,
+            )
+
 
 @dataclass
 class Phase:
     name: str
     steps: List[Step]
 
+    def __len__(self) -> int:
+        """Number of concrete steps after sweep expansion."""
+        return sum(len(step) for step in self.steps)
+
+    def iter_steps(self) -> Iterator[Step]:
+        """Lazily yield the concrete (sweep-expanded) steps of the phase."""
+        for step in self.steps:
+            yield from step.expand()
+
 
 @dataclass
 class Workflow:
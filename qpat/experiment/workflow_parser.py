@@ -1,10 +1,21 @@
 import yaml
-from qpat.experiment.workflow import Workflow, Phase, Step
+from qpat.experiment.workflow import Workflow, Phase, Step, Sweep
 
 
 def load_workflow_yaml(path: str) -> Workflow:
     """
     Load a workflow YAML file into a Workflow object.
+
+    A step may carry a `sweep` section (a block or a list of blocks):
+
+        sweep:
+          mode: product            # or zip
+          axes:
+            alice_angle: {start: 0, stop: 90, step: 5}
+            bob_angle: [0, 45]
+
+    Blocks in a list are combined as a cartesian product. Steps are
+    expanded lazily with `Phase.iter_steps()`.
     """
     with open(path, "r") as f:
         data = yaml.safe_load(f)
@@ -25,6 +36,7 @@ def load_workflow_yaml(path: str) -> Workflow:
                 Step(
                     capability=s["capability"],
                     params=s.get("params", {}),
+                    sweep=_parse_sweep(s.get("sweep")),
                 )
             )
 
@@ -36,3 +48,55 @@ def load_workflow_yaml(path: str) -> Workflow:
         )
 
     return Workflow(phases=phases)
+
+
+def _parse_sweep(spec) -> list:
+    if not spec:
+        return []
+    blocks = spec if isinstance(spec, list) else [spec]
+
+    sweeps = []
+    for block in blocks:
+        if "axes" not in block:
+            raise ValueError("Sweep block missing 'axes' field")
+        sweeps.append(
+            Sweep(
+                axes={name: _parse_axis(name, values) for name, values in block["axes"].items()},
+                mode=block.get("mode", "product"),
+            )
+        )
+    return sweeps
+
+
+def _parse_axis(name: str, values) -> list:
+    """
+    Axis values are either an explicit list, or a range mapping:
+      {start, stop, step}: start, start + step, ... up to and including stop
+      {start, stop, num}:  num evenly spaced values including both ends
+    """
+    if isinstance(values, list):
+        return values
+    if not isinstance(values, dict):
+        return [values]
+
+    try:
+        start = float(values["start"])
+        stop = float(values["stop"])
+    except KeyError:
+        raise ValueError(f"Sweep axis '{name}' range needs 'start' and 'stop'")
+
+    if "num" in values:
+        num = int(values["num"])
+        if num == 1:
+            return [start]
+        return [start + i * (stop - start) / (num - 1) for i in range(num)]
+
+    if "step" in values:
+        step = float(values["step"])
+        if step == 0 or (stop - start) / step < 0:
+            raise ValueError(f"Sweep axis '{name}' step does not reach stop")
+        # tolerance so that e.g. 0..90 step 22.5 includes 90
+        num = int((stop - start) / step + 1e-9) + 1
+        return [start + i * step for i in range(num)]
+
+    raise ValueError(f"Sweep axis '{name}' range needs 'step' or 'num'")
@@ -0,0 +1,247 @@
+"""BIFROST fiber channel adapter.
+
+Links with `model: bifrost` get their loss and polarization response from a
+fiber model instead of the ideal `LinkModel`. The response of a link is a
+stack of Jones matrices, one per time slice, plus the transmission: photons
+arriving in slice s have their polarization transformed by jones[s], which
+is applied to whole batches of states at once (see `apply_jones`).
+
+Computing a response is the expensive part, so responses are content
+addressed: the key is a hash of the model, the link's distance and
+attenuation and its `model_params`, and each response is computed once and
+stored as `<key>.npz` in the cache directory. Builds and sweeps that use the
+same fiber load it from there (or from memory) instead.
+
+The fiber model is any callable `model(distance, attenuation, params)`
+returning a `FiberResponse`. The default, `local_fiber_response`, is a
+self-contained stand-in for BIFROST: the fiber is a chain of birefringent
+segments with random axes that drift as a random walk in time.
+
+model_params of the local model:
+    segment_length: mean length (m) of the birefringent segments (default 100).
+    beat_length: birefringence beat length (m) (default 10).
+    drift_rate: rms drift of each segment's axis angle (rad/sqrt(s)) (default 0).
+    duration: time span (s) covered by the response (default 1).
+    slice_duration: duration (s) of a time slice (default 0.01; one slice without drift).
+    seed: seed of the random fiber (default 0).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import tempfile
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from qpat.simulation.link_model import DriftModel, LinkModel, quaternion_jones, quaternion_product
+
+# Bump when the local model changes, so cached responses are recomputed
+LOCAL_MODEL_VERSION = 1
+
+# Segment rotations (slices x segments) built at once by the local model
+_CHUNK_ELEMENTS = 1 << 20
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "qpat", "bifrost")
+
+
+@dataclass
+class FiberResponse:
+    """
+    Loss and polarization response of a fiber.
+
+    Attributes:
+        jones: (S, 2, 2) complex Jones matrix of each time slice.
+        slice_duration: duration (ps) of a slice; photons arriving after the
+            last slice use the last matrix.
+        transmission: probability that a photon is not lost.
+    """
+    jones: np.ndarray
+    slice_duration: int
+    transmission: float
+
+    def jones_at(self, times: np.ndarray) -> np.ndarray:
+        """Jones matrices (N, 2, 2) of the slices containing `times` (ps)."""
+        times = np.asarray(times, dtype=np.int64)
+        index = np.clip(times // self.slice_duration, 0, len(self.jones) - 1)
+        return self.jones[index]
+
+    def save(self, path: str) -> None:
+        np.savez(path, jones=self.jones, slice_duration=self.slice_duration, transmission=self.transmission)
+
+    @classmethod
+    def load(cls, path: str) -> "FiberResponse":
+        with np.load(path) as data:
+            return cls(
+                jones=data["jones"],
+                slice_duration=int(data["slice_duration"]),
+                transmission=float(data["transmission"]),
+            )
+
+
+@dataclass
+class BifrostLinkModel(LinkModel):
+    """`LinkModel` whose loss and polarization come from a precomputed `FiberResponse`."""
+    response: Optional[FiberResponse] = None
+
+    @property
+    def transmission(self) -> float:
+        return self.response.transmission
+
+    def fiber_jones(self, times: np.ndarray) -> np.ndarray:
+        return self.response.jones_at(times)
+
+
+class BifrostAdapter:
+    """
+    Compute, cache and serve fiber responses for `bifrost` links.
+
+    Responses are kept in memory and in `cache_dir` (one `<key>.npz` per
+    response, written atomically so concurrent runs can share the directory).
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        model: Optional[Callable[[float, float, dict], FiberResponse]] = None,
+    ):
+        """
+        Args:
+            cache_dir: on-disk cache directory (default: $QPAT_CACHE_DIR/bifrost
+                if set, else ~/.cache/qpat/bifrost).
+            model: fiber model (default `local_fiber_response`).
+        """
+        if cache_dir is None:
+            env = os.environ.get("QPAT_CACHE_DIR")
+            cache_dir = os.path.join(env, "bifrost") if env else DEFAULT_CACHE_DIR
+        self.cache_dir = cache_dir
+        self.model = model or local_fiber_response
+        self._responses: Dict[str, FiberResponse] = {}
+
+    def link_model(self, spec) -> BifrostLinkModel:
+        """Link model of a `QuantumLinkSpec` with `model: bifrost`."""
+        return BifrostLinkModel(
+            distance=float(spec.distance),
+            attenuation=float(spec.attenuation),
+            dispersion=float(spec.dispersion),
+            drift=DriftModel.from_params(spec.drift),
+            response=self.response(spec.distance, spec.attenuation, spec.model_params),
+        )
+
+    def response(self, distance: float, attenuation: float, model_params: Optional[dict] = None) -> FiberResponse:
+        """Response of a fiber, computed only if neither the memory nor the disk cache has it."""
+        params = dict(model_params or {})
+        key = self.cache_key(distance, attenuation, params)
+        response = self._responses.get(key)
+        if response is not None:
+            return response
+
+        path = os.path.join(self.cache_dir, key + ".npz")
+        if os.path.exists(path):
+            response = FiberResponse.load(path)
+        else:
+            response = self.model(float(distance), float(attenuation), params)
+            self._store(path, response)
+        self._responses[key] = response
+        return response
+
+    def cache_key(self, distance: float, attenuation: float, model_params: dict) -> str:
+        """Content hash of the model and its inputs."""
+        content = {
+            "model": f"{self.model.__module__}.{self.model.__qualname__}",
+            "version": getattr(self.model, "version", None),
+            "distance": float(distance),
+            "attenuation": float(attenuation),
+            "params": model_params,
+        }
+        text = json.dumps(content, sort_keys=True, default=repr)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def clear_cache(self) -> None:
+        """Forget the responses held in memory (the disk cache is kept)."""
+        self._responses.clear()
+
+    def _store(self, path: str, response: FiberResponse) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                response.save(f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def local_fiber_response(distance: float, attenuation: float, params: dict) -> FiberResponse:
+    """
+    Stand-in fiber model: a chain of birefringent segments with drifting axes.
+
+    Each segment is a linear retarder of retardance 2 pi length / beat_length,
+    its length uniform within +-50% of the mean segment length. Its axis
+    angle starts uniformly random and performs a Gaussian random walk with
+    rms step drift_rate * sqrt(slice_duration).
+    The Jones matrix of a slice is the product of its segment matrices,
+    computed for all slices at once by pairwise (tree) products over chunks
+    of segments. The SU(2) products are done on unit quaternions (4 reals)
+    rather than complex 2x2 matrices.
+    """
+    segment_length = float(params.get("segment_length", 100.0))
+    beat_length = float(params.get("beat_length", 10.0))
+    drift_rate = float(params.get("drift_rate", 0.0))
+    duration = float(params.get("duration", 1.0))
+    slice_duration = float(params.get("slice_duration", 0.01))
+    rng = np.random.default_rng(int(params.get("seed", 0)))
+
+    num_segments = max(1, int(np.ceil(distance / segment_length)))
+    num_slices = max(1, int(np.ceil(duration / slice_duration))) if drift_rate > 0 else 1
+    if num_slices == 1:
+        slice_duration = duration
+
+    mean_length = distance / num_segments
+    total = np.zeros((num_slices, 4))
+    total[:, 0] = 1.0
+    chunk = max(1, _CHUNK_ELEMENTS // num_slices)
+    for first in range(0, num_segments, chunk):
+        size = min(chunk, num_segments - first)
+        # (slices, segments) axis angles: random start, then a random walk
+        steps = rng.normal(0.0, drift_rate * np.sqrt(slice_duration), size=(num_slices - 1, size))
+        angles = rng.uniform(0.0, np.pi, size=size) + np.concatenate([np.zeros((1, size)), np.cumsum(steps, axis=0)])
+        retardance = 2 * np.pi * mean_length * rng.uniform(0.5, 1.5, size=size) / beat_length
+        total = quaternion_product(_chain(_retarders(angles, retardance)), total)
+
+    return FiberResponse(
+        jones=quaternion_jones(total),
+        slice_duration=max(1, int(round(slice_duration * 1e12))),
+        transmission=10 ** (distance * attenuation / -10),
+    )
+
+
+local_fiber_response.version = LOCAL_MODEL_VERSION
+
+
+def _retarders(angles: np.ndarray, retardance) -> np.ndarray:
+    """
+    Linear retarders R(a) diag(e^{-i d/2}, e^{i d/2}) R(-a) at axis angles `angles`, as unit
+    quaternions (w, x, y, z) of U = w I - i (x sx + y sy + z sz).
+    """
+    half = 0.5 * retardance
+    out = np.zeros(angles.shape + (4,))
+    out[..., 0] = np.cos(half)
+    out[..., 1] = np.sin(half) * np.sin(2 * angles)
+    out[..., 3] = np.sin(half) * np.cos(2 * angles)
+    return out
+
+
+def _chain(quaternions: np.ndarray) -> np.ndarray:
+    """Product q[:, K-1] ... q[:, 0] of (S, K, 4) quaternions along K, by pairwise products."""
+    while quaternions.shape[1] > 1:
+        if quaternions.shape[1] % 2:
+            identity = np.zeros((len(quaternions), 1, 4))
+            identity[..., 0] = 1.0
+            quaternions = np.concatenate([quaternions, identity], axis=1)
+        quaternions = quaternion_product(quaternions[:, 1::2], quaternions[:, 0::2])
+    return quaternions[:, 0]
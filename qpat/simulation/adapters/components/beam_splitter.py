@@ -11,12 +11,15 @@ if TYPE_CHECKING:
     from sequence.kernel.timeline import Timeline
     from sequence.topology.node import Node
 
+import numpy as np
 from numpy import trace
 
 from sequence.components.photon import Photon
 from sequence.kernel.entity import Entity
 from sequence.utils.encoding import polarization
 
+from qpat.simulation.adapters.components.photon_batch import apply_operator, measure_qubit
+
 
 class FixedBasisBeamSplitter(Entity):
     """
@@ -52,4 +55,36 @@ class FixedBasisBeamSplitter(Entity):
                 result = 1 - result  # Flip 0 ↔ 1
             self._receivers[result].get(photon)
 
-            
\ No newline at end of file
+            
+
+    def measure_batch(self, states: np.ndarray, qubit: int) -> np.ndarray:
+        """
+        Vectorized `get`: measure `qubit` of every two-photon state in the fixed basis.
+
+        States are collapsed in place onto the measured basis vectors.
+
+        Args:
+            states: (N, 4) C-contiguous complex two-photon states.
+            qubit: index (0 or 1) of the photon arriving at this splitter.
+
+        Returns:
+            np.ndarray: output port per photon (0 or 1), -1 where the photon was not transmitted.
+        """
+        rng = self.get_generator()
+        basis = np.asarray(polarization["bases"][self.basis_index], dtype=complex)
+        change = None
+        if not np.allclose(basis, np.identity(2)):
+            # measure in the computational basis of the rotated states, then rotate back
+            change = np.kron(basis.conj(), np.identity(2)) if qubit == 0 else np.kron(np.identity(2), basis.conj())
+            states[:] = apply_operator(states, change)
+
+        outcomes = measure_qubit(states, qubit, rng)
+
+        if change is not None:
+            states[:] = apply_operator(states, change.conj().T)
+        if self.mismeasure_prob > 0:
+            flip = rng.random(len(outcomes)) < self.mismeasure_prob
+            outcomes[flip] = 1 - outcomes[flip]
+        if self.fidelity < 1:
+            outcomes[rng.random(len(outcomes)) >= self.fidelity] = -1
+        return outcomes
@@ -7,64 +7,192 @@ QSDetector is defined as an abstract template and as implementations for polariz
 """
 
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Any
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Optional
+import numpy as np
 from numpy import eye, kron, exp, sqrt
 from scipy.linalg import fractional_matrix_power
 from math import factorial
 
 from sequence.components.detector import QSDetector
-from sequence.components.detector import Detector
 from sequence.components.photon import Photon
+from sequence.kernel.entity import Entity
 
 from qpat.simulation.adapters.components.beam_splitter import FixedBasisBeamSplitter
+from qpat.simulation.detector_model import DetectorModel
+from qpat.simulation.timetags import TimeTagBuffer, DEFAULT_MAX_CAPACITY
 
 if TYPE_CHECKING:
     from sequence.kernel.timeline import Timeline
 
+# Arrivals recorded one photon at a time are handed to the detector model in
+# blocks of this size, so the event path never holds more than one block.
+ARRIVAL_FLUSH_TAGS = 1 << 16
+
+
+class ArrivalRecorder(Entity):
+    """
+    Front end of a detector: records the arrival time of every photon it receives.
+
+    The detector physics (efficiency, dark counts, jitter, dead time) is
+    applied later, on the recorded arrays, by the owning detector's `DetectorModel`.
+    Arrivals are held in a `TimeTagBuffer` with the owner's capacity limit and
+    overflow policy. Once `flush_tags` arrivals are pending, `flush` is called
+    with the time up to which they are complete.
+
+    Attributes:
+        arrivals (TimeTagBuffer): Arrival times not yet processed.
+        flush (Callable[[int], None]): Processes the pending arrivals up to a time (ps); None to keep them.
+        flush_tags (int): Number of pending arrivals that triggers `flush`.
+    """
+
+    def __init__(self, name: str, timeline: "Timeline",
+                 max_tags: int = DEFAULT_MAX_CAPACITY, overflow: str = "raise",
+                 flush: Optional[Callable[[int], None]] = None):
+        super().__init__(name, timeline)
+        self.arrivals = TimeTagBuffer(max_capacity=max_tags, overflow=overflow)
+        self.flush = flush
+        self.flush_tags = ARRIVAL_FLUSH_TAGS if max_tags is None else min(ARRIVAL_FLUSH_TAGS, max_tags)
+
+    def init(self) -> None:
+        self.arrivals.clear()
+
+    def get(self, photon: Photon = None, **kwargs) -> None:
+        now = self.timeline.now()
+        self.arrivals.append(now, 0)
+        if self.flush is not None and len(self.arrivals) >= self.flush_tags:
+            # arrivals come in time order: everything up to now is complete
+            self.flush(now + 1)
+
 
 class FixedBasisPolarizationDetector(QSDetector):
     """
     Polarization detector using a fixed-basis beam splitter.
 
+    Photons leaving the splitter are only time-stamped on arrival; the two
+    detectors are then simulated on whole arrays by a `DetectorModel`
+    (efficiency, bulk Poisson dark counts, Gaussian jitter, non-paralyzable
+    dead time, time resolution). Arrivals are processed when a photon batch
+    has been received, every `ARRIVAL_FLUSH_TAGS` arrivals on the event path
+    and, for the remaining time up to the end of the run, when the tags are
+    collected.
+
+    Detections are recorded into one `TimeTagBuffer` per detector (int64 ps
+    timestamps plus the detector index as channel id). Each buffer, and each
+    detector's buffer of unprocessed arrivals, holds at most `max_tags` tags;
+    beyond that the `overflow` policy applies ("raise" raises
+    OverflowError, "drop" discards new tags and counts them in the buffer's `dropped`).
+    With a `stream` (`TimeTagStream`) set, tags are instead handed to the
+    stream as soon as they are final, as channels `channel_offset` + detector index.
+
     Attributes:
-        detectors (list): Two detectors for orthogonal polarizations.
+        detectors (list[ArrivalRecorder]): Arrival recorders of the two orthogonal polarizations.
+        model (DetectorModel): Parameters and physics of both detectors.
         splitter (FixedBasisBeamSplitter): Measures photons in a fixed polarization basis.
-        trigger_times (list[list[int]]): List of detection timestamps for each detector.
+        tag_buffers (list[TimeTagBuffer]): Detection time tags for each detector.
+        stream (TimeTagStream): Destination of the tags when recording to a file (None: buffers).
+        channel_offset (int): Channel id of the first detector in `stream`.
     """
 
-    def __init__(self, name: str, timeline: "Timeline", basis_index: int = 0):
+    def __init__(self, name: str, timeline: "Timeline", basis_index: int = 0,
+                 max_tags: int = DEFAULT_MAX_CAPACITY, overflow: str = "raise",
+                 model: DetectorModel = None):
         """
         Args:
             name (str): Component name.
             timeline (Timeline): Simulation timeline.
             basis_index (int): 0 for H/V basis, 1 for +/- diagonal basis.
+            max_tags (int): Maximum number of tags kept per detector (None for unbounded).
+            overflow (str): Overflow policy once `max_tags` is reached ("raise" or "drop").
+            model (DetectorModel): Detector parameters (default `DetectorModel()`).
         """
         super().__init__(name, timeline)
 
-        self.detectors = []
-        for i in range(2):
-            d = Detector(f"{name}.detector{i}", timeline, efficiency=0.95, dark_count=500, time_resolution=150)
-            d.attach(self)
-            self.detectors.append(d)
+        self.model = model or DetectorModel()
+        self.detectors = [
+            ArrivalRecorder(f"{name}.detector{i}", timeline, max_tags=max_tags, overflow=overflow,
+                            flush=partial(self._process, i))
+            for i in range(2)
+        ]
 
         self.splitter = FixedBasisBeamSplitter(f"{name}.splitter", timeline, basis_index=basis_index)
         self.splitter.add_receiver(self.detectors[0])
         self.splitter.add_receiver(self.detectors[1])
 
-        self.trigger_times = [[], []]
+        self.tag_buffers = [TimeTagBuffer(max_capacity=max_tags, overflow=overflow) for _ in range(2)]
+        self.stream = None
+        self.channel_offset = 0
         self.components = [self.splitter] + self.detectors
 
     def init(self) -> None:
         assert len(self.detectors) == 2
         super().init()
+        # per detector: time up to which arrivals and dark counts are processed, end of dead time
+        self._processed_until = [0, 0]
+        self._next_detection = [-1, -1]
 
     def get(self, photon: Photon, **kwargs) -> None:
         self.splitter.get(photon)
 
+    def get_batch(self, states: np.ndarray, qubit: int, times: np.ndarray) -> None:
+        """
+        Vectorized `get` for an array of photons.
+
+        Measures `qubit` of every two-photon state at the beam splitter
+        (collapsing `states` in place) and runs the detector model on the
+        arrivals, without scheduling events.
+
+        Args:
+            states: (N, 4) complex two-photon states, already rotated by the analyzer.
+            qubit: index (0 or 1) of the detected photon in each pair.
+            times: arrival time (ps) of each photon, in time order.
+        """
+        outcomes = self.splitter.measure_batch(states, qubit)
+        times = np.asarray(times, dtype=np.int64)
+
+        for index, detector in enumerate(self.detectors):
+            hits = times[outcomes == index]
+            if len(hits):
+                detector.arrivals.extend(hits, 0)
+                # later batches arrive later: everything up to the last arrival is complete
+                self._process(index, int(hits[-1]) + 1)
+
+    def _process(self, index: int, until: int) -> None:
+        """Run the detector model on the arrivals of detector `index` up to `until` (ps)."""
+        start = self._processed_until[index]
+        if until <= start:
+            return
+        arrivals, _ = self.detectors[index].arrivals.drain()
+        tags, self._next_detection[index] = self.model.detect(
+            arrivals, self.get_generator(), start, until, self._next_detection[index]
+        )
+        self._processed_until[index] = until
+        if self.stream is not None:
+            self.stream.push(self.channel_offset + index, tags, until)
+        else:
+            self.tag_buffers[index].extend(tags, index)
+
+    def get_time_tags(self, until: int = None):
+        """
+        Hand over the recorded tags and reset the buffers.
+
+        Args:
+            until (int): time (ps) up to which the acquisition is complete
+                (default: the timeline's stop time).
+
+        Returns:
+            list[tuple[np.ndarray, np.ndarray]]: (timestamps, channels) per detector,
+            as zero-copy, time-sorted int64/uint8 array views.
+        """
+        if until is None:
+            until = self.timeline.stop_time
+        for index in range(len(self.detectors)):
+            self._process(index, until)
+        return [buffer.drain() for buffer in self.tag_buffers]
+
     def get_photon_times(self):
-        times = self.trigger_times
-        self.trigger_times = [[], []]
-        return times
+        """Hand over the recorded timestamps (one int64 array view per detector) and reset the buffers."""
+        return [timestamps for timestamps, _ in self.get_time_tags()]
 
     # Dummy methods for compatibility
     def set_basis_list(self, *args, **kwargs): pass
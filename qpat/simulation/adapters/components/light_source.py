@@ -1,3 +1,4 @@
+import numpy as np
 from numpy import multiply, sqrt
 from sequence.kernel.event import Event
 from sequence.kernel.process import Process
@@ -6,6 +7,8 @@ from sequence.utils.encoding import polarization
 from sequence.utils import log
 from sequence.kernel.entity import Entity
 
+from qpat.simulation.adapters.components.photon_batch import PhotonPairBatch
+
 class LightSource(Entity):
     """Model for a laser light source.
 
@@ -62,6 +65,26 @@ class LightSource(Entity):
         else:
             raise ValueError(f"Unknown photon_statistics mode: {self.photon_statistics}")
 
+    def sample_photon_pairs_batch(self, num_pulses: int) -> np.ndarray:
+        """Draw the number of photon pairs for `num_pulses` pulses in one NumPy call.
+
+        The draws come from the same generator and distribution as `sample_photon_pairs`,
+        so for a fixed seed the sequence of pair numbers is identical to calling it once per pulse.
+
+        Args:
+            num_pulses (int): number of pulses to sample.
+
+        Returns:
+            np.ndarray: int64 array of pair numbers, one per pulse.
+        """
+        if self.photon_statistics == "thermal":
+            p = 1 / (1 + self.mean_photon_num)
+            return self.get_generator().geometric(p, size=num_pulses).astype(np.int64) - 1
+        elif self.photon_statistics == "poisson":
+            return self.get_generator().poisson(self.mean_photon_num, size=num_pulses).astype(np.int64)
+        else:
+            raise ValueError(f"Unknown photon_statistics mode: {self.photon_statistics}")
+
     # for general use
     def emit(self, state_list) -> None:
         """Method to emit photons.
@@ -111,8 +134,17 @@ class SPDCBellSource(LightSource):
         bell_state_label (str): The label of the Bell state to emit ("phi+", "phi-", "psi+", "psi-").
         bell_state (tuple): The corresponding 4D state vector of the selected Bell state.
         wavelengths (list): List of two wavelengths (nm) for the photon pair.
+        emission_mode (str): "pulse" (one RNG call per pulse), "batch" (vectorized draws per block)
+            or "stream" (blocks scheduled one at a time as the timeline advances).
+        batch_size (int): number of pulses drawn per NumPy call in batch mode.
+        block_pulses (int): block size (in pulses) for stream mode.
+        block_duration (float): block size (in ps) for stream mode, used when `block_pulses` is not set.
+        vectorized (bool): in batch and stream modes, hand each block to the owner's `send_batch`
+            as a `PhotonPairBatch` instead of creating one photon pair (and events) per pair.
     """
 
+    emission_modes = ("pulse", "batch", "stream")
+
     bell_state_map = {
         "phi+": (1 / sqrt(2), 0, 0, 1 / sqrt(2)),
         "phi-": (1 / sqrt(2), 0, 0, -1 / sqrt(2)),
@@ -121,7 +153,9 @@ class SPDCBellSource(LightSource):
     }
 
     def __init__(self, name, timeline, wavelengths=None, frequency=8e7, mean_photon_num=0.1,
-                 encoding_type=polarization, phase_error=0, bandwidth=0, photon_statistics="thermal", bell_state="psi+"):
+                 encoding_type=polarization, phase_error=0, bandwidth=0, photon_statistics="thermal", bell_state="psi+",
+                 emission_mode="batch", batch_size=1_000_000, block_pulses=None, block_duration=None,
+                 vectorized=False):
         """
         Constructor for SPDCBellSource.
 
@@ -136,6 +170,12 @@ class SPDCBellSource(LightSource):
             bandwidth (float): Spectral bandwidth (currently unused).
             photon_statistics (str): Distribution for pair generation ("thermal" or "poisson").
             bell_state (str): Desired Bell state to emit ("phi+", "phi-", "psi+", "psi-").
+            emission_mode (str): "pulse", "batch" or "stream" (default "batch").
+            batch_size (int): Pulses per vectorized draw in batch mode (default 1e6).
+            block_pulses (int): Pulses per scheduled block in stream mode (optional).
+            block_duration (float): Duration (ps) of a scheduled block in stream mode (optional).
+                If neither block size is given, stream mode uses `batch_size` pulses per block.
+            vectorized (bool): Propagate batch/stream blocks as photon arrays (default False).
         """
         super().__init__(name, timeline, frequency, 0, bandwidth, mean_photon_num, encoding_type, phase_error, photon_statistics)
         self.wavelengths = wavelengths
@@ -143,6 +183,13 @@ class SPDCBellSource(LightSource):
             self.set_wavelength()
         self.bell_state_label = bell_state
         self.bell_state = self.bell_state_map[bell_state]
+        if emission_mode not in self.emission_modes:
+            raise ValueError(f"Unknown emission_mode: {emission_mode}")
+        self.emission_mode = emission_mode
+        self.batch_size = int(batch_size)
+        self.block_pulses = block_pulses
+        self.block_duration = block_duration
+        self.vectorized = vectorized
 
     def init(self):
         assert len(self._receivers) == 2, "SPDCBellSource source must connect to 2 receivers."
@@ -152,31 +199,108 @@ class SPDCBellSource(LightSource):
         Emit entangled photon pairs in the specified Bell state.
 
         Each pulse may emit zero or more photon pairs, depending on the
-        specified photon number distribution (thermal or Poisson).
+        specified photon number distribution (thermal or Poisson). In "pulse"
+        mode the pair numbers of `batch_size` pulses are drawn one pulse at a
+        time, then their pairs are propagated together.
 
         Args:
             num_pulses (int): Number of emission pulses (default is 1).
         """
-        time = self.timeline.now()
+        if self.emission_mode == "batch":
+            self.emit_batch(num_pulses)
+            return
+        if self.emission_mode == "stream":
+            self.emit_stream(num_pulses)
+            return
+
+        start = self.timeline.now()
         period = int(round(1e12 / self.frequency))
-        for _ in range(num_pulses):
-            num_pairs = self.sample_photon_pairs()
-            for _ in range(num_pairs):
-                new_photon0 = Photon("signal", self.timeline,
-                                     wavelength=self.wavelengths[0],
-                                     location=self,
-                                     encoding_type=self.encoding_type)
-                new_photon1 = Photon("idler", self.timeline,
-                                     wavelength=self.wavelengths[1],
-                                     location=self,
-                                     encoding_type=self.encoding_type)
-
-                new_photon0.combine_state(new_photon1)
-                new_photon0.set_state(self.bell_state)
-                self.send_photons(time, [new_photon0, new_photon1])
-                self.photon_counter += 1
-            time += period
-    
+        for first in range(0, num_pulses, self.batch_size):
+            # pair numbers are drawn pulse by pulse, but a whole block of them before
+            # any photon is propagated: the generator is used in the order of `emit_batch`
+            block = min(self.batch_size, num_pulses - first)
+            counts = np.array([self.sample_photon_pairs() for _ in range(block)], dtype=np.int64)
+            fired = np.flatnonzero(counts)
+            pair_times = np.repeat(start + (first + fired) * period, counts[fired])
+
+            self.photon_counter += len(pair_times)
+            self.owner.send_pairs(pair_times, self._new_pair)
+
+    def emit_batch(self, num_pulses=1):
+        """
+        Vectorized version of `emit`.
+
+        Pair numbers are drawn for `batch_size` pulses at a time with a single NumPy call,
+        and photons are only created for pairs with at least one photon surviving the links.
+        For a fixed seed the emitted pairs and their times, and the photons surviving the links,
+        are identical to the pulse-by-pulse mode, which uses the generator in the same order.
+
+        Args:
+            num_pulses (int): Number of emission pulses (default is 1).
+        """
+        start = self.timeline.now()
+        period = int(round(1e12 / self.frequency))
+
+        for first in range(0, num_pulses, self.batch_size):
+            counts = self.sample_photon_pairs_batch(min(self.batch_size, num_pulses - first))
+            fired = np.flatnonzero(counts)
+            pair_times = np.repeat(start + (first + fired) * period, counts[fired])
+
+            self.photon_counter += len(pair_times)
+            if self.vectorized:
+                self.owner.send_batch(PhotonPairBatch.from_state(pair_times, self.bell_state))
+            else:
+                self.owner.send_pairs(pair_times, self._new_pair)
+
+    def emit_stream(self, num_pulses=1):
+        """
+        Emit `num_pulses` pulses as a sequence of blocks scheduled on demand.
+
+        Only the current block is put on the timeline; the source then schedules itself
+        to emit the next block when the timeline reaches the end of the current one.
+        The number of pending photon events (and memory use) is therefore bounded by
+        the block size, independent of the total acquisition length.
+
+        Args:
+            num_pulses (int): Total number of emission pulses (default is 1).
+        """
+        self._emit_block(num_pulses, self.get_block_pulses())
+
+    def get_block_pulses(self) -> int:
+        """Return the stream-mode block size in pulses for the current frequency."""
+        if self.block_pulses is not None:
+            return max(1, int(self.block_pulses))
+        if self.block_duration is not None:
+            period = int(round(1e12 / self.frequency))
+            return max(1, int(self.block_duration // period))
+        return self.batch_size
+
+    def _emit_block(self, remaining: int, block_pulses: int):
+        num_pulses = min(block_pulses, remaining)
+        self.emit_batch(num_pulses)
+
+        remaining -= num_pulses
+        if remaining > 0:
+            period = int(round(1e12 / self.frequency))
+            process = Process(self, "_emit_block", [remaining, block_pulses])
+            event = Event(self.timeline.now() + num_pulses * period, process)
+            self.timeline.schedule(event)
+
+    def _new_pair(self) -> list["Photon"]:
+        """Create a signal/idler photon pair sharing the Bell state."""
+        new_photon0 = Photon("signal", self.timeline,
+                             wavelength=self.wavelengths[0],
+                             location=self,
+                             encoding_type=self.encoding_type)
+        new_photon1 = Photon("idler", self.timeline,
+                             wavelength=self.wavelengths[1],
+                             location=self,
+                             encoding_type=self.encoding_type)
+
+        new_photon0.combine_state(new_photon1)
+        new_photon0.set_state(self.bell_state)
+        return [new_photon0, new_photon1]
+
     def send_photons(self, time, photons: list["Photon"]):
         """
         Dispatch photon pair to the connected receivers.
@@ -0,0 +1,104 @@
+"""Array representation of photon pairs for the vectorized optics path.
+
+Instead of one `Photon` object (and one event per hop) per photon, a block of
+emitted pairs is carried as an (N, 4) array of two-photon state vectors plus
+their emission times. Components transform and measure all states at once.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class PhotonPairBatch:
+    """
+    Photon pairs emitted by one source block.
+
+    Attributes:
+        times: emission time (ps) of each pair, int64, in time order.
+        states: (N, 4) complex two-photon state vectors (qubit 0 is the
+            first tensor factor). Modified in place by measurements.
+    """
+    times: np.ndarray
+    states: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @classmethod
+    def from_state(cls, times: np.ndarray, state) -> "PhotonPairBatch":
+        """All pairs prepared in the same `state`."""
+        times = np.asarray(times, dtype=np.int64)
+        states = np.empty((len(times), 4), dtype=complex)
+        states[:] = np.asarray(state, dtype=complex)
+        return cls(times=times, states=states)
+
+
+def apply_operator(states: np.ndarray, op: np.ndarray) -> np.ndarray:
+    """Apply the 4x4 operator `op` to every (row) state vector."""
+    # contiguous right operand keeps matmul on the BLAS path
+    return states @ np.ascontiguousarray(op.T)
+
+
+def apply_jones(states: np.ndarray, qubit: int, jones: np.ndarray) -> np.ndarray:
+    """
+    Apply a 2x2 Jones matrix to `qubit` of every two-photon state.
+
+    Args:
+        states: (N, 4) complex two-photon states.
+        qubit: qubit acted on (0 or 1).
+        jones: (N, 2, 2) one matrix per state, or (2, 2) for all.
+
+    Returns:
+        np.ndarray: (N, 4) transformed states.
+    """
+    amps = states.reshape(-1, 2, 2)     # [pair, qubit 0, qubit 1]
+    jones = np.broadcast_to(jones, (len(amps), 2, 2))
+    if qubit == 0:
+        out = np.einsum("nik,nkj->nij", jones, amps)
+    elif qubit == 1:
+        out = np.einsum("njk,nik->nij", jones, amps)
+    else:
+        raise ValueError("qubit must be 0 or 1")
+    return out.reshape(-1, 4)
+
+
+def measure_qubit(states: np.ndarray, qubit: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Measure `qubit` of every two-photon state in the H/V basis.
+
+    Outcomes are drawn from the Born probabilities and the states are
+    collapsed (projected and renormalized) in place, so the partner photons
+    are measured on the post-measurement states.
+
+    Args:
+        states: (N, 4) C-contiguous complex array, collapsed in place.
+        qubit: qubit to measure (0 or 1).
+        rng: random generator for the outcomes.
+
+    Returns:
+        np.ndarray: int64 outcome per state (0 = H, 1 = V).
+    """
+    if not states.flags.c_contiguous:
+        raise ValueError("states must be a C-contiguous array")
+    amps = states.reshape(-1, 2, 2)     # [pair, qubit 0, qubit 1]
+    weights = np.abs(amps) ** 2
+    if qubit == 0:
+        p_v = weights[:, 1, :].sum(axis=1)
+    elif qubit == 1:
+        p_v = weights[:, :, 1].sum(axis=1)
+    else:
+        raise ValueError("qubit must be 0 or 1")
+    norm = weights.sum(axis=(1, 2))
+
+    outcomes = (rng.random(len(states)) * norm < p_v).astype(np.int64)
+
+    # project on the outcome and renormalize
+    keep = np.where(outcomes == 1, p_v, norm - p_v)
+    if qubit == 0:
+        amps[np.arange(len(amps)), 1 - outcomes, :] = 0
+    else:
+        amps[np.arange(len(amps)), :, 1 - outcomes] = 0
+    states /= np.sqrt(keep)[:, None]
+    return outcomes
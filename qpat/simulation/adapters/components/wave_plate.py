@@ -1,5 +1,5 @@
 import numpy as np
-from numpy import dot
+from functools import lru_cache
 from typing import TYPE_CHECKING
 from sequence.components.photon import Photon
 from sequence.kernel.entity import Entity
@@ -10,6 +10,10 @@ if TYPE_CHECKING:
     from sequence.kernel.timeline import Timeline
 
 
+# Maximum number of (plate type, angle) entries kept by each operator cache
+OPERATOR_CACHE_SIZE = 256
+
+
 class WavePlate(Entity):
     def __init__(self, name: str, timeline: "Timeline", plate_type="HWP", angle=0.0, encoding_type=polarization):
         super().__init__(name, timeline)
@@ -17,9 +21,7 @@ class WavePlate(Entity):
         self.plate_type = plate_type
         self.angle = angle
         self.encoding_type = encoding_type
-        self.unitary = self._get_jones_matrix()
-        self.unitary_signal = np.kron(self.unitary, np.identity(2))
-        self.unitary_idler = np.kron(np.identity(2), self.unitary)
+        self.set_angle(angle)
 
     def init(self):
         assert len(self._receivers) == 1
@@ -33,8 +35,7 @@ class WavePlate(Entity):
         # Only handle 2D or 4D polarization vectors
         if len(full_state) == 2:
             # Single-photon polarization (e.g., before entanglement)
-            new_state = tuple(dot(self.unitary, full_state))
-            photon.set_state(new_state.tolist())
+            photon.set_state(tuple(self.unitary @ full_state))
         elif len(full_state) == 4:
             if photon.name == "0":
                 op = self.unitary_signal  # act on qubit 0
@@ -42,9 +43,8 @@ class WavePlate(Entity):
                 op = self.unitary_idler  # act on qubit 1
             else:
                 raise ValueError("For entangled states, specify photon name='0' or '1'")
-            
-            new_state = dot(op, full_state)
-            photon.set_state(tuple(new_state))
+
+            photon.set_state(tuple(op @ full_state))  # hashable: SeQUeNCe caches measurements by state
             #print(f"State after {self.name} ({self.plate_type} at {np.rad2deg(self.angle):.1f}°): {photon.quantum_state.state}")
 
         else:
@@ -57,22 +57,82 @@ class WavePlate(Entity):
             nxt.get(photon)
 
     def set_angle(self, theta: float):
+        # Operators come from shared caches and are read-only
         self.angle = theta
         self.unitary = self._get_jones_matrix()
-        self.unitary_signal = np.kron(self.unitary, np.identity(2))
-        self.unitary_idler = np.kron(np.identity(2), self.unitary)
+        self.unitary_signal = plate_operator(self.plate_type, theta, 0)
+        self.unitary_idler = plate_operator(self.plate_type, theta, 1)
 
     def _get_jones_matrix(self):
-        theta = self.angle
+        return jones_matrix(self.plate_type, self.angle)
+
+
+# --------------------------------------------------
+# Memoized operators
+#
+# Keyed by plate type and angle (radians), bounded LRU eviction. Returned
+# arrays are shared between callers and therefore read-only.
+# --------------------------------------------------
+
+def jones_matrix(plate_type: str, theta: float) -> np.ndarray:
+    """Jones matrix of a half-wave ("HWP") or quarter-wave ("QWP") plate at physical angle `theta` (radians)."""
+    return _jones_matrix(plate_type, float(theta))
+
+
+def plate_operator(plate_type: str, theta: float, qubit: int) -> np.ndarray:
+    """Two-photon (4x4) operator of a plate acting on `qubit` (0 or 1) of a photon pair."""
+    return _plate_operator(plate_type, float(theta), qubit)
+
+
+def analyzer_operator(hwp_angle: float, qwp_angle: float) -> np.ndarray:
+    """Jones operator QWP·HWP of an analyzer (photon passes the HWP first); angles in radians."""
+    return _analyzer_operator(float(hwp_angle), float(qwp_angle))
+
+
+def analyzer_photon_operator(hwp_angle: float, qwp_angle: float, qubit: int) -> np.ndarray:
+    """Two-photon (4x4) analyzer operator acting on `qubit` (0 or 1) of a photon pair."""
+    return _analyzer_photon_operator(float(hwp_angle), float(qwp_angle), qubit)
+
+
+@lru_cache(maxsize=OPERATOR_CACHE_SIZE)
+def _plate_operator(plate_type: str, theta: float, qubit: int) -> np.ndarray:
+    return _on_qubit(_jones_matrix(plate_type, theta), qubit)
+
+
+@lru_cache(maxsize=OPERATOR_CACHE_SIZE)
+def _analyzer_operator(hwp_angle: float, qwp_angle: float) -> np.ndarray:
+    return _frozen(_jones_matrix("QWP", qwp_angle) @ _jones_matrix("HWP", hwp_angle))
+
+
+@lru_cache(maxsize=OPERATOR_CACHE_SIZE)
+def _analyzer_photon_operator(hwp_angle: float, qwp_angle: float, qubit: int) -> np.ndarray:
+    return _on_qubit(_analyzer_operator(hwp_angle, qwp_angle), qubit)
+
+
+def _on_qubit(op: np.ndarray, qubit: int) -> np.ndarray:
+    if qubit == 0:
+        return _frozen(np.kron(op, np.identity(2)))
+    if qubit == 1:
+        return _frozen(np.kron(np.identity(2), op))
+    raise ValueError("For entangled states, the qubit must be 0 or 1")
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+
+@lru_cache(maxsize=OPERATOR_CACHE_SIZE)
+def _jones_matrix(plate_type: str, theta: float) -> np.ndarray:
+    if plate_type == "HWP":
         c = np.cos(2 * theta)
         s = np.sin(2 * theta)
-
-        if self.plate_type == "HWP":
-            return np.array([[c, s], [s, -c]])
-        if self.plate_type == "QWP":
-            c = np.cos(theta)
-            s = np.sin(theta)
-            return np.array([
-                [c**2 + 1j * s**2, (1 - 1j) * c * s],
-                [(1 - 1j) * c * s, s**2 + 1j * c**2]
-            ], dtype=complex)
\ No newline at end of file
+        return _frozen(np.array([[c, s], [s, -c]]))
+    if plate_type == "QWP":
+        c = np.cos(theta)
+        s = np.sin(theta)
+        return _frozen(np.array([
+            [c**2 + 1j * s**2, (1 - 1j) * c * s],
+            [(1 - 1j) * c * s, s**2 + 1j * c**2]
+        ], dtype=complex))
+    raise ValueError(f"Unknown plate type: {plate_type}")
@@ -1,20 +1,63 @@
 from sequence.topology.node import Node
 from qpat.simulation.adapters.components.detector import FixedBasisPolarizationDetector
-from qpat.simulation.adapters.components.wave_plate import WavePlate
+from qpat.simulation.adapters.components.wave_plate import WavePlate, analyzer_operator, analyzer_photon_operator
+from qpat.simulation.adapters.components.photon_batch import apply_operator
+from qpat.simulation.detector_model import DetectorModel
+from qpat.simulation.timetags import TimeTagFileWriter, TimeTagStream
 import numpy as np
 
 
+# Labels of the two detectors behind the PBS
+CHANNEL_LABELS = ("H", "V")
+
+# Tags are streamed to a tag file once they are this many rms jitters (plus
+# one time resolution) older than every detector's processed time
+STREAM_MARGIN_SIGMAS = 10
+
+# Physical plate angles (HWP, QWP) in degrees that rotate each Pauli basis onto the PBS ports
+BASIS_ANGLES = {
+    "Z": (0.0, 0.0),    # H/V
+    "X": (22.5, 0.0),   # D/A
+    "Y": (0.0, 45.0),   # R/L
+}
+
+
 class PolarizationAnalyzer(Node):
     """
     Component that models a polarization analyzer: 
     A half-wave plate followed by a polarization-sensitive detector.
     
+    Plate angles are taken from the `hwp_angle` and `qwp_angle` config keys
+    (degrees, default 0). Detector parameters are read from the `detector`
+    mapping (see `DetectorModel`), e.g.
+
+        detector: {efficiency: 0.9, dark_count: 100, jitter: 50, dead_time: 40000}
+
+    With a `bases` list (e.g. [Z, X, Y]) the analyzer models a passive basis
+    choice instead: every photon is sent to one of the listed Pauli bases at
+    random (uniformly, as with a cascade of beam splitters), each with its
+    own analyzer and detector pair. The plate angles are then fixed by the
+    bases (`BASIS_ANGLES`), and `hwp_angle`/`qwp_angle` are ignored.
+
+    With a `tag_file` path, detections are streamed to that binary time-tag
+    file (see `TimeTagFileWriter`) while the run progresses instead of being
+    kept in memory; the file is complete once the detections are collected.
+    Tags are held back by a margin covering the detector jitter and the
+    `arrival_jitter` of the incoming photons, so the file stays time-ordered.
+
     Attributes:
         wp (WavePlate): half-wave plate used to rotate polarization basis.
         detector (QSDetectorPolarization): polarization detector with two outputs.
+        bases (tuple[str, ...]): passive-choice bases (empty for a single analyzer).
+        basis_detectors (dict[str, FixedBasisPolarizationDetector]): detector of each passive-choice basis.
+        tag_file (str): binary time-tag file receiving the detections (None: kept in memory).
+        arrival_jitter (float): rms jitter (ps) of the photon arrival times, e.g. link dispersion.
     """
 
-    def __init__(self, name: str, timeline):
+    # Parameters that `apply_params` can change on a built node
+    tunable_params = ("hwp_angle", "qwp_angle", "detector", "tag_file")
+
+    def __init__(self, name: str, timeline, config=None):
         super().__init__(name, timeline)
 
         # QWP first (default physical angle 0 rad)
@@ -36,25 +79,167 @@ class PolarizationAnalyzer(Node):
         self.add_component(self.detector)
         self.add_component(self)
         self.set_first_component(self.name)
-        
+
+        # Passive basis choice: one detector pair and one fixed analyzer per basis
+        config = config or {}
+        self.bases = tuple(str(b).upper() for b in config.get("bases", ()))
+        self.basis_detectors = {}
+        self._basis_operators = {}
+        for b in self.bases:
+            if b not in BASIS_ANGLES:
+                raise ValueError("Unknown basis. Use 'Z', 'X', or 'Y'.")
+            detector = FixedBasisPolarizationDetector(f"{name}_detector_{b}", timeline, basis_index=0)
+            self.add_component(detector)
+            self.basis_detectors[b] = detector
+            hwp, qwp = np.deg2rad(BASIS_ANGLES[b])
+            self._basis_operators[b] = {
+                None: analyzer_operator(hwp, qwp),
+                "0": analyzer_photon_operator(hwp, qwp, 0),
+                "1": analyzer_photon_operator(hwp, qwp, 1),
+            }
+
+        self.tag_file = None
+        self._tag_writer = None
+        self.arrival_jitter = 0.0
+
+        self.apply_params(config)
+
+    @property
+    def channel_labels(self):
+        """Labels of the detection channels, in channel-id order (see `get_channel_detections`)."""
+        if not self.bases:
+            return CHANNEL_LABELS
+        return tuple(f"{b}.{label}" for b in self.bases for label in CHANNEL_LABELS)
+
     def init(self):
         self.qwp.init()
         self.hwp.init()
-        self.detector.init()
+        for detector in self._all_detectors():
+            detector.init()
+        if self.tag_file:
+            self._open_tag_file()
+
+    def _open_tag_file(self):
+        self._close_tag_file()
+        self._tag_writer = TimeTagFileWriter(self.tag_file, self.channel_labels)
+        detectors = list(self.basis_detectors.values()) if self.bases else [self.detector]
+        jitter = max(np.hypot(d.model.jitter, self.arrival_jitter) for d in detectors)
+        resolution = max(d.model.time_resolution for d in detectors)
+        margin = int(np.ceil(STREAM_MARGIN_SIGMAS * jitter)) + resolution
+        stream = TimeTagStream(self._tag_writer, len(self.channel_labels), margin=margin)
+        for k, detector in enumerate(detectors):
+            detector.stream = stream
+            detector.channel_offset = len(CHANNEL_LABELS) * k
+
+    def _close_tag_file(self):
+        """Write the detections still held and finish the tag file."""
+        if self._tag_writer is None:
+            return
+        for detector in self._all_detectors():
+            if detector.stream is not None:
+                detector.stream.flush()
+                detector.stream = None
+        self._tag_writer.close()
+        self._tag_writer = None
 
     def get(self, photon, **kwargs):
-        """Receive photon and pass it through QWP"""
-        print("Got photon")
-        self.hwp.get(photon)
+        """
+        Receive a photon, rotate it by the analyzer (HWP, then QWP) and detect it.
+
+        The two plates are applied as one precomposed, cached operator, i.e. a
+        single matrix-vector product per photon instead of two plate hops.
+        """
+        operators, detector = self._operators, self.detector
+        if self.bases:
+            basis = self.bases[self.get_generator().integers(len(self.bases))]
+            operators, detector = self._basis_operators[basis], self.basis_detectors[basis]
+
+        state = photon.quantum_state.state
+        if len(state) == 2:
+            op = operators[None]
+        elif len(state) == 4:
+            try:
+                op = operators[photon.name]
+            except KeyError:
+                raise ValueError("For entangled states, specify photon name='0' or '1'")
+        else:
+            raise ValueError("Unexpected photon state dimension")
+
+        photon.set_state(tuple(op @ state))  # hashable: SeQUeNCe caches measurements by state
+        detector.get(photon)
+
+    def receive_batch(self, batch, qubit: int, index: np.ndarray, arrival_times: np.ndarray):
+        """
+        Vectorized `get`: analyze and detect photon `qubit` of the pairs `index` of `batch`.
+
+        The composed analyzer operator is applied to all selected states at
+        once; the measurement collapses them and the collapsed states are
+        written back to the batch for the partner analyzer.
+
+        Args:
+            batch (PhotonPairBatch): emitted pairs.
+            qubit (int): which photon of each pair arrives here (0 or 1).
+            index (np.ndarray): indices of the pairs whose photon arrived.
+            arrival_times (np.ndarray): arrival time (ps) of each of those photons.
+        """
+        if not self.bases:
+            states = apply_operator(batch.states[index], self._operators[str(qubit)])
+            self.detector.get_batch(states, qubit, arrival_times)
+            batch.states[index] = states
+            return
+
+        # passive basis choice: split the photons into one random subset per basis
+        choice = self.get_generator().integers(len(self.bases), size=len(index))
+        for k, basis in enumerate(self.bases):
+            selected = choice == k
+            subset = index[selected]
+            states = apply_operator(batch.states[subset], self._basis_operators[basis][str(qubit)])
+            self.basis_detectors[basis].get_batch(states, qubit, arrival_times[selected])
+            batch.states[subset] = states
+
+    def _update_operators(self):
+        hwp, qwp = self.hwp.angle, self.qwp.angle
+        self._operators = {
+            None: analyzer_operator(hwp, qwp),         # single photon
+            "0": analyzer_photon_operator(hwp, qwp, 0),  # qubit 0 of a pair
+            "1": analyzer_photon_operator(hwp, qwp, 1),  # qubit 1 of a pair
+        }
+
+    def apply_params(self, params: dict):
+        """Set the plate angles (degrees), detector parameters and tag file from `params`; missing ones revert to defaults."""
+        self.set_hwp_angle(np.deg2rad(float(params.get("hwp_angle", 0.0))))
+        self.set_qwp_angle(np.deg2rad(float(params.get("qwp_angle", 0.0))))
+        model = DetectorModel.from_params(params.get("detector"))
+        for detector in self._all_detectors():
+            detector.model = model
+        tag_file = params.get("tag_file")
+        if tag_file != self.tag_file:
+            # a file still open belongs to the previous path
+            self._close_tag_file()
+            self.tag_file = tag_file
+
+    def reset(self):
+        """Discard recorded detections so the node can be reused for a new run."""
+        self._close_tag_file()
+        for detector in self._all_detectors():
+            for buffer in detector.tag_buffers:
+                buffer.clear()
+            for recorder in detector.detectors:
+                recorder.arrivals.clear()
+
+    def _all_detectors(self):
+        return [self.detector] + list(self.basis_detectors.values())
 
     # ------------- Convenience API -------------
     def set_qwp_angle(self, theta_rad: float):
         """Set QWP physical angle (radians)."""
         self.qwp.set_angle(theta_rad)
+        self._update_operators()
 
     def set_hwp_angle(self, theta_rad: float):
         """Set HWP physical angle (radians)."""
         self.hwp.set_angle(theta_rad)
+        self._update_operators()
 
     def set_basis(self, basis: str):
         """
@@ -62,21 +247,35 @@ class PolarizationAnalyzer(Node):
           'Z' (H/V) : QWP=0°,   HWP=0°
           'X' (D/A) : QWP=0°,   HWP=22.5°
           'Y' (R/L) : QWP=45°,  HWP=0°
-        Angles are physical plate angles.
+        Angles are physical plate angles (see `BASIS_ANGLES`).
         """
         b = basis.upper()
-        if b == "Z":
-            self.set_qwp_angle(0.0)
-            self.set_hwp_angle(0.0)
-        elif b == "X":
-            self.set_qwp_angle(0.0)
-            self.set_hwp_angle(np.deg2rad(22.5))
-        elif b == "Y":
-            self.set_qwp_angle(np.deg2rad(45.0))
-            self.set_hwp_angle(0.0)
-        else:
+        if b not in BASIS_ANGLES:
             raise ValueError("Unknown basis. Use 'Z', 'X', or 'Y'.")
+        hwp, qwp = BASIS_ANGLES[b]
+        self.set_qwp_angle(np.deg2rad(qwp))
+        self.set_hwp_angle(np.deg2rad(hwp))
+
+    def get_channel_detections(self):
+        """
+        Hand over the detection timestamps per channel label: "H" and "V", or
+        "<basis>.H" and "<basis>.V" for every passive-choice basis.
+
+        With a `tag_file`, the remaining detections are written and the file
+        is closed; the returned arrays are then empty (the view lists the
+        node as file-backed, see `SimulationView.tag_file`).
+        """
+        if not self.bases:
+            times = self.get_detection_counts()
+        else:
+            times = [t for detector_times in self.get_basis_detection_counts().values() for t in detector_times]
+        self._close_tag_file()
+        return dict(zip(self.channel_labels, times))
 
     def get_detection_counts(self):
-        """Returns the number of detections on each detector."""
-        return self.detector.get_photon_times()
\ No newline at end of file
+        """Returns the detection timestamps (int64 ps array view) of each detector."""
+        return self.detector.get_photon_times()
+
+    def get_basis_detection_counts(self):
+        """Returns the detection timestamps of each detector per passive-choice basis."""
+        return {b: detector.get_photon_times() for b, detector in self.basis_detectors.items()}
\ No newline at end of file
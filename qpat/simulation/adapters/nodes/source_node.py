@@ -1,9 +1,24 @@
 from sequence.topology.node import Node
 from qpat.simulation.adapters.components.light_source import SPDCBellSource
 from sequence.kernel.entity import Entity
+from sequence.kernel.event import Event
+from sequence.kernel.process import Process
 from sequence.utils.encoding import polarization
+from qpat.simulation.adapters.components.photon_batch import apply_jones
+from qpat.simulation.link_model import LinkModel
+from qpat.simulation.timetags import TimeTagBuffer, write_tag_file
+import numpy as np
 import os, json
 
+
+def _optional_int(value):
+    return None if value is None else int(float(value))
+
+
+def _optional_float(value):
+    return None if value is None else float(value)
+
+
 class SourcePort(Entity):
     def __init__(self, name, timeline, owner:Node):
         super().__init__(name, timeline)
@@ -20,27 +35,56 @@ class SourcePort(Entity):
 class SpdcSourceNode(Node):
     """
     Node that emits entangled photon pairs using an SPDCBellSource.
+
+    Emission scheduling is selected with the `emission_mode` config key:
+    "pulse" and "batch" put the whole run on the timeline at once, while
+    "stream" emits blocks of `block_pulses` pulses (or `block_duration` ps)
+    one at a time, keeping the event heap bounded for long acquisitions.
+
+    Links are propagated in bulk by one `LinkModel` per quantum channel
+    (loss, delay and dispersion jitter applied to arrays of emission times).
+    Photons lost in the fiber are dropped before anything is scheduled, and
+    surviving photons are delivered to the receiver with a single event at
+    their arrival time. Links with polarization drift get a new drift trace
+    at the start of every run (see `init`).
+
+    With `vectorized: true` (batch and stream modes), each emission block is
+    propagated as a `PhotonPairBatch`: the receiving nodes' `receive_batch`
+    records the detections directly, with no per-photon events at all.
+
+    Emission times are only kept with `record_timestamps: true` (one int64
+    per pair, for `export_timestamps`); runs otherwise just count emissions.
     """
 
+    # Default values for SPDC configuration
+    default_config = {
+        'wavelengths': [1550, 1550],
+        'frequency': 8e7,
+        'mean_photon_num': 0.1,
+        'phase_error': 0.0,
+        'bandwidth': 0,
+        'encoding': polarization,
+        'bell_state': 'psi+',
+        'emission_mode': 'batch',
+        'batch_size': 1_000_000,
+        'block_pulses': None,     # stream mode block size (pulses)
+        'block_duration': None,   # stream mode block size (ps)
+        'vectorized': False,      # propagate emission blocks as photon arrays
+        'record_timestamps': False,  # keep every emission time (see `export_timestamps`)
+    }
+
+    # Parameters that `apply_params` can change on a built node
+    tunable_params = ("frequency", "mean_photon_num", "bell_state")
+
     def __init__(self, name, timeline, config):
         super().__init__(name, timeline)
         self.name = name
         self.emission_count = 0
-        self.timestamps = []
-
-        # Default values for SPDC configuration
-        default_config = {
-            'wavelengths': [1550, 1550],
-            'frequency': 8e7,
-            'mean_photon_num': 0.1,
-            'phase_error': 0.0,
-            'bandwidth': 0,
-            'encoding': polarization,
-            'bell_state': 'psi+'
-        }
+        self.link_models = {}
 
         # Merge with user config
-        merged_config = {**default_config, **(config or {})}
+        merged_config = {**self.default_config, **(config or {})}
+        self.emission_tags = TimeTagBuffer(max_capacity=None) if merged_config['record_timestamps'] else None
         
         # Create the Bell-state SPDC source
         self.spdc = SPDCBellSource(
@@ -52,8 +96,15 @@ class SpdcSourceNode(Node):
             phase_error=float(merged_config['phase_error']),
             bandwidth=float(merged_config['bandwidth']),
             encoding_type=merged_config['encoding'],
-            bell_state=merged_config['bell_state']
+            bell_state=merged_config['bell_state'],
+            emission_mode=merged_config['emission_mode'],
+            batch_size=int(float(merged_config['batch_size'])),
+            block_pulses=_optional_int(merged_config['block_pulses']),
+            block_duration=_optional_float(merged_config['block_duration']),
+            vectorized=bool(merged_config['vectorized']),
         )
+        # Register as a component so the source draws from the node's (seedable) generator
+        self.add_component(self.spdc)
         print(f"[SourceNode] Created SPDC source '{self.spdc.name}' with config: {merged_config}")
 
         # Create and connect output ports
@@ -72,19 +123,166 @@ class SpdcSourceNode(Node):
         self.spdc.emit(num_pulses=num_pulses)
 
 
+    def apply_params(self, params: dict):
+        """Set the tunable source parameters from `params` (missing ones revert to their defaults)."""
+        merged_config = {**self.default_config, **params}
+        self.spdc.frequency = float(merged_config['frequency'])
+        self.spdc.mean_photon_num = float(merged_config['mean_photon_num'])
+        self.spdc.bell_state_label = merged_config['bell_state']
+        self.spdc.bell_state = self.spdc.bell_state_map[merged_config['bell_state']]
+
+    def reset(self):
+        """Clear emission records and counters so the node can be reused for a new run."""
+        self.emission_count = 0
+        if self.emission_tags is not None:
+            self.emission_tags.clear()
+        self.spdc.photon_counter = 0
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Recorded emission times (int64 ps view; empty unless `record_timestamps` is set)."""
+        if self.emission_tags is None:
+            return np.empty(0, dtype=np.int64)
+        return self.emission_tags.timestamps
+
+    def init(self):
+        """Sample the polarization drift of the links over the run (`timeline.stop_time`)."""
+        drifts = [model.drift for model in self.link_models.values() if model.drift is not None]
+        if not drifts:
+            return
+        duration = self.timeline.stop_time
+        if not np.isfinite(duration):
+            raise ValueError("Links with polarization drift need a finite run duration")
+        rng = self.get_generator()
+        for drift in drifts:
+            drift.sample(duration, rng)
+
+    def set_link_model(self, dst: str, model: LinkModel):
+        """Propagate the photons sent to `dst` with `model`."""
+        self.link_models[dst] = model
+
+    def link_jitter(self, dst: str) -> float:
+        """Rms arrival-time jitter (ps) of the photons sent to `dst` (link dispersion)."""
+        model = self.link_models.get(dst)
+        return 0.0 if model is None else model.dispersion_jitter(self.spdc.linewidth)
+
+    def drift_traces(self) -> dict:
+        """
+        Polarization drift of the last run, per link ("<source>-><receiver>").
+
+        Returns:
+            dict: {link: {"slice_duration": s, "jones": (S, 2, 2) array}} for
+            the links with drift.
+        """
+        return {
+            f"{self.name}->{dst}": {"slice_duration": model.drift.slice_duration, "jones": model.drift.trace}
+            for dst, model in self.link_models.items()
+            if model.drift is not None and model.drift.trace is not None
+        }
+
+    def propagate(self, times: np.ndarray):
+        """
+        Propagate the photons of pairs emitted at `times` (ps) over every link.
+
+        Photon i of each pair goes to the i-th quantum channel. Photons
+        arriving after the end of the run are dropped, as their events would
+        never be executed.
+
+        Returns:
+            list of (receiver name, indices into `times`, arrival times, Jones
+            matrices or None), one per photon of the pair.
+        """
+        rng = self.get_generator()
+        routes = []
+        for dst, channel in self.qchannels.items():
+            model = self.link_models.get(dst) or LinkModel(channel.distance, channel.attenuation)
+            index, arrivals = model.propagate(times, rng, self.spdc.linewidth, self.timeline.stop_time)
+            routes.append((channel.receiver, index, arrivals, model.jones(arrivals)))
+        return routes
+
+    def send_pairs(self, times, new_pair):
+        """
+        Event-driven counterpart of `send_batch`: deliver `Photon` pairs emitted at `times` (ps).
+
+        Pairs are only created (by `new_pair`) when at least one of their
+        photons survives the links, and each surviving photon is scheduled
+        once, at its arrival on the receiver.
+        """
+        times = np.asarray(times, dtype=np.int64)
+        self.emission_count += len(times)
+        if self.emission_tags is not None:
+            self.emission_tags.extend(times, 0)
+
+        routes = self.propagate(times)
+        # per pair and photon: arrival time (-1 if lost) and row of the route's arrays
+        arrivals = np.full((len(times), len(routes)), -1, dtype=np.int64)
+        rows = np.zeros((len(times), len(routes)), dtype=np.int64)
+        for qubit, (_, index, arrival_times, _) in enumerate(routes):
+            arrivals[index, qubit] = arrival_times
+            rows[index, qubit] = np.arange(len(index))
+
+        for pair in np.flatnonzero((arrivals >= 0).any(axis=1)).tolist():
+            photons = new_pair()
+            for qubit, (receiver, _, _, jones) in enumerate(routes):
+                time = int(arrivals[pair, qubit])
+                if time < 0:
+                    continue
+                photon = photons[qubit]
+                photon.name = str(qubit)
+                if jones is not None:
+                    state = np.asarray(photon.quantum_state.state, dtype=complex)[None]
+                    photon.set_state(tuple(apply_jones(state, qubit, jones[rows[pair, qubit]])[0]))
+                process = Process(receiver, "receive_qubit", [self.name, photon])
+                self.timeline.schedule(Event(time, process))
+
+    def send_batch(self, batch):
+        """
+        Vectorized counterpart of `send_pairs`: hand photon i of every pair to the i-th receiver as arrays.
+        """
+        self.emission_count += len(batch)
+        if self.emission_tags is not None:
+            self.emission_tags.extend(batch.times, 0)
+
+        for qubit, (receiver, index, arrival_times, jones) in enumerate(self.propagate(batch.times)):
+            if jones is not None:
+                batch.states[index] = apply_jones(batch.states[index], qubit, jones)
+            self.timeline.get_entity_by_name(receiver).receive_batch(batch, qubit, index, arrival_times)
+
     def get(self, photon, **kwargs):
         if photon.name == "0":  # Only log photon 0 (assume it's consistent)
             self.emission_count += 1
-            self.timestamps.append(self.timeline.now())
+            if self.emission_tags is not None:
+                self.emission_tags.append(self.timeline.now(), 0)
 
         for index, dst in enumerate(self.qchannels):
             if photon.name == str(index):
                 self.send_qubit(dst, photon)
-                print(f"[SourceNode] Sent photon {photon.name} to {dst} at time {self.timeline.now()}")
                 break
     
-    def export_timestamps(self, directory="logs"):
+    def export_timestamps(self, directory="logs", format="binary"):
+        """
+        Write the emission timestamps (ps) to `directory`; they are only
+        recorded with `record_timestamps: true`.
+
+        Args:
+            directory: output directory (created if needed).
+            format: "binary" for a time-tag file (`<name>_timestamps.tags`, see
+                `TimeTagFile`), or "json" for the former JSON list
+                (`<name>_timestamps.json`).
+
+        Returns:
+            str: path of the written file.
+        """
+        if self.emission_tags is None:
+            raise ValueError(f"Source '{self.name}' does not record emission times (set record_timestamps)")
         os.makedirs(directory, exist_ok=True)
-        path = os.path.join(directory, f"{self.name}_timestamps.json")
-        with open(path, "w") as f:
-            json.dump(self.timestamps, f, indent=2)
\ No newline at end of file
+        if format == "binary":
+            path = os.path.join(directory, f"{self.name}_timestamps.tags")
+            write_tag_file(path, np.sort(self.timestamps), labels=("emission",))
+        elif format == "json":
+            path = os.path.join(directory, f"{self.name}_timestamps.json")
+            with open(path, "w") as f:
+                json.dump(self.timestamps.tolist(), f, indent=2)
+        else:
+            raise ValueError(f"Unknown timestamp format '{format}'")
+        return path
\ No newline at end of file
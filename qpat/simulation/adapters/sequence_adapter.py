@@ -1,8 +1,13 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+import json
+from typing import Dict, Optional
 
+import numpy as np
+
+from sequence.kernel.eventlist import EventList
 from sequence.kernel.timeline import Timeline
 from sequence.components.optical_channel import QuantumChannel
 
@@ -12,6 +17,8 @@ from qpat.experiment.specs import NodeSpec, QuantumLinkSpec
 # Your concrete node implementations
 from qpat.simulation.adapters.nodes.source_node import SpdcSourceNode
 from qpat.simulation.adapters.nodes.polarization_measurement_node import PolarizationAnalyzer
+from qpat.simulation.link_model import LinkModel
+from qpat.simulation.adapters.bifrost_adapter import BifrostAdapter
 from qpat.simulation.view import SimulationView
 
 
@@ -30,6 +37,80 @@ class SequenceTopology:
 
     # --------------------------------------------
 
+    def set_seed(self, seed) -> None:
+        """
+        Seed every node's random generator.
+
+        Each node gets an independent child of `seed` (int or SeedSequence),
+        assigned in node-name order so the mapping is reproducible.
+        """
+        if isinstance(seed, np.random.SeedSequence):
+            # fresh copy: spawning must not depend on earlier use of `seed`
+            seed = np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key)
+        else:
+            seed = np.random.SeedSequence(seed)
+        children = seed.spawn(len(self.nodes))
+        for name, child in zip(sorted(self.nodes), children):
+            self.nodes[name].set_seed(child)
+
+    def reset(self) -> None:
+        """
+        Return the topology to its freshly built state so it can run again.
+
+        The timeline is rewound to t=0 with an empty event list and zeroed
+        counters (event tie-breaking then matches a fresh build), in-flight
+        channel bookkeeping is dropped and nodes clear their recorded data.
+        Entities are re-initialized by `Timeline.init` at the start of the run.
+        """
+        timeline = self.timeline
+        timeline.events = EventList()
+        timeline.time = 0
+        timeline.schedule_counter = 0
+        timeline.run_counter = 0
+        timeline.is_running = False
+
+        for node in self.nodes.values():
+            for channel in node.qchannels.values():
+                channel.send_bins = []
+            if hasattr(node, "reset"):
+                node.reset()
+
+    def view(self) -> SimulationView:
+        """
+        Collect the detections of the last run into a `SimulationView`.
+
+        Every node with detectors contributes its channels (see
+        `PolarizationAnalyzer.get_channel_detections`). Extra outputs go to
+        the view's metadata: drift traces under "drift", and the binary tag
+        files of the nodes that streamed their detections under "tag_files".
+        """
+        detections = {
+            name: node.get_channel_detections()
+            for name, node in self.nodes.items()
+            if hasattr(node, "get_channel_detections")
+        }
+        metadata = {}
+        drift = self.drift_traces()
+        if drift:
+            metadata["drift"] = drift
+        tag_files = {name: node.tag_file for name, node in self.nodes.items() if getattr(node, "tag_file", None)}
+        if tag_files:
+            metadata["tag_files"] = tag_files
+        return SimulationView.from_channels(detections, metadata=metadata)
+
+    def drift_traces(self) -> dict:
+        """Polarization drift traces of the last run, for every link with drift (see `SpdcSourceNode.drift_traces`)."""
+        traces = {}
+        for node in self.nodes.values():
+            if hasattr(node, "drift_traces"):
+                traces.update(node.drift_traces())
+        return traces
+
+    def apply_params(self, topology: Topology) -> None:
+        """Apply the tunable node parameters of `topology` (same structure) to the built nodes."""
+        for name, spec in topology.nodes.items():
+            self.nodes[name].apply_params(spec.params)
+
     def schedule_tasks(self, tasks) -> None:
         """
         Translate SimulationTask → SeQUeNCe events.
@@ -63,9 +144,70 @@ class SequenceTopologyBuilder:
     Translate a declarative Topology into concrete SeQUeNCe objects.
 
     Optical and source implementations are delegated to node classes.
+
+    With `reuse` enabled, built topologies are cached by structure: node
+    names, roles and links, plus every node parameter except the node class's
+    `tunable_params`. A topology with the same structure is then served from
+    the cache, reset, with its tunable parameters (analyzer angles, source
+    frequency, ...) applied, which gives the same results as a fresh build.
+    A cached topology is reused in place, so it must not be run by two
+    engines at the same time.
+
+    Links with `model: bifrost` take their loss and polarization response
+    from `bifrost` (a `BifrostAdapter`, created on first use), which caches
+    responses across builds.
     """
 
+    node_types = {
+        "source": SpdcSourceNode,
+        "polarization_measurement": PolarizationAnalyzer,
+    }
+
+    def __init__(self, reuse: bool = True, max_cached: int = 8, bifrost: Optional[BifrostAdapter] = None):
+        """
+        Args:
+            reuse: reuse built topologies across builds of the same structure.
+            max_cached: number of distinct structures kept (least recently used are dropped).
+            bifrost: fiber response provider for `bifrost` links.
+        """
+        self.reuse = reuse
+        self.max_cached = max_cached
+        self.bifrost = bifrost
+        self._cache: "OrderedDict[tuple, SequenceTopology]" = OrderedDict()
+
     def build(self, topology: Topology) -> SequenceTopology:
+        if not self.reuse:
+            return self._build(topology)
+
+        key = self.structure_key(topology)
+        sim = self._cache.get(key)
+        if sim is None:
+            sim = self._build(topology)
+            self._cache[key] = sim
+            if len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+            sim.reset()
+            sim.apply_params(topology)
+        return sim
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+    def structure_key(self, topology: Topology) -> tuple:
+        """Hashable description of everything that requires a rebuild when changed."""
+        nodes = []
+        for name, spec in topology.nodes.items():
+            tunable = getattr(self.node_types.get(spec.role), "tunable_params", ())
+            fixed = {k: v for k, v in spec.params.items() if k not in tunable}
+            nodes.append((name, spec.role, _freeze(fixed)))
+        links = tuple(_freeze(asdict(link)) for link in topology.links)
+        return tuple(nodes), links
+
+    # --------------------------------------------------
+
+    def _build(self, topology: Topology) -> SequenceTopology:
         timeline = Timeline()
         nodes: Dict[str, object] = {}
 
@@ -101,6 +243,7 @@ class SequenceTopologyBuilder:
             return PolarizationAnalyzer(
                 name=spec.name,
                 timeline=timeline,
+                config=spec.params,
             )
 
         else:
@@ -122,3 +265,28 @@ class SequenceTopologyBuilder:
         )
 
         qc.set_ends(nodes[spec.src], nodes[spec.dst].name)
+
+        # senders that propagate in bulk apply the link model themselves
+        if hasattr(nodes[spec.src], "set_link_model"):
+            nodes[spec.src].set_link_model(spec.dst, self._link_model(spec))
+        elif spec.model != "ideal":
+            raise ValueError(f"Node '{spec.src}' cannot send over a '{spec.model}' link")
+
+        # receivers streaming their tags hold them back by the arrival-time spread
+        if hasattr(nodes[spec.dst], "arrival_jitter") and hasattr(nodes[spec.src], "link_jitter"):
+            nodes[spec.dst].arrival_jitter = max(
+                nodes[spec.dst].arrival_jitter, nodes[spec.src].link_jitter(spec.dst)
+            )
+
+    def _link_model(self, spec: QuantumLinkSpec) -> LinkModel:
+        if spec.model == "ideal":
+            return LinkModel.from_spec(spec)
+        if spec.model == "bifrost":
+            if self.bifrost is None:
+                self.bifrost = BifrostAdapter()
+            return self.bifrost.link_model(spec)
+        raise ValueError(f"Unknown link model: {spec.model}")
+
+
+def _freeze(params: dict) -> str:
+    return json.dumps(params, sort_keys=True, default=repr)
@@ -0,0 +1,330 @@
+"""
+Closed-form model of the polarization coincidence experiment.
+
+Computes the expected (or sampled) singles and coincidence counts of the
+SeQUeNCe polarization setup (SPDC Bell source, lossy links, HWP/QWP analyzers
+and threshold detectors) directly from the model parameters, without
+scheduling any photon events.
+
+Per pulse the source emits k pairs (thermal or Poisson). Each pair ends in
+one of 3 x 3 outcomes (H, V or lost at Alice and at Bob) with probabilities
+given by the Born rule on the analyzed Bell state and the link and detector
+efficiencies. A detector clicks if at least one pair reaches it, so the exact
+probability of every click pattern of the four detectors follows from the
+generating function of k by inclusion-exclusion. Dark counts, accidental
+coincidences with dark counts, a first-order non-paralyzable dead-time
+correction and the window acceptance for Gaussian timing jitter are added on top.
+
+Assumptions: pulses are independent and the correlation peak is inside the
+coincidence window (otherwise true coincidences are not counted).
+"""
+
+from dataclasses import dataclass
+from math import erf, sqrt
+from typing import List, Optional
+
+import numpy as np
+
+from qpat.analysis.coincidences.base import CoincidenceCounts
+from qpat.analysis.coincidences.window_method import WindowCoincidenceModel, singles_accidentals
+from qpat.experiment.topology import Topology
+from qpat.simulation.adapters.components.light_source import SPDCBellSource
+from qpat.simulation.adapters.components.wave_plate import analyzer_operator
+from qpat.simulation.adapters.nodes.source_node import SpdcSourceNode
+from qpat.simulation.detector_model import DetectorModel
+from qpat.simulation.link_model import LinkModel
+
+
+# Detector order in click patterns: Alice H, Alice V, Bob H, Bob V
+_NUM_DETECTORS = 4
+_PATTERNS = np.arange(1 << _NUM_DETECTORS)
+# Pattern of each single-pair outcome (Alice a, Bob b; index 2 = not detected)
+_A, _B = np.meshgrid(np.arange(3), np.arange(3), indexing="ij")
+_HITS = (np.where(_A < 2, 1 << _A, 0) | np.where(_B < 2, 1 << (2 + _B), 0)).ravel()
+# Inclusion-exclusion matrix: (-1)^|C \ S| for S subset of C, else 0
+_SUBSETS = np.where(
+    (_PATTERNS[None, :] & ~_PATTERNS[:, None]) == 0,
+    (-1.0) ** np.array([[bin(c ^ s).count("1") for s in _PATTERNS] for c in _PATTERNS]),
+    0.0,
+)
+
+
+def projection_probabilities(state, op0: np.ndarray, op1: np.ndarray) -> np.ndarray:
+    """
+    Joint outcome probabilities of one photon pair.
+
+    Args:
+        state: two-photon state vector (qubit 0 is the first tensor factor).
+        op0: analyzer operator applied to qubit 0.
+        op1: analyzer operator applied to qubit 1.
+
+    Returns:
+        np.ndarray: (2, 2) array p[i, j] of qubit 0 in H/V (i = 0/1) and qubit 1 in H/V (j).
+    """
+    amplitudes = np.kron(op0, op1) @ np.asarray(state, dtype=complex)
+    p = np.abs(amplitudes) ** 2
+    return (p / p.sum()).reshape(2, 2)
+
+
+def pair_number_pgf(x, mean_photon_num: float, statistics: str = "thermal"):
+    """Probability generating function E[x^k] of the number of pairs k per pulse."""
+    if statistics == "thermal":
+        return 1.0 / (1.0 + mean_photon_num * (1.0 - x))
+    if statistics == "poisson":
+        return np.exp(-mean_photon_num * (1.0 - x))
+    raise ValueError(f"Unknown photon_statistics mode: {statistics}")
+
+
+def click_pattern_probabilities(outcomes: np.ndarray, mean_photon_num: float,
+                                statistics: str = "thermal") -> np.ndarray:
+    """
+    Probability of each click pattern of the four detectors in one pulse.
+
+    Args:
+        outcomes: (3, 3) single-pair probabilities of Alice outcome a and Bob
+            outcome b, index 2 meaning the photon was not detected.
+        mean_photon_num: mean number of pairs per pulse.
+        statistics: pair number distribution ("thermal" or "poisson").
+
+    Returns:
+        np.ndarray: 16 probabilities indexed by the bit mask of clicking detectors
+        (bit 0: Alice H, 1: Alice V, 2: Bob H, 3: Bob V).
+    """
+    q = np.asarray(outcomes, dtype=float).ravel()
+
+    # no click outside S: every pair lands inside S
+    inside = (_HITS[None, :] & ~_PATTERNS[:, None]) == 0
+    none_outside = pair_number_pgf(inside @ q, mean_photon_num, statistics)
+
+    # exactly C: inclusion-exclusion over the subsets S of C
+    p = _SUBSETS @ none_outside
+    return np.clip(p, 0.0, None)
+
+
+@dataclass
+class AnalyticCounts:
+    """
+    Singles and coincidence counts produced by the analytic model.
+
+    Attributes:
+        singles_alice: counts per Alice detector (H, V).
+        singles_bob: counts per Bob detector (H, V).
+        coincidences: coincidence counts with accidental estimates.
+    """
+    singles_alice: List[float]
+    singles_bob: List[float]
+    coincidences: CoincidenceCounts
+
+
+class AnalyticPolarizationModel:
+    """
+    Closed-form counterpart of the event-driven polarization analysis run.
+
+    Reads the same topology parameters as the SeQUeNCe builder (source
+    config, analyzer angles in degrees, link distance, attenuation and
+    dispersion, and the analyzers' `detector` parameters).
+    """
+
+    def __init__(self, topology: Topology, source_name: str, alice_name: str, bob_name: str):
+        self.topology = topology
+        self.source_name = source_name
+        self.alice_name = alice_name
+        self.bob_name = bob_name
+
+    # --------------------------------------------------
+
+    def _source_config(self) -> dict:
+        return {**SpdcSourceNode.default_config, **self.topology.nodes[self.source_name].params}
+
+    def _operator(self, name: str) -> np.ndarray:
+        params = self.topology.nodes[name].params
+        return analyzer_operator(np.deg2rad(float(params.get("hwp_angle", 0.0))),
+                                 np.deg2rad(float(params.get("qwp_angle", 0.0))))
+
+    def _detector(self, name: str) -> DetectorModel:
+        return DetectorModel.from_params(self.topology.nodes[name].params.get("detector"))
+
+    def _link(self, dst: str):
+        """Return (qubit index, transmission, delay in ps, dispersion jitter in ps) of the source link to `dst`."""
+        links = [link for link in self.topology.links if link.src == self.source_name]
+        for index, link in enumerate(links):
+            if link.dst == dst:
+                if link.model != "ideal":
+                    raise ValueError(f"The analytic model does not support '{link.model}' links")
+                if link.drift:
+                    raise ValueError("The analytic model does not support polarization drift")
+                model = LinkModel.from_spec(link)
+                jitter = model.dispersion_jitter(float(self._source_config()["bandwidth"]))
+                return index, model.transmission, model.delay, jitter
+        raise KeyError(f"No link from '{self.source_name}' to '{dst}'")
+
+    def click_probabilities(self) -> np.ndarray:
+        """Per-pulse probabilities of the 16 detector click patterns (see `click_pattern_probabilities`)."""
+        config = self._source_config()
+        qubit_a, t_a, _, _ = self._link(self.alice_name)
+        qubit_b, t_b, _, _ = self._link(self.bob_name)
+        if {qubit_a, qubit_b} != {0, 1}:
+            raise ValueError("Alice and Bob must receive the two photons of the pair")
+
+        ops = [None, None]
+        ops[qubit_a] = self._operator(self.alice_name)
+        ops[qubit_b] = self._operator(self.bob_name)
+        p = projection_probabilities(SPDCBellSource.bell_state_map[config["bell_state"]], *ops)
+        if qubit_a == 1:
+            p = p.T
+
+        eta_a = t_a * self._detector(self.alice_name).efficiency
+        eta_b = t_b * self._detector(self.bob_name).efficiency
+        outcomes = np.empty((3, 3))
+        outcomes[:2, :2] = eta_a * eta_b * p
+        outcomes[:2, 2] = eta_a * (1 - eta_b) * p.sum(axis=1)
+        outcomes[2, :2] = (1 - eta_a) * eta_b * p.sum(axis=0)
+        outcomes[2, 2] = (1 - eta_a) * (1 - eta_b)
+        return click_pattern_probabilities(outcomes, float(config["mean_photon_num"]))
+
+    # --------------------------------------------------
+
+    def expected(self, emission_time: float, model: WindowCoincidenceModel) -> AnalyticCounts:
+        """Expected counts of a run of `emission_time` seconds analyzed with `model`."""
+        return self._counts(emission_time, model, rng=None)
+
+    def sample(self, emission_time: float, model: WindowCoincidenceModel,
+               rng: Optional[np.random.Generator] = None) -> AnalyticCounts:
+        """
+        Counts of one simulated run, drawn from the analytic probabilities.
+
+        Click patterns of the pulses are drawn from a single multinomial, so
+        singles and coincidences are consistent; dark counts and accidental
+        terms are Poisson draws.
+        """
+        return self._counts(emission_time, model, rng=rng or np.random.default_rng())
+
+    def _counts(self, emission_time: float, model: WindowCoincidenceModel,
+                rng: Optional[np.random.Generator]) -> AnalyticCounts:
+        config = self._source_config()
+        frequency = float(config["frequency"])
+        period = int(round(1e12 / frequency))
+        duration = int(round(emission_time * 1e12))
+        num_pulses = int(round(emission_time * frequency))
+
+        # the run stops at `duration`: later photon arrivals are never detected
+        _, _, delay_a, dispersion_a = self._link(self.alice_name)
+        _, _, delay_b, dispersion_b = self._link(self.bob_name)
+        arrived = [int(np.clip(np.ceil((duration - delay) / period), 0, num_pulses))
+                   for delay in (delay_a, delay_b)]
+        joint = min(arrived)
+
+        patterns = self.click_probabilities()
+        clicks = (_PATTERNS[:, None] >> np.arange(_NUM_DETECTORS)) & 1    # (16, 4)
+        p_click = patterns @ clicks                                      # (4,)
+
+        # per detector (Alice H, Alice V, Bob H, Bob V)
+        detectors = [self._detector(self.alice_name)] * 2 + [self._detector(self.bob_name)] * 2
+        dark_rate = np.array([d.dark_count for d in detectors])
+        # detector jitter and the link's dispersion jitter add in quadrature
+        dispersion = np.repeat([dispersion_a, dispersion_b], 2)
+        jitter = np.hypot([d.jitter for d in detectors], dispersion)
+        resolution = np.array([d.time_resolution for d in detectors])
+
+        # Non-paralyzable dead time: a click blocks the following `blocked` pulses
+        blocked = np.array([d.dead_time for d in detectors]) // period
+        p_dark = dark_rate * period * 1e-12
+        live = 1.0 / (1.0 + blocked * (p_click + p_dark))
+        dark = dark_rate * duration * 1e-12 * live
+
+        side_pulses = np.repeat(arrived, 2)
+        if rng is None:
+            signal = side_pulses * p_click * live
+            joint_clicks = joint * patterns
+        else:
+            joint_clicks = rng.multinomial(joint, patterns / patterns.sum())
+            signal = joint_clicks @ clicks
+            extra = side_pulses - joint
+            signal = signal + rng.binomial(extra, p_click)
+            signal = rng.binomial(signal, live)
+            dark = rng.poisson(dark)
+        singles = signal + dark
+
+        labels = model.channel_labels
+        w = model.half_window
+        window = 2 * w
+        offset = model.offset
+        result = CoincidenceCounts(counts={}, accidentals_singles={}, accidentals_offset={},
+                                   accidental_method=model.accidental_method)
+
+        for i in range(2):
+            for j in range(2):
+                label = labels[i] + labels[j]
+                a, b = i, 2 + j
+                in_both = (clicks[:, a] & clicks[:, b]).astype(bool)
+                # both live: dead time is correlated, so treat the pair as one detector
+                p_either = patterns[(clicks[:, a] | clicks[:, b]).astype(bool)].sum()
+                live_ab = 1.0 / (1.0 + max(blocked[a], blocked[b]) * (p_either + p_dark[a] + p_dark[b]))
+                half_window, sigma = _effective_window(w, jitter[[a, b]], resolution[[a, b]])
+
+                # Bob - Alice time of correlated pairs after the model's delays
+                rel = delay_b - delay_a + _delay_ps(model.bob_delays, j) - _delay_ps(model.alice_delays, i)
+                # accidentals with dark counts (uniform in time)
+                dark_mean = (dark[a] * signal[b] + signal[a] * dark[b] + dark[a] * dark[b]) * window / duration
+
+                # A window centered at `center` holds pulse pairs k periods apart:
+                # k = 0 is the correlation peak, other k pair uncorrelated pulses
+                window_counts = []
+                for center in (0, offset):
+                    k = int(round((center - rel) / period))
+                    accept = _window_acceptance(rel + k * period - center, half_window, sigma)
+                    if k == 0:
+                        true = joint_clicks[in_both].sum()
+                        if rng is None:
+                            n = true * live_ab * accept + dark_mean
+                        else:
+                            n = rng.binomial(true, live_ab * accept) + rng.poisson(dark_mean)
+                    else:
+                        mean = dark_mean + accept * max(joint - abs(k), 0) * p_click[a] * p_click[b] * live[a] * live[b]
+                        n = mean if rng is None else rng.poisson(mean)
+                    window_counts.append(n)
+                counts, shifted = window_counts
+
+                result.counts[label] = _value(counts)
+                result.accidentals_offset[label] = _value(shifted)
+                result.accidentals_singles[label] = singles_accidentals(singles[a], singles[b], window, duration)
+
+        return AnalyticCounts(
+            singles_alice=[_value(n) for n in singles[:2]],
+            singles_bob=[_value(n) for n in singles[2:]],
+            coincidences=result,
+        )
+
+
+def _effective_window(half_window: int, jitter, resolution):
+    """
+    Half window and rms spread of the tag time differences, including tag rounding.
+
+    With a common resolution r the rounded difference of two tags is within
+    m*r (m = half_window // r) exactly when the true difference plus a
+    uniform +-r/2 term is within (m + 1/2)*r; the uniform term is folded into
+    the Gaussian spread.
+    """
+    r_a, r_b = (int(r) for r in resolution)
+    sigma2 = float(np.sum(np.square(jitter)))
+    if r_a == r_b:
+        return (half_window // r_a + 0.5) * r_a, sqrt(sigma2 + r_a ** 2 / 12)
+    return half_window, sqrt(sigma2 + (r_a ** 2 + r_b ** 2) / 12)
+
+
+def _window_acceptance(distance: float, half_window: float, sigma: float) -> float:
+    """Probability that a time difference centered `distance` ps from the window center,
+    with Gaussian spread `sigma` ps, falls inside the window."""
+    if sigma <= 0:
+        return 1.0 if abs(distance) <= half_window else 0.0
+    scale = sigma * sqrt(2)
+    return 0.5 * (erf((half_window - distance) / scale) - erf((-half_window - distance) / scale))
+
+
+def _delay_ps(delays, index: int) -> int:
+    return int(round(delays[index] * 1e12)) if index < len(delays) else 0
+
+
+def _value(x):
+    """Plain Python number (int for sampled counts, float for expectations)."""
+    return int(x) if isinstance(x, (np.integer, int)) else float(x)
@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Any, Generator, Optional
 
 from qpat.simulation.tasks import SimulationTask
+from qpat.simulation.view import SimulationView
 
 
 
@@ -13,15 +14,18 @@ class SimulationEngine:
     Responsibilities:
       - Build simulation topology from experiment topology
       - Run the simulation timeline
+      - Return the results as a simulator-agnostic `SimulationView`
     """
 
     def __init__(
         self,
         topology,
         topology_builder,
+        seed: Optional[int] = None,
     ):
         self.topology_spec = topology
         self.builder = topology_builder
+        self.seed = seed
 
         self._sim_topology = None
 
@@ -29,12 +33,19 @@ class SimulationEngine:
         if self._sim_topology is not None:
             return
 
-        # Build simulator-specific topology (e.g. SeQUeNCe)
+        # Build simulator-specific topology (e.g. SeQUeNCe); may be a reused one
         self._sim_topology = self.builder.build(self.topology_spec)
 
-    def run(self, duration: float, tasks: list[SimulationTask]):
+        # Always reseed: a reused topology must not continue its previous RNG
+        # streams (seed None draws fresh entropy, as a new build would)
+        self._sim_topology.set_seed(self.seed)
+
+    def run(self, duration: float, tasks: list[SimulationTask]) -> SimulationView:
         """
-        Blocking run for a given duration.
+        Blocking run for a given duration (ps).
+
+        Returns:
+            SimulationView: detections of the run.
         """
         self.build()
         assert self._sim_topology is not None
@@ -51,4 +62,4 @@ class SimulationEngine:
         timeline.run()
         print("Finished")
 
-        return sim
+        return sim.view()
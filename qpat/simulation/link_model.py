@@ -0,0 +1,251 @@
+# qpat/simulation/link_model.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field, fields
+from typing import Optional, Tuple
+
+import numpy as np
+from sequence.constants import SPEED_OF_LIGHT
+
+# Below this transmission the kept photons are found from geometric gaps
+# (one draw per kept photon) instead of one uniform draw per photon
+_GAP_SAMPLING_MAX = 0.25
+
+
+@dataclass
+class DriftModel:
+    """
+    Slow polarization drift of a deployed fiber.
+
+    The fiber's polarization rotation performs a random walk on SU(2),
+    sampled on a coarse time grid: from one slice to the next it is
+    multiplied by a rotation about a random axis whose rotation vector (on
+    the Poincare sphere) has independent N(0, rate^2 * slice_duration)
+    components. The walk starts at the identity at t = 0.
+
+    `sample` draws the trace for a run; photons arriving in slice s are then
+    rotated by trace[s], so the cost per photon does not depend on the
+    length of the run.
+
+    Attributes:
+        rate: diffusion rate of the rotation angle (rad/sqrt(s)).
+        slice_duration: time grid spacing (s).
+        seed: seed of the walk (None: drawn from the simulation's generator).
+        trace: (S, 2, 2) Jones matrices of the current run (None until sampled).
+    """
+    rate: float = 0.0
+    slice_duration: float = 1.0
+    seed: Optional[int] = None
+    trace: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_params(cls, params: Optional[dict]) -> Optional["DriftModel"]:
+        """Build from a link's `drift` params mapping (None when there is no drift)."""
+        if not params:
+            return None
+        names = {f.name for f in fields(cls)} - {"trace"}
+        unknown = set(params) - names
+        if unknown:
+            raise ValueError(f"Unknown drift parameters: {sorted(unknown)}")
+        seed = params.get("seed")
+        return cls(
+            rate=float(params.get("rate", cls.rate)),
+            slice_duration=float(params.get("slice_duration", cls.slice_duration)),
+            seed=None if seed is None else int(seed),
+        )
+
+    def sample(self, duration: float, rng: np.random.Generator) -> np.ndarray:
+        """
+        Draw the drift trace covering `duration` (ps).
+
+        Args:
+            duration: run length (ps).
+            rng: generator used when the model has no `seed`.
+
+        Returns:
+            np.ndarray: (S, 2, 2) Jones matrix of each slice (also kept as `trace`).
+        """
+        if self.seed is not None:
+            rng = np.random.default_rng(self.seed)
+        num_slices = max(1, int(np.ceil(duration * 1e-12 / self.slice_duration)))
+        if self.rate == 0:
+            # no draws: a drift-free link leaves the simulation's random stream unchanged
+            self.trace = np.broadcast_to(np.eye(2, dtype=complex), (num_slices, 2, 2))
+            return self.trace
+
+        vectors = rng.normal(0.0, self.rate * np.sqrt(self.slice_duration), size=(num_slices, 3))
+        vectors[0] = 0.0
+        angles = np.linalg.norm(vectors, axis=1)
+        axes = np.divide(vectors, angles[:, None], out=np.zeros_like(vectors), where=angles[:, None] > 0)
+        steps = np.concatenate([np.cos(angles / 2)[:, None], np.sin(angles / 2)[:, None] * axes], axis=1)
+
+        walk = _cumulative_product(steps)
+        walk /= np.linalg.norm(walk, axis=1, keepdims=True)
+        self.trace = quaternion_jones(walk)
+        return self.trace
+
+    def jones_at(self, times: np.ndarray) -> np.ndarray:
+        """Jones matrices (N, 2, 2) of the slices containing `times` (ps)."""
+        slice_ps = self.slice_duration * 1e12
+        index = np.clip((np.asarray(times) // slice_ps).astype(np.int64), 0, len(self.trace) - 1)
+        return self.trace[index]
+
+
+@dataclass
+class LinkModel:
+    """
+    Vectorized fiber link.
+
+    Propagates a batch of photons emitted at known times, with all steps done
+    on whole arrays:
+      1. loss: each photon is kept with probability `transmission`,
+      2. propagation delay, as in SeQUeNCe's `QuantumChannel`,
+      3. chromatic-dispersion jitter: a photon of rms spectral width
+         `bandwidth` (nm) arrives with an rms spread of
+         dispersion * bandwidth * distance (ps).
+
+    Lost photons never reach the caller, so no event or state is created for them.
+    An ideal fiber leaves the polarization unchanged; fiber models that
+    rotate it override `fiber_jones`, and an optional `drift` adds a slow
+    time-dependent rotation on top (see `jones`).
+
+    Attributes:
+        distance: fiber length (m).
+        attenuation: loss (dB/m).
+        dispersion: chromatic dispersion (ps/(nm km)) at the photons' wavelength.
+        drift: polarization drift (None for a static fiber).
+    """
+    distance: float = 0.0
+    attenuation: float = 0.0
+    dispersion: float = 0.0
+    drift: Optional[DriftModel] = None
+
+    @classmethod
+    def from_spec(cls, spec) -> "LinkModel":
+        """Build from a `QuantumLinkSpec`."""
+        return cls(
+            distance=float(spec.distance),
+            attenuation=float(spec.attenuation),
+            dispersion=float(getattr(spec, "dispersion", 0.0)),
+            drift=DriftModel.from_params(getattr(spec, "drift", None)),
+        )
+
+    @property
+    def transmission(self) -> float:
+        return 10 ** (self.distance * self.attenuation / -10)
+
+    @property
+    def delay(self) -> int:
+        """Propagation delay (ps)."""
+        return round(self.distance / SPEED_OF_LIGHT)
+
+    def dispersion_jitter(self, bandwidth: float) -> float:
+        """rms arrival spread (ps) of photons with rms spectral width `bandwidth` (nm)."""
+        return abs(self.dispersion) * float(bandwidth) * self.distance * 1e-3
+
+    def fiber_jones(self, times: np.ndarray) -> Optional[np.ndarray]:
+        """Static fiber rotation (N, 2, 2) at `times` (ps), or None for an ideal fiber."""
+        return None
+
+    def jones(self, times: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Jones matrices (N, 2, 2) applied to photons arriving at `times` (ps),
+        or None if the link does not change the polarization.
+        """
+        fiber = self.fiber_jones(times)
+        if self.drift is None or self.drift.trace is None:
+            return fiber
+        drift = self.drift.jones_at(times)
+        return drift if fiber is None else drift @ fiber
+
+    def propagate(
+        self,
+        times: np.ndarray,
+        rng: np.random.Generator,
+        bandwidth: float = 0.0,
+        stop: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Propagate photons emitted at `times` (ps).
+
+        With dispersion jitter the arrivals are re-sorted; the rms jitter is
+        assumed to be small compared to the spacing of consecutive batches.
+
+        Args:
+            times: sorted emission times (ps).
+            rng: random generator.
+            bandwidth: rms spectral width (nm) of the photons.
+            stop: photons arriving at or after `stop` (ps) are dropped (end of the run).
+
+        Returns:
+            (index, arrivals): indices into `times` of the photons that arrive,
+            and their int64 arrival times (ps), in time order.
+        """
+        times = np.asarray(times, dtype=np.int64)
+        index = _thin(len(times), self.transmission, rng)
+        arrivals = times[index] + self.delay
+
+        jitter = self.dispersion_jitter(bandwidth)
+        if jitter > 0:
+            arrivals = arrivals + np.rint(rng.normal(0.0, jitter, size=len(index))).astype(np.int64)
+            order = np.argsort(arrivals, kind="stable")
+            index, arrivals = index[order], arrivals[order]
+
+        if stop is not None:
+            arrived = arrivals < stop
+            index, arrivals = index[arrived], arrivals[arrived]
+        return index, arrivals
+
+
+def _thin(num: int, p: float, rng: np.random.Generator) -> np.ndarray:
+    """Sorted indices of the photons kept out of `num`, each independently with probability `p`."""
+    if p >= 1:
+        return np.arange(num)
+    if p <= 0 or num == 0:
+        return np.empty(0, dtype=np.int64)
+    if p > _GAP_SAMPLING_MAX:
+        return np.flatnonzero(rng.random(num) < p)
+
+    # gaps between kept photons are geometric, so only kept photons cost a draw
+    chunks = []
+    last = -1
+    expected = num * p
+    while last < num - 1:
+        positions = last + np.cumsum(rng.geometric(p, size=int(expected + 5 * np.sqrt(expected)) + 16))
+        chunks.append(positions)
+        last = int(positions[-1])
+    index = np.concatenate(chunks)
+    return index[index < num]
+
+
+def quaternion_product(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Quaternion (Hamilton) product p q, i.e. the SU(2) product U(p) U(q)."""
+    pw, px, py, pz = np.moveaxis(p, -1, 0)
+    qw, qx, qy, qz = np.moveaxis(q, -1, 0)
+    return np.stack([
+        pw * qw - px * qx - py * qy - pz * qz,
+        pw * qx + px * qw + py * qz - pz * qy,
+        pw * qy - px * qz + py * qw + pz * qx,
+        pw * qz + px * qy - py * qx + pz * qw,
+    ], axis=-1)
+
+
+def quaternion_jones(quaternions: np.ndarray) -> np.ndarray:
+    """(..., 2, 2) Jones matrices U = w I - i (x sx + y sy + z sz) of unit quaternions (w, x, y, z)."""
+    w, x, y, z = np.moveaxis(quaternions, -1, 0)
+    out = np.empty(quaternions.shape[:-1] + (2, 2), dtype=complex)
+    out[..., 0, 0] = w - 1j * z
+    out[..., 0, 1] = -y - 1j * x
+    out[..., 1, 0] = y - 1j * x
+    out[..., 1, 1] = w + 1j * z
+    return out
+
+
+def _cumulative_product(quaternions: np.ndarray) -> np.ndarray:
+    """Running products q[s] ... q[0] of (S, 4) quaternions, by log2(S) doubling steps."""
+    out = quaternions.copy()
+    shift = 1
+    while shift < len(out):
+        out[shift:] = quaternion_product(out[shift:], out[:-shift])
+        shift *= 2
+    return out
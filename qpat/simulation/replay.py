@@ -0,0 +1,67 @@
+# qpat/simulation/replay.py
+from __future__ import annotations
+
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+from qpat.simulation.tasks import SimulationTask
+from qpat.simulation.timetags import TimeTagFile
+from qpat.simulation.view import SimulationView
+
+
+class ReplayEngine:
+    """
+    Stand-in for `SimulationEngine` that serves recorded time tags.
+
+    Recorded binary tag files (see `TimeTagFileWriter`), e.g. converted from
+    a lab time-tagger, are returned in the same `SimulationView` as a
+    simulation whose analyzers streamed their detections to tag files
+    (`tag_file` node param). Capabilities then analyze them through the same
+    coincidence models and analysis modules as simulated runs, reading the
+    files block by block, so memory stays constant however long the
+    recording is.
+
+    Channel labels of a recording must be those of the analyzer it replaces:
+    "H"/"V", or "<basis>.H"/"<basis>.V" for tomography. Other labels raise
+    ValueError when the capability reads the recording.
+    """
+
+    def __init__(self, topology, recordings: Dict[str, str], seed: Optional[int] = None):
+        """
+        Args:
+            topology: experiment topology (kept for interface compatibility).
+            recordings: node name -> recorded tag file.
+            seed: unused; recordings are not random.
+        """
+        self.topology_spec = topology
+        self.recordings = dict(recordings)
+        self.seed = seed
+
+    def run(self, duration: Optional[float], tasks: list[SimulationTask]) -> SimulationView:
+        """
+        Serve the recordings; `tasks` (source emissions) are ignored.
+
+        Args:
+            duration: acquisition time (ps) requested by the capability, or
+                None. The recordings are served whole; it should match their
+                length, which is reported as metadata["replay_end"] (ps, one
+                past the last tag).
+
+        Returns:
+            SimulationView: no tags in memory; the recordings are listed in
+            metadata["tag_files"].
+        """
+        channels = {}
+        end = 0
+        for node, path in self.recordings.items():
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No recording for '{node}' at '{path}'")
+            with TimeTagFile(path) as recording:
+                channels[node] = {label: np.empty(0, dtype=np.int64) for label in recording.labels}
+                if len(recording):
+                    end = max(end, recording.end_time + 1)
+
+        metadata = {"tag_files": dict(self.recordings), "replay_end": end}
+        return SimulationView.from_channels(channels, metadata=metadata)
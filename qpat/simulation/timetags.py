@@ -0,0 +1,475 @@
+# qpat/simulation/timetags.py
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+TIMESTAMP_DTYPE = np.dtype("<i8")   # ps
+CHANNEL_DTYPE = np.dtype("u1")
+
+DEFAULT_INITIAL_CAPACITY = 4096
+DEFAULT_MAX_CAPACITY = 1 << 27      # ~1.2 GB of tags per buffer
+
+OVERFLOW_POLICIES = ("raise", "drop")
+
+# Binary time-tag files (see `TimeTagFileWriter`)
+TAG_FILE_MAGIC = b"QPATTAGS"
+TAG_FILE_VERSION = 1
+DEFAULT_CHUNK_TAGS = 1 << 16        # tags per entry of the time index
+
+_TAG_FILE_HEADER = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("header_size", "<u4"),         # header plus channel labels, padded to 8 bytes
+    ("num_tags", "<u8"),
+    ("chunk_tags", "<u8"),
+    ("timestamps_offset", "<u8"),
+    ("channels_offset", "<u8"),
+    ("index_offset", "<u8"),
+    ("num_chunks", "<u8"),
+])
+
+
+class TimeTagBuffer:
+    """
+    Growable, preallocated time-tag buffer.
+
+    Tags are stored column-wise in two NumPy arrays: int64 timestamps (ps)
+    and uint8 channel ids. Storage starts at `initial_capacity` tags and
+    doubles when full, up to `max_capacity` tags.
+
+    Overflow policy (once `max_capacity` tags are stored):
+      - "raise": raise OverflowError (default, nothing is lost silently).
+      - "drop":  discard new tags and count them in `dropped`.
+
+    Tags are expected in time order. Out-of-order appends are accepted;
+    the buffer is then sorted in place once, when it is drained.
+    """
+
+    def __init__(
+        self,
+        initial_capacity: int = DEFAULT_INITIAL_CAPACITY,
+        max_capacity: Optional[int] = DEFAULT_MAX_CAPACITY,
+        overflow: str = "raise",
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+
+        self.initial_capacity = max(1, int(initial_capacity))
+        self.max_capacity = None if max_capacity is None else int(max_capacity)
+        self.overflow = overflow
+        self.dropped = 0
+
+        self._allocate()
+
+    def _allocate(self):
+        capacity = self.initial_capacity
+        if self.max_capacity is not None:
+            capacity = min(capacity, self.max_capacity)
+        self._timestamps = np.empty(capacity, dtype=TIMESTAMP_DTYPE)
+        self._channels = np.empty(capacity, dtype=CHANNEL_DTYPE)
+        self._size = 0
+        self._sorted = True
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._timestamps)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Zero-copy view of the stored timestamps."""
+        return self._timestamps[:self._size]
+
+    @property
+    def channels(self) -> np.ndarray:
+        """Zero-copy view of the stored channel ids."""
+        return self._channels[:self._size]
+
+    # --------------------------------------------------
+
+    def append(self, timestamp: int, channel: int) -> None:
+        """Record a single tag."""
+        if self._size == len(self._timestamps) and not self._reserve(1):
+            self.dropped += 1
+            return
+
+        if self._size and timestamp < self._timestamps[self._size - 1]:
+            self._sorted = False
+        self._timestamps[self._size] = timestamp
+        self._channels[self._size] = channel
+        self._size += 1
+
+    def extend(self, timestamps: np.ndarray, channels) -> None:
+        """
+        Record an array of tags.
+
+        Args:
+            timestamps: timestamps in ps.
+            channels: channel id per tag, or a single id for all of them.
+        """
+        timestamps = np.asarray(timestamps, dtype=TIMESTAMP_DTYPE)
+        n = len(timestamps)
+        if n == 0:
+            return
+
+        if n > len(self._timestamps) - self._size and not self._reserve(n):
+            # "drop" policy: keep what still fits
+            keep = len(self._timestamps) - self._size
+            self.dropped += n - keep
+            timestamps = timestamps[:keep]
+            if np.ndim(channels):
+                channels = np.asarray(channels)[:keep]
+            n = keep
+            if n == 0:
+                return
+
+        if self._sorted:
+            if self._size and timestamps[0] < self._timestamps[self._size - 1]:
+                self._sorted = False
+            elif n > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+                self._sorted = False
+
+        end = self._size + n
+        self._timestamps[self._size:end] = timestamps
+        self._channels[self._size:end] = channels
+        self._size = end
+
+    def _reserve(self, n: int) -> bool:
+        """Grow storage to hold `n` more tags. Returns False if tags must be dropped."""
+        needed = self._size + n
+        if self.max_capacity is not None and needed > self.max_capacity:
+            if self.overflow == "raise":
+                raise OverflowError(
+                    f"TimeTagBuffer exceeded max_capacity={self.max_capacity} tags"
+                )
+            if len(self._timestamps) < self.max_capacity:
+                self._resize(self.max_capacity)
+            return False
+
+        capacity = max(len(self._timestamps), 1)
+        while capacity < needed:
+            capacity *= 2
+        if self.max_capacity is not None:
+            capacity = min(capacity, self.max_capacity)
+        self._resize(capacity)
+        return True
+
+    def _resize(self, capacity: int):
+        timestamps = np.empty(capacity, dtype=TIMESTAMP_DTYPE)
+        channels = np.empty(capacity, dtype=CHANNEL_DTYPE)
+        timestamps[:self._size] = self._timestamps[:self._size]
+        channels[:self._size] = self._channels[:self._size]
+        self._timestamps = timestamps
+        self._channels = channels
+
+    # --------------------------------------------------
+
+    def drain(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hand over the recorded tags and start a fresh buffer.
+
+        Returns zero-copy, time-sorted views of (timestamps, channels). The
+        returned arrays are detached from the buffer, so later recordings
+        never overwrite them.
+        """
+        if not self._sorted:
+            order = np.argsort(self.timestamps, kind="stable")
+            self._timestamps[:self._size] = self.timestamps[order]
+            self._channels[:self._size] = self.channels[order]
+
+        tags = (self.timestamps, self.channels)
+        self._allocate()
+        return tags
+
+    def clear(self) -> None:
+        """Discard all recorded tags (and the dropped-tag count)."""
+        self.dropped = 0
+        self._allocate()
+
+
+
+# --------------------------------------------------
+# Binary time-tag files
+# --------------------------------------------------
+
+class TimeTagFileWriter:
+    """
+    Write time tags to a binary file, block by block.
+
+    File layout (all little-endian):
+      - a fixed 64-byte header (`_TAG_FILE_HEADER`: magic, version, tag count,
+        chunk size and the offsets of the sections below), followed by the
+        channel labels as JSON, padded to 8 bytes,
+      - the int64 timestamp column (ps),
+      - the uint8 channel column,
+      - the time index: the timestamp of every `chunk_tags`-th tag (int64).
+
+    Tags must be written in time order. The timestamps go straight to the
+    file and the channel ids to a temporary file that is appended on `close`,
+    so the memory used does not depend on the number of tags.
+
+        with TimeTagFileWriter("alice.tags", labels=("H", "V")) as writer:
+            writer.write(timestamps, channels)
+    """
+
+    def __init__(self, path: str, labels: Sequence[str] = ("0",), chunk_tags: int = DEFAULT_CHUNK_TAGS):
+        """
+        Args:
+            path: output file.
+            labels: channel labels, indexed by channel id.
+            chunk_tags: number of tags per entry of the time index.
+        """
+        self.path = path
+        self.labels = tuple(str(label) for label in labels)
+        self.chunk_tags = max(1, int(chunk_tags))
+        self.num_tags = 0
+
+        labels_bytes = json.dumps(list(self.labels)).encode()
+        self._header_size = _align(_TAG_FILE_HEADER.itemsize + len(labels_bytes))
+        self._file = open(path, "wb")
+        self._file.write(bytes(_TAG_FILE_HEADER.itemsize))
+        self._file.write(labels_bytes.ljust(self._header_size - _TAG_FILE_HEADER.itemsize, b"\0"))
+        self._channels = tempfile.TemporaryFile(dir=os.path.dirname(os.path.abspath(path)))
+        self._index: List[np.ndarray] = []
+        self._last: Optional[int] = None
+
+    def write(self, timestamps: np.ndarray, channels) -> None:
+        """
+        Append tags.
+
+        Args:
+            timestamps: time-sorted timestamps (ps), none earlier than the
+                last tag already written.
+            channels: channel id per tag, or a single id for all of them.
+        """
+        timestamps = np.ascontiguousarray(timestamps, dtype=TIMESTAMP_DTYPE)
+        n = len(timestamps)
+        if n == 0:
+            return
+        if (self._last is not None and timestamps[0] < self._last) or np.any(timestamps[1:] < timestamps[:-1]):
+            raise ValueError("Time tags must be written in time order")
+
+        channels = np.ascontiguousarray(np.broadcast_to(np.asarray(channels, dtype=CHANNEL_DTYPE), (n,)))
+        first = -self.num_tags % self.chunk_tags
+        self._index.append(timestamps[first::self.chunk_tags].copy())
+        self._file.write(timestamps.data)
+        self._channels.write(channels.data)
+        self.num_tags += n
+        self._last = int(timestamps[-1])
+
+    def close(self) -> None:
+        """Append the channel column and the time index, and write the header."""
+        if self._file is None:
+            return
+        f = self._file
+        channels_offset = self._header_size + self.num_tags * TIMESTAMP_DTYPE.itemsize
+        self._channels.seek(0)
+        shutil.copyfileobj(self._channels, f)
+        self._channels.close()
+
+        index_offset = _align(channels_offset + self.num_tags)
+        index = np.concatenate(self._index) if self._index else np.empty(0, dtype=TIMESTAMP_DTYPE)
+        f.write(bytes(index_offset - channels_offset - self.num_tags))
+        f.write(np.ascontiguousarray(index, dtype=TIMESTAMP_DTYPE).data)
+
+        header = np.zeros(1, dtype=_TAG_FILE_HEADER)
+        header[0] = (
+            TAG_FILE_MAGIC, TAG_FILE_VERSION, self._header_size, self.num_tags, self.chunk_tags,
+            self._header_size, channels_offset, index_offset, len(index),
+        )
+        f.seek(0)
+        f.write(header.tobytes())
+        f.close()
+        self._file = None
+
+    def __enter__(self) -> "TimeTagFileWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class TimeTagStream:
+    """
+    Merge per-channel tag arrays into one time-ordered stream for a `TimeTagFileWriter`.
+
+    Each channel reports its tags together with the time up to which it is
+    complete (`push`); tags earlier than every channel's completion time are
+    merged and written, the rest are held until the other channels catch up.
+
+    Timing jitter can put a channel's later tags slightly before the time it
+    reported as complete; `margin` (ps) must cover that spread, as tags are
+    only written once they are more than `margin` before every completion time.
+    """
+
+    def __init__(self, writer: TimeTagFileWriter, num_channels: int, margin: int = 0):
+        self.writer = writer
+        self.margin = int(margin)
+        self._pending = [np.empty(0, dtype=TIMESTAMP_DTYPE) for _ in range(num_channels)]
+        self._complete = [0] * num_channels
+
+    def push(self, channel: int, timestamps: np.ndarray, until: int) -> None:
+        """Add sorted tags of `channel`, which is complete up to `until` (ps)."""
+        timestamps = np.asarray(timestamps, dtype=TIMESTAMP_DTYPE)
+        if len(timestamps):
+            pending = np.concatenate([self._pending[channel], timestamps])
+            if len(timestamps) < len(pending) and timestamps[0] < pending[-len(timestamps) - 1]:
+                # two sorted runs: the stable sort merges them
+                pending = np.sort(pending, kind="stable")
+            self._pending[channel] = pending
+        self._complete[channel] = max(self._complete[channel], int(until))
+        self._commit(min(self._complete) - self.margin)
+
+    def flush(self) -> None:
+        """Write every held tag (end of the acquisition)."""
+        self._commit(None)
+
+    def _commit(self, until: Optional[int]) -> None:
+        ready = []
+        for channel, pending in enumerate(self._pending):
+            size = len(pending) if until is None else int(np.searchsorted(pending, until, side="left"))
+            ready.append(pending[:size])
+            self._pending[channel] = pending[size:]
+        timestamps = np.concatenate(ready)
+        if len(timestamps) == 0:
+            return
+        channels = np.repeat(np.arange(len(ready), dtype=CHANNEL_DTYPE), [len(r) for r in ready])
+        order = np.argsort(timestamps, kind="stable")
+        self.writer.write(timestamps[order], channels[order])
+
+
+class TimeTagFile:
+    """
+    Memory-mapped reader of a binary time-tag file (see `TimeTagFileWriter`).
+
+    The timestamp and channel columns are `np.memmap` arrays: slicing them
+    only reads the touched pages, so files larger than RAM can be analyzed
+    block by block (`blocks`, `channel_times`). Time ranges are located with
+    the time index and a binary search inside one chunk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        header = np.fromfile(path, dtype=_TAG_FILE_HEADER, count=1)
+        if len(header) == 0 or header["magic"][0] != TAG_FILE_MAGIC:
+            raise ValueError(f"'{path}' is not a time-tag file")
+        header = header[0]
+        if int(header["version"]) != TAG_FILE_VERSION:
+            raise ValueError(f"Unsupported time-tag file version {int(header['version'])}")
+
+        with open(path, "rb") as f:
+            f.seek(_TAG_FILE_HEADER.itemsize)
+            labels = f.read(int(header["header_size"]) - _TAG_FILE_HEADER.itemsize)
+        self.labels: Tuple[str, ...] = tuple(json.loads(labels.rstrip(b"\0").decode()))
+        self.num_tags = int(header["num_tags"])
+        self.chunk_tags = int(header["chunk_tags"])
+
+        self.timestamps = _memmap(path, TIMESTAMP_DTYPE, int(header["timestamps_offset"]), self.num_tags)
+        self.channels = _memmap(path, CHANNEL_DTYPE, int(header["channels_offset"]), self.num_tags)
+        self.index = _memmap(path, TIMESTAMP_DTYPE, int(header["index_offset"]), int(header["num_chunks"]))
+
+    def __len__(self) -> int:
+        return self.num_tags
+
+    @property
+    def start_time(self) -> Optional[int]:
+        return int(self.timestamps[0]) if self.num_tags else None
+
+    @property
+    def end_time(self) -> Optional[int]:
+        return int(self.timestamps[-1]) if self.num_tags else None
+
+    def channel_id(self, channel) -> int:
+        """Channel id of a label (ids are returned as they are)."""
+        if isinstance(channel, str):
+            if channel not in self.labels:
+                raise ValueError(f"Tag file '{self.path}' has no channel '{channel}' (channels: {self.labels})")
+            return self.labels.index(channel)
+        return int(channel)
+
+    def find(self, time: int) -> int:
+        """Position of the first tag at or after `time` (ps)."""
+        chunk = int(np.searchsorted(self.index, time, side="left"))
+        # the tag lies in the chunk before the first chunk starting at or after `time`
+        first = max(chunk - 1, 0) * self.chunk_tags
+        last = min(chunk * self.chunk_tags, self.num_tags) if chunk < len(self.index) else self.num_tags
+        return first + int(np.searchsorted(self.timestamps[first:last], time, side="left"))
+
+    def range(self, start: Optional[int] = None, stop: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(timestamps, channels) memory-mapped views of the tags in [start, stop) (ps)."""
+        first = 0 if start is None else self.find(start)
+        last = self.num_tags if stop is None else self.find(stop)
+        return self.timestamps[first:last], self.channels[first:last]
+
+    def channel_times(self, channels: Optional[Sequence] = None, start: Optional[int] = None,
+                      stop: Optional[int] = None) -> List[np.ndarray]:
+        """
+        Timestamps of each channel in [start, stop) (ps), read into memory.
+
+        Args:
+            channels: channel labels or ids (default: all channels).
+        """
+        if channels is None:
+            channels = range(len(self.labels))
+        timestamps, ids = self.range(start, stop)
+        timestamps, ids = np.asarray(timestamps), np.asarray(ids)
+        return [timestamps[ids == self.channel_id(channel)] for channel in channels]
+
+    def channel_counts(self) -> np.ndarray:
+        """Number of tags of every channel."""
+        counts = np.zeros(len(self.labels), dtype=np.int64)
+        for first in range(0, self.num_tags, DEFAULT_MAX_CAPACITY):
+            counts += np.bincount(self.channels[first:first + DEFAULT_MAX_CAPACITY], minlength=len(self.labels))[:len(self.labels)]
+        return counts
+
+    def block_edges(self, min_tags: int = DEFAULT_CHUNK_TAGS) -> np.ndarray:
+        """Block boundaries (ps) from the time index, about `min_tags` tags apart, covering the whole file."""
+        if self.num_tags == 0:
+            return np.empty(0, dtype=TIMESTAMP_DTYPE)
+        step = max(1, int(min_tags) // self.chunk_tags)
+        edges = np.unique(np.asarray(self.index[::step]))
+        return np.append(edges, self.end_time + 1)
+
+    def blocks(self, min_tags: int = DEFAULT_CHUNK_TAGS) -> Iterator[Tuple[int, int, np.ndarray, np.ndarray]]:
+        """Iterate over consecutive time blocks as (start, stop, timestamps, channels)."""
+        edges = self.block_edges(min_tags)
+        for start, stop in zip(edges[:-1], edges[1:]):
+            timestamps, channels = self.range(int(start), int(stop))
+            yield int(start), int(stop), timestamps, channels
+
+    def close(self) -> None:
+        """Drop the memory maps (they are unmapped once no returned view refers to them)."""
+        self.timestamps = self.channels = self.index = None
+
+    def __enter__(self) -> "TimeTagFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_tag_file(path: str, timestamps: np.ndarray, channels=0, labels: Sequence[str] = ("0",),
+                   chunk_tags: int = DEFAULT_CHUNK_TAGS) -> None:
+    """Write time-sorted tags to a binary time-tag file in one call."""
+    with TimeTagFileWriter(path, labels, chunk_tags) as writer:
+        writer.write(timestamps, channels)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+
+def _memmap(path: str, dtype: np.dtype, offset: int, count: int) -> np.ndarray:
+    # np.memmap cannot map zero bytes
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,))
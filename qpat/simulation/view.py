@@ -1,14 +1,161 @@
 # qpat/simulation/view.py
-from typing import Dict, List
+from __future__ import annotations
+
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from qpat.simulation.timetags import CHANNEL_DTYPE, TIMESTAMP_DTYPE
+
+# One detection: int64 timestamp (ps) and uint8 channel id. Aligned records
+# keep the timestamp column binary-searchable without a copy.
+TAG_DTYPE = np.dtype([("timestamp", TIMESTAMP_DTYPE), ("channel", CHANNEL_DTYPE)], align=True)
+
 
 class SimulationView:
     """
-    Read-only view of simulation results.
+    Read-only, columnar view of simulation results.
     Simulator-agnostic.
+
+    Each node's detections are one structured array of `TAG_DTYPE` records,
+    grouped by channel and time-sorted within each channel. Channels are
+    numbered 0..K-1 and named by the node's channel labels (e.g. "H", "V").
+    Per-channel slices and time-range queries are found by binary search and
+    returned as zero-copy views of that array; the time-ordered stream of
+    all channels is merged once, on first use.
+
+    Backends produce a view with `from_channels`; analysis code only reads it.
+    Extra run outputs (e.g. drift traces) are kept in `metadata`.
+
+    Nodes listed in metadata["tag_files"] (node -> path) are file-backed:
+    their detections are in that binary tag file, not in the view. Their
+    channel labels are known, but reading their (empty) columns raises
+    ValueError instead of reporting zero detections.
     """
 
-    def __init__(self, detections: Dict[str, List[float]]):
-        self._detections = detections
+    def __init__(
+        self,
+        tags: Mapping[str, np.ndarray],
+        channels: Mapping[str, Sequence[str]],
+        metadata: Optional[dict] = None,
+    ):
+        """
+        Args:
+            tags: node -> `TAG_DTYPE` array, sorted by (channel, timestamp).
+            channels: node -> channel labels, indexed by channel id.
+            metadata: extra results of the run.
+        """
+        self._tags = dict(tags)
+        self._labels = {node: tuple(labels) for node, labels in channels.items()}
+        self._offsets = {
+            node: np.searchsorted(tags["channel"], np.arange(len(self._labels[node]) + 1))
+            for node, tags in self._tags.items()
+        }
+        self._merged: Dict[str, np.ndarray] = {}
+        self.metadata = metadata or {}
+        self._files = dict(self.metadata.get("tag_files", {}))
+        for tags in self._tags.values():
+            tags.flags.writeable = False
+
+    @classmethod
+    def from_channels(cls, detections: Mapping[str, Mapping[str, np.ndarray]], metadata: Optional[dict] = None):
+        """
+        Build a view from per-channel timestamps.
+
+        Args:
+            detections: node -> {channel label: int64 timestamps (ps)}; labels
+                get channel ids in mapping order.
+            metadata: extra results of the run.
+        """
+        tags, channels = {}, {}
+        for node, by_label in detections.items():
+            columns = [_sorted(times) for times in by_label.values()]
+            array = np.empty(sum(len(c) for c in columns), dtype=TAG_DTYPE)
+            start = 0
+            for channel, times in enumerate(columns):
+                array["timestamp"][start:start + len(times)] = times
+                array["channel"][start:start + len(times)] = channel
+                start += len(times)
+            tags[node], channels[node] = array, tuple(by_label)
+        return cls(tags, channels, metadata)
+
+    # --------------------------------------------------
+
+    @property
+    def nodes(self) -> Tuple[str, ...]:
+        return tuple(self._tags)
+
+    def channels(self, node_name: str) -> Tuple[str, ...]:
+        """Channel labels of a node, indexed by channel id."""
+        return self._labels[node_name]
+
+    def tag_file(self, node_name: str) -> Optional[str]:
+        """Tag file holding the detections of a file-backed node (None: they are in the view)."""
+        return self._files.get(node_name)
+
+    def channel_id(self, node_name: str, channel) -> int:
+        """Channel id of a label (ids are returned as they are)."""
+        if isinstance(channel, str):
+            return self._labels[node_name].index(channel)
+        return int(channel)
+
+    def tags(self, node_name: str, channel=None, start: Optional[int] = None, stop: Optional[int] = None) -> np.ndarray:
+        """
+        Detections of a node, optionally restricted to a channel and a time range.
+
+        Args:
+            node_name: node.
+            channel: channel label or id (None: all channels, in time order).
+            start: first timestamp included (ps).
+            stop: first timestamp excluded (ps).
+
+        Returns:
+            np.ndarray: zero-copy `TAG_DTYPE` view, time-sorted.
+        """
+        if node_name in self._files:
+            raise ValueError(
+                f"Detections of '{node_name}' are in the tag file '{self._files[node_name]}', "
+                f"not in the view; read them with `TimeTagFile`"
+            )
+        if channel is None:
+            tags = self._time_ordered(node_name)
+        else:
+            offsets = self._offsets[node_name]
+            channel = self.channel_id(node_name, channel)
+            tags = self._tags[node_name][offsets[channel]:offsets[channel + 1]]
+        if start is None and stop is None:
+            return tags
+        times = tags["timestamp"]
+        first = 0 if start is None else np.searchsorted(times, start, side="left")
+        last = len(tags) if stop is None else np.searchsorted(times, stop, side="left")
+        return tags[first:last]
+
+    def timestamps(self, node_name: str, channel=None, start: Optional[int] = None, stop: Optional[int] = None) -> np.ndarray:
+        """Timestamp column (int64 ps view) of `tags`."""
+        return self.tags(node_name, channel, start, stop)["timestamp"]
+
+    def count(self, node_name: str, channel=None, start: Optional[int] = None, stop: Optional[int] = None) -> int:
+        """Number of detections in a channel and time range."""
+        return len(self.tags(node_name, channel, start, stop))
+
+    def detection_times(self, node_name: str, channels: Optional[Sequence] = None):
+        """Timestamps of each channel of a node (all channels by default), as a list of int64 views."""
+        if channels is None:
+            channels = range(len(self._labels[node_name]))
+        return [self.timestamps(node_name, channel) for channel in channels]
+
+    def _time_ordered(self, node_name: str) -> np.ndarray:
+        merged = self._merged.get(node_name)
+        if merged is None:
+            tags = self._tags[node_name]
+            merged = tags[np.argsort(tags["timestamp"], kind="stable")]
+            merged.flags.writeable = False
+            self._merged[node_name] = merged
+        return merged
+
 
-    def detection_times(self, node_name: str):
-        return self._detections.get(node_name, [])
\ No newline at end of file
+def _sorted(times) -> np.ndarray:
+    times = np.asarray(times, dtype=TIMESTAMP_DTYPE)
+    if len(times) > 1 and np.any(times[1:] < times[:-1]):
+        times = np.sort(times)
+    return times